@@ -32,7 +32,7 @@ def create_app():
     login_manager.login_view = 'auth.login'
     
     # Register blueprints
-    from app.routes import main, auth, apod, mars, neo, earth, iss
+    from app.routes import main, auth, apod, mars, neo, earth, iss, images
     app.register_blueprint(main.bp)
     app.register_blueprint(auth.bp)
     app.register_blueprint(apod.bp)
@@ -40,6 +40,7 @@ def create_app():
     app.register_blueprint(neo.bp)
     app.register_blueprint(earth.bp)
     app.register_blueprint(iss.bp)
+    app.register_blueprint(images.bp)
     
     # Create database tables
     with app.app_context():
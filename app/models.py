@@ -1,10 +1,12 @@
 from app import db, login_manager
 from flask_login import UserMixin
 from datetime import datetime
+from app.services.user_cache import user_cache
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # A cached snapshot (with the favorited ids) instead of a query per request
+    return user_cache.get(int(user_id))
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -22,6 +24,11 @@ class Favorite(db.Model):
     image_url = db.Column(db.String(500), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'nasa_id', name='uq_favorite_user_nasa'),
+        db.Index('idx_favorite_user_created', 'user_id', 'created_at', 'id'),
+    )
+
 class APOD(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, unique=True, nullable=False)
@@ -31,15 +38,44 @@ class APOD(db.Model):
     media_type = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class SyncState(db.Model):
+    """Progress cursor of a background sync or backfill job"""
+    name = db.Column(db.String(100), primary_key=True)
+    cursor = db.Column(db.String(100))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class MarsPhoto(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nasa_id = db.Column(db.String(100), unique=True, nullable=False)
     rover_name = db.Column(db.String(50), nullable=False)
     camera_name = db.Column(db.String(50), nullable=False)
+    camera_full_name = db.Column(db.String(100))
     image_url = db.Column(db.String(500), nullable=False)
+    image_host = db.Column(db.String(100))
+    image_filename = db.Column(db.String(200))
+    image_format = db.Column(db.String(10))
+    sol = db.Column(db.Integer)
     earth_date = db.Column(db.Date)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('idx_mars_rover_sol_camera', 'rover_name', 'sol', 'camera_name'),
+        db.Index('idx_mars_rover_date_camera', 'rover_name', 'earth_date', 'camera_name'),
+    )
+
+class MarsPhotoFetch(db.Model):
+    """A (rover, sol|earth_date, camera) query whose photos are stored locally"""
+    id = db.Column(db.Integer, primary_key=True)
+    query_key = db.Column(db.String(200), unique=True, nullable=False)
+    rover_name = db.Column(db.String(50), nullable=False)
+    sol = db.Column(db.Integer)
+    earth_date = db.Column(db.Date)
+    camera_name = db.Column(db.String(50))
+    photo_count = db.Column(db.Integer, nullable=False, default=0)
+    complete = db.Column(db.Boolean, nullable=False, default=False)
+    latest_earth_date = db.Column(db.Date)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class NEO(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     neo_reference_id = db.Column(db.String(100), unique=True, nullable=False)
@@ -50,6 +86,27 @@ class NEO(db.Model):
     estimated_diameter_max = db.Column(db.Float)
     is_potentially_hazardous = db.Column(db.Boolean)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    close_approaches = db.relationship('NEOCloseApproach', backref='neo', lazy=True)
+
+class NEOCloseApproach(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    neo_id = db.Column(db.Integer, db.ForeignKey('neo.id'), nullable=False)
+    approach_date = db.Column(db.Date, nullable=False)
+    miss_distance_km = db.Column(db.Float, nullable=False)
+    velocity_kph = db.Column(db.Float)
+    orbiting_body = db.Column(db.String(50))
+
+    __table_args__ = (
+        db.UniqueConstraint('neo_id', 'approach_date', name='uq_neo_approach_neo_date'),
+        db.Index('idx_neo_approach_date_distance', 'approach_date', 'miss_distance_km'),
+    )
+
+class NEOFeedDay(db.Model):
+    """A calendar day whose NEO feed has been stored locally"""
+    date = db.Column(db.Date, primary_key=True)
+    object_count = db.Column(db.Integer, nullable=False, default=0)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class EarthImagery(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -59,9 +116,15 @@ class EarthImagery(db.Model):
     image_url = db.Column(db.String(500), nullable=False)
     cloud_score = db.Column(db.Float)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # The cached Web Mercator tile this row describes
+    layer = db.Column(db.String(100))
+    zoom = db.Column(db.Integer)
+    tile_x = db.Column(db.Integer)
+    tile_y = db.Column(db.Integer)
 
     __table_args__ = (
         db.Index('idx_location_date', 'latitude', 'longitude', 'date'),
+        db.UniqueConstraint('layer', 'date', 'zoom', 'tile_x', 'tile_y', name='uq_earth_imagery_tile'),
     )
 
 class EarthEvent(db.Model):
@@ -72,12 +135,27 @@ class EarthEvent(db.Model):
     category = db.Column(db.String(50))
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12))  # of (latitude, longitude), for prefix range scans
     date = db.Column(db.DateTime)
     source = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # EONET fields kept to serve events in the API's JSON shape
+    link = db.Column(db.String(500))
+    closed = db.Column(db.DateTime)
+    categories = db.Column(db.JSON)
+    sources = db.Column(db.JSON)
+    geometry = db.Column(db.JSON)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_earth_event_category_date', 'category', 'date'),
+        db.Index('idx_earth_event_date', 'date'),
+        db.Index('idx_earth_event_geohash', 'geohash'),
+    )
 
 class ClimateData(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    cell_key = db.Column(db.Integer)  # see app.services.climate.cell_key
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
     date = db.Column(db.Date, nullable=False)
@@ -86,5 +164,5 @@ class ClimateData(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     __table_args__ = (
-        db.Index('idx_climate_location_date', 'latitude', 'longitude', 'date'),
+        db.UniqueConstraint('cell_key', 'date', name='uq_climate_cell_date'),
     ) 
\ No newline at end of file
@@ -1 +1 @@
-from . import main, auth, apod, mars, neo, earth, iss 
\ No newline at end of file
+from . import main, auth, apod, mars, neo, earth, iss, images 
\ No newline at end of file
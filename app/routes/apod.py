@@ -1,8 +1,11 @@
 from flask import Blueprint, render_template, jsonify, request, flash, redirect, url_for
 from flask_login import current_user, login_required
 from app.services.nasa_api import NASAAPI
-from app.models import APOD, Favorite, db
+from app.models import APOD, db
+from app.services import apod_store, favorites
+from app.services.http_cache import conditional_response, is_historical
 from datetime import datetime
+import click
 
 bp = Blueprint('apod', __name__)
 nasa_api = NASAAPI()
@@ -42,18 +45,26 @@ def index():
             flash('Error fetching APOD data', 'danger')
             return render_template('apod/index.html', error=str(e))
 
-    # Check if this APOD is in user's favorites
-    is_favorite = False
-    if current_user.is_authenticated:
-        is_favorite = Favorite.query.filter_by(
-            user_id=current_user.id,
-            nasa_id=str(apod_entry.date)
-        ).first() is not None
+    # The favorite state is fetched by the page itself so the rendered
+    # APOD stays cacheable
+    return conditional_response(
+        (apod_entry.date, apod_entry.title, apod_entry.explanation,
+         apod_entry.image_url, apod_entry.media_type),
+        lambda: render_template('apod/index.html', apod=apod_entry, current_date=date),
+        historical=is_historical(date),
+        per_user=True
+    )
 
-    return render_template('apod/index.html', 
-                         apod=apod_entry,
-                         is_favorite=is_favorite,
-                         current_date=date)
+@bp.route('/apod/favorite/status')
+def favorite_status():
+    """Whether the current user has favorited the APOD of a date (never cached)"""
+    is_favorite = False
+    date = request.args.get('date')
+    if current_user.is_authenticated and date:
+        is_favorite = favorites.is_favorited(current_user, date)
+    response = jsonify({'is_favorite': is_favorite})
+    response.cache_control.no_store = True
+    return response
 
 @bp.route('/apod/favorite', methods=['POST'])
 @login_required
@@ -64,23 +75,48 @@ def toggle_favorite():
     if not apod:
         return jsonify({'error': 'APOD not found'}), 404
         
-    existing_favorite = Favorite.query.filter_by(
-        user_id=current_user.id,
-        nasa_id=str(apod.date)
-    ).first()
-    
-    if existing_favorite:
-        db.session.delete(existing_favorite)
-        is_favorite = False
-    else:
-        new_favorite = Favorite(
-            user_id=current_user.id,
-            title=apod.title,
-            nasa_id=str(apod.date),
-            image_url=apod.image_url
-        )
-        db.session.add(new_favorite)
-        is_favorite = True
-    
+    nasa_id = str(apod.date)
+    state = favorites.toggle(current_user.id, [{
+        'nasa_id': nasa_id,
+        'title': apod.title,
+        'image_url': apod.image_url
+    }])
     db.session.commit()
-    return jsonify({'is_favorite': is_favorite}) 
\ No newline at end of file
+    return jsonify({'is_favorite': state[nasa_id]})
+
+@bp.route('/apod/archive')
+def archive():
+    """JSON archive of stored APODs, newest first, with keyset pagination on date"""
+    before = request.args.get('before')
+    limit = min(max(request.args.get('limit', 30, type=int), 1), 100)
+    try:
+        before = datetime.strptime(before, '%Y-%m-%d').date() if before else None
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+
+    entries = apod_store.archive_page(before=before, limit=limit)
+    return jsonify({
+        'items': [{
+            'date': entry.date.strftime('%Y-%m-%d'),
+            'title': entry.title,
+            'image_url': entry.image_url,
+            'media_type': entry.media_type
+        } for entry in entries],
+        'next_before': entries[-1].date.strftime('%Y-%m-%d') if len(entries) == limit else None
+    })
+
+@bp.cli.command('backfill')
+@click.option('--since', default=apod_store.FIRST_APOD_DATE.strftime('%Y-%m-%d'),
+              help='First date to backfill (YYYY-MM-DD)')
+@click.option('--until', default=None, help='Last date to backfill (defaults to yesterday)')
+@click.option('--window', default=apod_store.BACKFILL_WINDOW_DAYS, help='Days fetched per request')
+@click.option('--restart', is_flag=True, help='Ignore saved progress and start again from --since')
+def backfill_command(since, until, window, restart):
+    """Pull the APOD archive into the database in large date-range windows"""
+    since = datetime.strptime(since, '%Y-%m-%d').date()
+    until = datetime.strptime(until, '%Y-%m-%d').date() if until else None
+    stored = apod_store.backfill(
+        nasa_api, since=since, until=until, window_days=window, restart=restart,
+        progress=lambda start, end, count: click.echo(f"{start} .. {end}: {count} entries")
+    )
+    click.echo(f"Stored {stored} APOD entries")
\ No newline at end of file
@@ -1,8 +1,9 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from app.models import User, Favorite
 from app import db
+from app.services import favorites as favorites_service
 from datetime import datetime
 
 bp = Blueprint('auth', __name__)
@@ -74,13 +75,53 @@ def logout():
 @bp.route('/profile')
 @login_required
 def profile():
-    # Get user's favorites with pagination
-    page = request.args.get('page', 1, type=int)
-    favorites = Favorite.query.filter_by(user_id=current_user.id)\
-        .order_by(Favorite.created_at.desc())\
-        .paginate(page=page, per_page=8, error_out=False)
-    
-    return render_template('auth/profile.html', favorites=favorites)
+    # Get user's favorites, newest first, one keyset page at a time
+    after = request.args.get('after')
+    try:
+        favorites, next_cursor = favorites_service.page(current_user.id, after=after)
+    except ValueError:
+        return redirect(url_for('auth.profile'))
+
+    return render_template('auth/profile.html', favorites=favorites,
+                           next_cursor=next_cursor, is_first_page=not after)
+
+@bp.route('/profile/favorites/status')
+@login_required
+def favorites_status():
+    """Which of the comma-separated ids the current user has favorited"""
+    ids = [nasa_id for nasa_id in request.args.get('ids', '').split(',') if nasa_id]
+    response = jsonify({'favorited': sorted(favorites_service.favorited_by(current_user, ids))})
+    response.cache_control.no_store = True
+    return response
+
+def _valid_favorite_item(item):
+    """A toggle item: a nasa_id string or number, with optional title and image_url strings"""
+    if not isinstance(item, dict):
+        return False
+    nasa_id = item.get('nasa_id')
+    if isinstance(nasa_id, bool) or not isinstance(nasa_id, (str, int)) or not nasa_id:
+        return False
+    if len(str(nasa_id)) > 100:
+        return False
+    image_url = item.get('image_url')
+    if image_url is not None and (not isinstance(image_url, str) or len(image_url) > 500):
+        return False
+    title = item.get('title')
+    return title is None or isinstance(title, str)
+
+@bp.route('/profile/favorites/toggle', methods=['POST'])
+@login_required
+def toggle_favorites():
+    """Toggle many favorites at once: {"items": [{"nasa_id", "title", "image_url"}, ...]}"""
+    body = request.get_json(silent=True)
+    items = body.get('items') if isinstance(body, dict) else None
+    if not isinstance(items, list) or not all(_valid_favorite_item(item) for item in items):
+        return jsonify({'error': 'items must be a list of objects with a nasa_id and optional '
+                                 'title and image_url strings'}), 400
+
+    state = favorites_service.toggle(current_user.id, items)
+    db.session.commit()
+    return jsonify({'favorites': state})
 
 @bp.route('/profile/favorites/remove/<int:favorite_id>', methods=['POST'])
 @login_required
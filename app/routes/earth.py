@@ -1,26 +1,32 @@
-from flask import Blueprint, render_template, jsonify, request
+from flask import Blueprint, render_template, jsonify, request, make_response, send_file, Response, current_app
 from app.services.nasa_api import NASAAPI
+from app.services.http_cache import conditional_json, is_historical, ONE_YEAR, RECENT_MAX_AGE
 from datetime import datetime, timedelta
 import json
-from app.models import ClimateData, db
-import math
-import random
+from app.models import db
+from app.services import change_detection, climate, cloud_cover, earth_tiles, eonet_store, timelapse, timeseries
+from app.services.rate_limit import RateLimitExceeded
+import click
+import requests
+import os
+import re
+import time
 
 bp = Blueprint('earth', __name__)
 nasa_api = NASAAPI()
 
 @bp.route('/earth')
 def index():
-    # Get events for the map
+    # Events for the map come from the local EONET copy
+    eonet_store.sync_if_stale(nasa_api)
+    events = eonet_store.query_events()
     try:
-        events = nasa_api.get_earth_events()
         categories = nasa_api.get_earth_categories()
-    except Exception as e:
-        events = {'events': []}
+    except Exception:
         categories = {'categories': []}
-        
+
     return render_template('earth/index.html',
-                         events=events.get('events', []),
+                         events=events,
                          categories=categories.get('categories', []))
 
 @bp.route('/earth/imagery')
@@ -28,14 +34,14 @@ def get_imagery():
     lat = request.args.get('lat', type=float)
     lon = request.args.get('lon', type=float)
     date = request.args.get('date')
-    dim = request.args.get('dim', 0.025, type=float)
+    dim = request.args.get('dim', type=float)
     
     if not lat or not lon:
         return jsonify({'error': 'Latitude and longitude are required'}), 400
         
     try:
         imagery = nasa_api.get_earth_imagery(lat, lon, date, dim)
-        return jsonify(imagery)
+        return conditional_json(imagery, historical=is_historical(date))
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -45,135 +51,342 @@ def get_comparison():
     lon = request.args.get('lon', type=float)
     date1 = request.args.get('date1')
     date2 = request.args.get('date2')
+    dim = request.args.get('dim', type=float)
     
     if not all([lat, lon, date1, date2]):
         return jsonify({'error': 'All parameters are required'}), 400
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({'error': 'Latitude or longitude out of range'}), 400
         
     try:
-        image1 = nasa_api.get_earth_imagery(lat, lon, date1)
-        image2 = nasa_api.get_earth_imagery(lat, lon, date2)
-        return jsonify({
-            'before': image1,
-            'after': image2
-        })
+        image1 = nasa_api.get_earth_imagery(lat, lon, date1, dim)
+        image2 = nasa_api.get_earth_imagery(lat, lon, date2, dim)
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+    # The change analysis is optional: the snapshot URLs are still useful without it
+    try:
+        change = change_detection.compare(lat, lon, image1['date'], image2['date'], image1['dim'])
+        db.session.commit()
+        change_error = None
+    except (earth_tiles.TileError, change_detection.ComparisonError, requests.RequestException,
+            RateLimitExceeded) as e:
+        db.session.rollback()
+        change, change_error = None, str(e)
+
+    payload = {
+        'before': image1,
+        'after': image2,
+        'change': change,
+        'change_error': change_error
+    }
+    if change is None:
+        return jsonify(payload)
+    return conditional_json(payload, historical=is_historical(image2['date']))
+
+COMPARISON_KEY = re.compile(r'^[0-9a-f]{64}$')
+
+@bp.route('/earth/compare/<key>/<name>.jpg')
+def get_comparison_image(key, name):
+    """An image of a cached comparison; immutable, since the key addresses its content"""
+    if not COMPARISON_KEY.match(key) or name not in change_detection.IMAGE_NAMES:
+        return jsonify({'error': 'Unknown comparison image'}), 404
+    path = change_detection.comparison_cache.image_path(key, name)
+    if not os.path.exists(path):
+        return jsonify({'error': 'Unknown comparison image'}), 404
+
+    response = send_file(path, mimetype='image/jpeg', etag=f"{key}-{name}", conditional=True, max_age=ONE_YEAR)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@bp.route('/earth/tiles/<layer>/<date>/<int:z>/<int:x>/<int:y>')
+def get_tile(layer, date, z, x, y):
+    """One 256 px imagery tile, fetched upstream once and then served from disk"""
+    try:
+        data, mimetype, stored = earth_tiles.tile_cache.get(layer, date, z, x, y)
+    except earth_tiles.TileNotFound as e:
+        return jsonify({'error': str(e)}), 404
+    except earth_tiles.TileError as e:
+        return jsonify({'error': str(e)}), 400
+    except requests.RequestException as e:
+        return jsonify({'error': f"Error fetching tile: {str(e)}"}), 502
+    except RateLimitExceeded as e:
+        response = jsonify({'error': str(e)})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(1, round(e.retry_after)))
+        return response
+
+    if stored:
+        try:
+            earth_tiles.record_tiles([(layer, date, z, x, y)])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error recording Earth tile: {e}")
+
+    response = make_response(data)
+    response.mimetype = mimetype
+    response.set_etag(f"{layer}/{date}/{z}/{x}/{y}")
+    response.cache_control.public = True
+    if is_historical(date):
+        response.cache_control.max_age = ONE_YEAR
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = RECENT_MAX_AGE
+    return response.make_conditional(request)
+
+# Seconds between progress checks and the longest a progress stream stays open
+TIMELAPSE_POLL = 0.5
+TIMELAPSE_STREAM_TIMEOUT = 600
+TIMELAPSE_KEY = COMPARISON_KEY
+
+@bp.route('/earth/timelapse')
+def get_timelapse():
+    """Start (or look up) a time-lapse video of a location; 202 while it renders"""
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    if lat is None or lon is None:
+        return jsonify({'error': 'Latitude and longitude are required'}), 400
+
+    try:
+        job = timelapse.TimelapseRequest(
+            lat=lat,
+            lon=lon,
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            step=request.args.get('step', 7, type=int),
+            dim=request.args.get('dim', type=float),
+            fps=request.args.get('fps', 4, type=int),
+            fmt=request.args.get('format', timelapse.DEFAULT_FORMAT)
+        )
+    except timelapse.TimelapseError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        status = timelapse.start(job, current_app._get_current_object())
+    except timelapse.TimelapseBusy as e:
+        response = jsonify({'error': str(e)})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(timelapse.BUSY_RETRY_AFTER)
+        return response
+    status['progress_url'] = f"/earth/timelapse/{status['key']}/events"
+    return jsonify(status), 200 if status['status'] == 'done' else 202
+
+@bp.route('/earth/timelapse/<key>/events')
+def stream_timelapse(key):
+    """Server-Sent Events with a time-lapse's progress until it is done or failed"""
+    if not TIMELAPSE_KEY.match(key) or timelapse.read_status(key) is None:
+        return jsonify({'error': 'Unknown time-lapse'}), 404
+
+    def events():
+        previous = None
+        deadline = time.monotonic() + TIMELAPSE_STREAM_TIMEOUT
+        while time.monotonic() < deadline:
+            status = timelapse.read_status(key) or {'status': 'failed', 'error': 'Time-lapse disappeared'}
+            status.pop('updated_at', None)
+            if status != previous:
+                previous = status
+                yield f"data: {json.dumps(status)}\n\n"
+                if status['status'] in ('done', 'failed'):
+                    return
+            time.sleep(TIMELAPSE_POLL)
+
+    response = Response(events(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@bp.route('/earth/timelapse/<key>.<ext>')
+def get_timelapse_video(key, ext):
+    """A finished time-lapse; immutable, since the key addresses its parameters"""
+    if not TIMELAPSE_KEY.match(key) or ext not in timelapse.FORMATS:
+        return jsonify({'error': 'Unknown time-lapse'}), 404
+    path = timelapse.find_artifact(key, ext)
+    if path is None:
+        return jsonify({'error': 'Unknown time-lapse'}), 404
+
+    # conditional=True also answers Range requests, which video players use to seek
+    response = send_file(path, mimetype=timelapse.FORMATS[ext][1], etag=key, conditional=True, max_age=ONE_YEAR)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+MAX_BEST_DATES = 31
+# Previews fetched by one /earth/assets?best= request; 'flask earth
+# score-clouds' fills in longer ranges ahead of time
+ON_DEMAND_SCORES = 60
+
 @bp.route('/earth/assets')
 def get_assets():
     lat = request.args.get('lat', type=float)
     lon = request.args.get('lon', type=float)
     begin_date = request.args.get('begin_date')
     end_date = request.args.get('end_date')
+    best = request.args.get('best', type=int)
     
     if not lat or not lon:
         return jsonify({'error': 'Latitude and longitude are required'}), 400
+    if best is not None and not 1 <= best <= MAX_BEST_DATES:
+        return jsonify({'error': f'best must be between 1 and {MAX_BEST_DATES}'}), 400
         
     try:
         assets = nasa_api.get_earth_assets(lat, lon, begin_date, end_date)
-        return jsonify(assets)
+        results = assets['results']
+        begin = datetime.strptime(results[0]['date'], '%Y-%m-%d').date()
+        end = datetime.strptime(results[-1]['date'], '%Y-%m-%d').date()
+
+        if best is None:
+            known = cloud_cover.scores(lat, lon, begin, end)
+            for asset in results:
+                asset['cloud_score'] = known.get(datetime.strptime(asset['date'], '%Y-%m-%d').date())
+            return jsonify(assets)
+
+        # Score what the index lacks (newest first, bounded per request),
+        # then rank from the index
+        _, pending = cloud_cover.score_range(lat, lon, begin, end, limit=ON_DEMAND_SCORES)
+        db.session.commit()
+        by_date = {asset['date']: asset for asset in results}
+        ranked = []
+        for day, score in cloud_cover.clearest(lat, lon, begin, end, best):
+            asset = by_date[day.strftime('%Y-%m-%d')]
+            asset['cloud_score'] = score
+            ranked.append(asset)
+        return jsonify({'results': ranked, 'unscored_dates': pending})
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
 @bp.route('/earth/events')
 def get_events():
     category = request.args.get('category')
     days = request.args.get('days', 30, type=int)
+    status = request.args.get('status', 'open')
     
+    if status not in ('open', 'closed', 'all'):
+        return jsonify({'error': 'status must be open, closed or all'}), 400
+        
     try:
-        events = nasa_api.get_earth_events()
-        if category:
-            events['events'] = [e for e in events['events'] if category in [c['id'] for c in e['categories']]]
-        if days:
-            cutoff = datetime.now() - timedelta(days=days)
-            events['events'] = [e for e in events['events'] if datetime.strptime(e['geometry'][0]['date'], '%Y-%m-%dT%H:%M:%SZ') > cutoff]
-        return jsonify(events)
+        eonet_store.sync_if_stale(nasa_api)
+        return jsonify({
+            'title': 'EONET Events',
+            'events': eonet_store.query_events(category=category, days=days, status=status)
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
-def generate_sample_climate_data(lat, lon):
-    """Generate realistic sample climate data based on latitude and rough climate patterns"""
-    today = datetime.now()
-    start_date = today - timedelta(days=365)
-    
-    # Base temperature varies by latitude (rough approximation)
-    base_temp = 30 - abs(lat) * 0.5  # Higher temps near equator, lower near poles
-    
-    # Base precipitation (rough approximation)
-    base_precip = 100 - abs(lat)  # More rain near equator
-    if base_precip < 20:
-        base_precip = 20  # Minimum baseline precipitation
-    
-    data = []
-    current_date = start_date
+MAX_RADIUS_KM = 5000
+
+def _spatial_filters():
+    status = request.args.get('status', 'open')
+    if status not in ('open', 'closed', 'all'):
+        raise ValueError('status must be open, closed or all')
+    limit = request.args.get('limit', eonet_store.SPATIAL_LIMIT, type=int)
+    return {
+        'category': request.args.get('category'),
+        'days': request.args.get('days', type=int),
+        'status': status,
+        'limit': min(max(limit, 1), eonet_store.SPATIAL_LIMIT)
+    }
+
+@bp.route('/earth/events/near')
+def get_events_near():
+    """Stored events within radius_km of a point, closest first"""
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    radius_km = request.args.get('radius_km', 100, type=float)
     
-    while current_date <= today:
-        # Temperature variation by season (reversed for southern hemisphere)
-        season_factor = math.cos((current_date.timetuple().tm_yday / 365) * 2 * math.pi)
-        if lat < 0:  # Southern hemisphere
-            season_factor = -season_factor
-            
-        # Add some random variation
-        temp_variation = random.uniform(-3, 3)
-        precip_variation = random.uniform(0, base_precip * 0.5)
-        
-        # Calculate temperature and precipitation
-        temperature = base_temp + (season_factor * 10) + temp_variation
-        precipitation = max(0, (base_precip + precip_variation) * (1 + season_factor * 0.2))
+    if lat is None or lon is None or not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        return jsonify({'error': 'Valid latitude and longitude are required'}), 400
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        return jsonify({'error': f'radius_km must be between 0 and {MAX_RADIUS_KM}'}), 400
         
-        # Create climate data entry
-        climate_data = ClimateData(
-            latitude=lat,
-            longitude=lon,
-            date=current_date.date(),
-            temperature=round(temperature, 1),
-            precipitation=round(precipitation, 1)
-        )
-        data.append(climate_data)
+    try:
+        events = eonet_store.near(lat, lon, radius_km, **_spatial_filters())
+        return jsonify({'events': events})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@bp.route('/earth/events/bbox')
+def get_events_bbox():
+    """Stored events inside bbox=west,south,east,north (Leaflet's toBBoxString order)"""
+    try:
+        west, south, east, north = (float(value) for value in request.args.get('bbox', '').split(','))
+    except ValueError:
+        return jsonify({'error': 'bbox must be west,south,east,north'}), 400
+    if not -90 <= south <= north <= 90 or not -180 <= west <= 180 or not -180 <= east <= 180:
+        return jsonify({'error': 'bbox is out of range'}), 400
         
-        current_date += timedelta(days=1)
-    
-    return data
+    try:
+        events = eonet_store.within_bbox(south, west, north, east, **_spatial_filters())
+        return jsonify({'events': events})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
 @bp.route('/earth/climate')
 def get_climate_data():
     lat = request.args.get('lat', type=float)
     lon = request.args.get('lon', type=float)
+    days = request.args.get('days', climate.SERIES_DAYS, type=int)
+    resolution = request.args.get('resolution', 'daily')
+    window = request.args.get('window', type=int)
+    points = request.args.get('points', type=int)
     
     if not lat or not lon:
         return jsonify({'error': 'Latitude and longitude are required'}), 400
+    if resolution not in timeseries.RESOLUTIONS:
+        return jsonify({'error': f"resolution must be one of {', '.join(timeseries.RESOLUTIONS)}"}), 400
+    if not 1 <= days <= climate.MAX_SERIES_DAYS:
+        return jsonify({'error': f'days must be between 1 and {climate.MAX_SERIES_DAYS}'}), 400
+    if window is not None and window < 1:
+        return jsonify({'error': 'window must be a positive number of buckets'}), 400
+    if points is not None and points < 3:
+        return jsonify({'error': 'points must be at least 3'}), 400
         
     try:
-        # Query last 12 months of climate data
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=365)
-        
-        climate_data = ClimateData.query.filter(
-            ClimateData.latitude.between(lat - 0.5, lat + 0.5),
-            ClimateData.longitude.between(lon - 0.5, lon + 0.5),
-            ClimateData.date.between(start_date, end_date)
-        ).order_by(ClimateData.date).all()
-        
-        # If no data exists, generate sample data
-        if not climate_data:
-            climate_data = generate_sample_climate_data(lat, lon)
-            # Save to database
-            db.session.bulk_save_objects(climate_data)
-            db.session.commit()
-        
-        dates = []
-        temperatures = []
-        precipitation = []
-        
-        for data in climate_data:
-            dates.append(data.date.strftime('%Y-%m-%d'))
-            temperatures.append(data.temperature)
-            precipitation.append(data.precipitation)
-            
-        return jsonify({
-            'dates': dates,
-            'temperatures': temperatures,
-            'precipitation': precipitation
-        })
+        # The location's grid cell, generated on first use
+        dates, temperature, precipitation = climate.get_series(lat, lon, days)
+        return jsonify(climate.series_payload(dates, temperature, precipitation,
+                                              resolution=resolution, window=window, points=points))
     except Exception as e:
-        return jsonify({'error': str(e)}), 400 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 400
+
+@bp.cli.command('compact-climate')
+@click.option('--retention-days', default=climate.RETENTION_DAYS, help='Days of climate data to keep')
+def compact_climate_command(retention_days):
+    """Delete expired and legacy (pre grid-cell) climate rows"""
+    expired, legacy = climate.compact(retention_days)
+    db.session.commit()
+    click.echo(f"Deleted {expired} expired and {legacy} legacy climate rows")
+
+@bp.cli.command('purge-tiles')
+@click.option('--before', required=True, help='Delete cached tiles of imagery dates before this day (YYYY-MM-DD)')
+def purge_tiles_command(before):
+    """Delete cached Earth imagery tiles of old dates"""
+    days, rows = earth_tiles.purge(datetime.strptime(before, '%Y-%m-%d').date())
+    db.session.commit()
+    click.echo(f"Deleted tiles of {days} days ({rows} indexed tiles)")
+
+@bp.cli.command('score-clouds')
+@click.option('--lat', type=float, required=True)
+@click.option('--lon', type=float, required=True)
+@click.option('--begin', 'begin_date', required=True, help='First date (YYYY-MM-DD)')
+@click.option('--end', 'end_date', default=None, help='Last date (YYYY-MM-DD), default today')
+@click.option('--layer', default=earth_tiles.DEFAULT_LAYER, type=click.Choice(sorted(earth_tiles.LAYERS)))
+def score_clouds_command(lat, lon, begin_date, end_date, layer):
+    """Compute cloud scores for every date of a location's imagery"""
+    begin = datetime.strptime(begin_date, '%Y-%m-%d').date()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else datetime.utcnow().date()
+    scored, _ = cloud_cover.score_range(lat, lon, begin, end, layer,
+                                        progress=lambda count: click.echo(f"Scored {count} dates"))
+    db.session.commit()
+    click.echo(f"Stored cloud scores for {scored} dates")
+
+@bp.cli.command('sync-events')
+@click.option('--full', is_flag=True, help='Re-read every event from --days ago instead of since the last sync')
+@click.option('--days', default=eonet_store.INITIAL_SYNC_DAYS, help='Days covered by a first or full sync')
+@click.option('--category', default=None, help='Only sync one EONET category (e.g. wildfires)')
+def sync_events_command(full, days, category):
+    """Pull EONET events changed since the last sync into the database"""
+    stored = eonet_store.sync(nasa_api, full=full, category=category, days=days)
+    click.echo(f"Stored {stored} EONET events")
@@ -0,0 +1,43 @@
+from flask import Blueprint, request, jsonify, make_response, url_for
+from app.services.image_cache import image_cache, is_allowed_source, ImageProxyError, SIZE_BUCKETS
+import requests
+
+bp = Blueprint('images', __name__)
+
+ONE_YEAR = 365 * 24 * 3600
+
+@bp.app_template_global()
+def thumbnail_url(src, width=512):
+    """Proxy URL for a resized copy of a NASA image (other URLs are returned unchanged)"""
+    if not src or not is_allowed_source(src):
+        return src
+    return url_for('images.thumbnail', src=src, w=width)
+
+@bp.route('/images/thumb')
+def thumbnail():
+    src = request.args.get('src', '')
+    width = request.args.get('w', SIZE_BUCKETS[1], type=int)
+    fmt = request.args.get('fmt')
+    if fmt is None:
+        fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+
+    if not is_allowed_source(src):
+        return jsonify({'error': 'Only NASA-hosted images can be proxied'}), 400
+    if width <= 0:
+        return jsonify({'error': 'Width must be positive'}), 400
+
+    try:
+        data, etag, mimetype = image_cache.get_thumbnail(src, width, fmt)
+    except ImageProxyError as e:
+        return jsonify({'error': str(e)}), 400
+    except requests.RequestException as e:
+        return jsonify({'error': f"Error fetching image: {str(e)}"}), 502
+
+    response = make_response(data)
+    response.mimetype = mimetype
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = ONE_YEAR
+    response.cache_control.immutable = True
+    response.vary.add('Accept')
+    return response.make_conditional(request)
\ No newline at end of file
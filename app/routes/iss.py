@@ -1,19 +1,51 @@
-from flask import Blueprint, render_template, jsonify, request
+from flask import Blueprint, render_template, jsonify, request, Response
 from app.services.nasa_api import NASAAPI
+from app.services.async_nasa_api import AsyncNASAAPI, gather
+from app.services.iss_tracker import ISSTracker, is_stale, position_payload, TRACK_MINUTES
+from app.services import ground_track, iss_passes
+import asyncio
+import time
 from datetime import datetime
 import json
+import click
 
 bp = Blueprint('iss', __name__)
 nasa_api = NASAAPI()
+async_nasa_api = AsyncNASAAPI(nasa_api)
+tracker = ISSTracker(nasa_api.get_iss_position)
+
+# Seconds between keep-alive comments on idle streams; a write to a
+# closed connection is what ends the stream of a departed client
+STREAM_HEARTBEAT = 15
+# Streams end after this many seconds so they do not hold a worker thread
+# for as long as a tab stays open; EventSource reconnects after STREAM_RETRY ms
+STREAM_TIMEOUT = 300
+STREAM_RETRY = 3000
+
+def current_position():
+    """Latest tracked position; straight from the API when there is none or it is stale.
+
+    The tracker's sample can be old after an upstream outage or a restart
+    that reloaded it from the store. If the API cannot be reached either,
+    that sample is returned flagged as stale.
+    """
+    sample = tracker.latest()
+    if sample is not None and not is_stale(sample):
+        return position_payload(sample)
+    try:
+        return dict(nasa_api.get_iss_position(), stale=False)
+    except Exception:
+        if sample is None:
+            raise
+        return position_payload(sample)
 
 @bp.route('/iss')
 def index():
     try:
-        # Get current astronauts in space
-        astronauts = nasa_api.get_astronauts()
-        
-        # Get current ISS position
-        iss_position = nasa_api.get_iss_position()
+        # The crew and, when the tracker has nothing recent, the position
+        # are independent upstream calls
+        astronauts, iss_position = gather(async_nasa_api.get_astronauts(),
+                                          asyncio.to_thread(current_position))
         
         return render_template('iss/index.html',
                              astronauts=astronauts['people'],
@@ -26,11 +58,66 @@ def index():
 def get_position():
     """API endpoint for getting current ISS position"""
     try:
-        position = nasa_api.get_iss_position()
-        return jsonify(position)
+        return jsonify(current_position())
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@bp.route('/iss/stream')
+def stream_position():
+    """Server-Sent Events stream of ISS positions, pushed as the tracker receives them"""
+    def events():
+        deadline = time.monotonic() + STREAM_TIMEOUT
+        yield f"retry: {STREAM_RETRY}\n\n"
+        sample = tracker.latest()
+        if sample is not None:
+            yield f"data: {json.dumps(position_payload(sample))}\n\n"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            update = tracker.wait_for_update(sample, timeout=min(STREAM_HEARTBEAT, remaining))
+            if update is None:
+                yield ": keep-alive\n\n"
+                continue
+            sample = update
+            yield f"data: {json.dumps(position_payload(sample))}\n\n"
+
+    response = Response(events(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@bp.route('/iss/track')
+def get_track():
+    """Recent ISS positions as parallel lists, oldest first"""
+    minutes = request.args.get('minutes', 30, type=float)
+    if not 0 < minutes <= TRACK_MINUTES:
+        return jsonify({'error': f'minutes must be between 0 and {TRACK_MINUTES:g}'}), 400
+        
+    rows = tracker.track(minutes)
+    return jsonify({
+        'timestamps': rows[:, 0].astype(int).tolist(),
+        'latitudes': rows[:, 1].round(4).tolist(),
+        'longitudes': rows[:, 2].round(4).tolist()
+    })
+
+@bp.route('/iss/groundtrack')
+def get_ground_track():
+    """Predicted sub-satellite track and visibility footprint for the next orbits"""
+    orbits = request.args.get('orbits', 2, type=int)
+    step = request.args.get('step', 30, type=float)
+    try:
+        track = ground_track.ground_track(orbits, step)
+    except iss_passes.StaleElementsError as e:
+        return jsonify({'error': str(e)}), 503
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    response = jsonify(track)
+    response.cache_control.public = True
+    response.cache_control.max_age = max(0, int(track['start'] + ground_track.TRACK_BUCKET - time.time()))
+    return response
+
 @bp.route('/iss/pass-predictions')
 def get_pass_predictions():
     """API endpoint for getting ISS pass predictions"""
@@ -40,6 +127,8 @@ def get_pass_predictions():
         
         if lat is None or lon is None:
             return jsonify({'error': 'Latitude and longitude are required'}), 400
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return jsonify({'error': 'Latitude or longitude out of range'}), 400
             
         print(f"Fetching pass predictions for lat: {lat}, lon: {lon}")  # Debug print
         predictions = nasa_api.get_iss_pass_times(lat, lon)
@@ -60,4 +149,20 @@ def get_crew():
         astronauts = nasa_api.get_astronauts()
         return jsonify(astronauts)
     except Exception as e:
-        return jsonify({'error': str(e)}), 400 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 400 
+
+@bp.cli.command('update-tle')
+@click.option('--url', default=iss_passes.TLE_URL, help='Where to download the ISS two-line elements')
+@click.option('--file', 'path', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Read the elements from a local file instead')
+def update_tle_command(url, path):
+    """Store the current ISS orbital elements used for pass predictions"""
+    text = None
+    if path:
+        with open(path) as f:
+            text = f.read()
+    try:
+        elements = iss_passes.update_tle(text=text, url=url)
+    except Exception as e:
+        raise click.ClickException(f"Could not update the TLE: {e}")
+    click.echo(f"Stored TLE for {elements.name or 'ISS'} with epoch {elements.epoch_datetime:%Y-%m-%d %H:%M:%S} UTC")
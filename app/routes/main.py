@@ -1,7 +1,13 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, jsonify
+from app.services.transport import get_cache_stats
 
 bp = Blueprint('main', __name__)
 
 @bp.route('/')
 def index():
-    return render_template('main/index.html') 
\ No newline at end of file
+    return render_template('main/index.html')
+
+@bp.route('/status/cache')
+def cache_status():
+    """Hit/miss counters of the upstream response cache for this worker"""
+    return jsonify(get_cache_stats())
\ No newline at end of file
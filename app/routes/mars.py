@@ -2,9 +2,10 @@ from flask import Blueprint, render_template, request, jsonify
 from flask_login import current_user
 from app.services.nasa_api import NASAAPI
 from app.models import MarsPhoto, db
+from app.services import mars_store
 from datetime import datetime, timedelta
-from functools import lru_cache
 import json
+import click
 
 bp = Blueprint('mars', __name__)
 nasa_api = NASAAPI()
@@ -53,62 +54,14 @@ MISSION_TIMELINE = [
     }
 ]
 
-@lru_cache(maxsize=100)
-def get_cached_photos(rover, camera, earth_date, sol):
-    """Cache Mars photos to improve performance"""
-    cache_key = f"{rover}:{camera}:{earth_date}:{sol}"
-    
+def get_cached_photos(rover, camera, earth_date, sol, page=1):
+    """Get Mars photos, served from the local photo store once a query has been fetched"""
     try:
-        # Try to get from database first
-        if earth_date:
-            photos = MarsPhoto.query.filter_by(
-                rover_name=rover,
-                earth_date=datetime.strptime(earth_date, '%Y-%m-%d').date()
-            )
-            if camera:
-                photos = photos.filter_by(camera_name=camera)
-            photos = photos.all()
-            
-            if photos:
-                return photos
-
-        # If not in database, fetch from API
-        params = {}
-        if earth_date:
-            params['earth_date'] = earth_date
-        if sol:
-            params['sol'] = sol
-        if camera:
-            params['camera'] = camera
-
-        photos_data = nasa_api.get_mars_photos(rover=rover, **params)
-        
-        # Store in database for future use
-        if photos_data and 'photos' in photos_data:
-            for photo_data in photos_data['photos']:
-                try:
-                    photo = MarsPhoto(
-                        nasa_id=str(photo_data['id']),
-                        rover_name=rover,
-                        camera_name=photo_data['camera']['name'],
-                        image_url=photo_data['img_src'],
-                        earth_date=datetime.strptime(photo_data['earth_date'], '%Y-%m-%d').date()
-                    )
-                    db.session.add(photo)
-                except (KeyError, ValueError) as e:
-                    print(f"Error processing photo data: {e}")
-                    continue
-            
-            try:
-                db.session.commit()
-            except Exception as e:
-                print(f"Error committing to database: {e}")
-                db.session.rollback()
-        
-        return photos_data.get('photos', [])
+        return mars_store.get_photos(nasa_api, rover, camera=camera, earth_date=earth_date, sol=sol, page=page)
     except Exception as e:
         print(f"Error in get_cached_photos: {e}")
-        return []
+        db.session.rollback()
+        return [], None, True
 
 @bp.route('/mars')
 def index():
@@ -117,9 +70,10 @@ def index():
     camera = request.args.get('camera', '')
     earth_date = request.args.get('earth_date', '')
     sol = request.args.get('sol', '')
+    page = request.args.get('page', 1, type=int)
 
     # Get photos using cached function
-    photos = get_cached_photos(rover, camera, earth_date, sol)
+    photos, pagination, complete = get_cached_photos(rover, camera, earth_date, sol, page)
 
     # Get available cameras for the selected rover
     rover_cameras = {
@@ -132,9 +86,25 @@ def index():
 
     return render_template('mars/index.html',
                          photos=photos,
+                         pagination=pagination,
+                         complete=complete,
                          rover=rover,
                          camera=camera,
                          earth_date=earth_date,
                          sol=sol,
                          cameras=rover_cameras.get(rover, []),
-                         mission_timeline=MISSION_TIMELINE) 
\ No newline at end of file
+                         mission_timeline=MISSION_TIMELINE)
+
+@bp.cli.command('ingest')
+@click.option('--rover', default='perseverance')
+@click.option('--sol', type=int)
+@click.option('--earth-date')
+@click.option('--camera')
+def ingest_command(rover, sol, earth_date, camera):
+    """Fetch every page of a rover query into the local photo store"""
+    if (sol is None) == (earth_date is None):
+        raise click.UsageError("Specify exactly one of --sol or --earth-date")
+    earth_date = datetime.strptime(earth_date, '%Y-%m-%d').date() if earth_date else None
+    count = mars_store.ingest(nasa_api, rover, sol=sol, earth_date=earth_date,
+                              camera=camera.upper() if camera else None)
+    click.echo(f"Stored {count} photos for {rover}") 
\ No newline at end of file
@@ -1,24 +1,32 @@
 from flask import Blueprint, render_template, jsonify, request
 from app.services.nasa_api import NASAAPI
 from app.models import NEO, db
+from app.services import neo_store
+from app.services.neo_aggregation import NEOColumns, aggregate
+from app.services.http_cache import conditional_json, is_historical
 from datetime import datetime, timedelta
 import json
 
 bp = Blueprint('neo', __name__)
 nasa_api = NASAAPI()
 
+# Longer ranges are split into 7-day windows, but keep page loads bounded
+MAX_RANGE_DAYS = 366
+
 def validate_date_range(start_date, end_date):
     """Validate the date range for NEO API requests"""
     try:
         start = datetime.strptime(start_date, '%Y-%m-%d')
         end = datetime.strptime(end_date, '%Y-%m-%d')
         
+        if end < start:
+            return False, ["End date must be after start date"]
+
+        if (end - start).days >= MAX_RANGE_DAYS:
+            return False, [f"Date range cannot exceed {MAX_RANGE_DAYS} days"]
+
         warnings = []
         
-        # Add warnings for potentially problematic date ranges
-        if (end - start).days > 7:
-            warnings.append(f"Selected range is {(end - start).days} days. The NASA API works best with 7-day ranges.")
-        
         if start.date() < datetime.now().date() - timedelta(days=365*2):
             warnings.append("Historical data beyond 2 years may have limited availability.")
             
@@ -47,7 +55,7 @@ def index():
                              end_date=default_end)
     
     try:
-        neo_data = nasa_api.get_neo_feed(start_date=start_date, end_date=end_date)
+        neo_data = neo_store.get_neo_feed(nasa_api, start_date, end_date)
         processed_data = process_neo_data(neo_data)
         
         return render_template('neo/index.html',
@@ -72,68 +80,14 @@ def get_neo_data():
         return jsonify({'error': warnings[0]}), 400
     
     try:
-        neo_data = nasa_api.get_neo_feed(start_date=start_date, end_date=end_date)
+        neo_data = neo_store.get_neo_feed(nasa_api, start_date, end_date)
         response_data = process_neo_data(neo_data)
         if warnings:
             response_data['warnings'] = warnings
-        return jsonify(response_data)
+        return conditional_json(response_data, historical=is_historical(end_date))
     except Exception as e:
         return jsonify({'error': f"Error fetching NEO data: {str(e)}"}), 400
 
 def process_neo_data(neo_data):
-    processed_data = {
-        'daily_counts': {},
-        'hazardous_counts': {'hazardous': 0, 'non_hazardous': 0},
-        'size_distribution': {'small': 0, 'medium': 0, 'large': 0},
-        'closest_approaches': [],
-        'all_objects': []
-    }
-    
-    for date, asteroids in neo_data['near_earth_objects'].items():
-        processed_data['daily_counts'][date] = len(asteroids)
-        
-        for asteroid in asteroids:
-            # Process hazard assessment
-            if asteroid['is_potentially_hazardous_asteroid']:
-                processed_data['hazardous_counts']['hazardous'] += 1
-            else:
-                processed_data['hazardous_counts']['non_hazardous'] += 1
-            
-            # Process size distribution
-            diameter_km = (asteroid['estimated_diameter']['kilometers']['estimated_diameter_min'] +
-                         asteroid['estimated_diameter']['kilometers']['estimated_diameter_max']) / 2
-            
-            if diameter_km < 0.5:
-                processed_data['size_distribution']['small'] += 1
-            elif diameter_km < 2:
-                processed_data['size_distribution']['medium'] += 1
-            else:
-                processed_data['size_distribution']['large'] += 1
-            
-            # Process closest approaches
-            close_approach = min(asteroid['close_approach_data'],
-                               key=lambda x: float(x['miss_distance']['kilometers']))
-            
-            processed_data['closest_approaches'].append({
-                'name': asteroid['name'],
-                'distance_km': float(close_approach['miss_distance']['kilometers']),
-                'velocity_kph': float(close_approach['relative_velocity']['kilometers_per_hour']),
-                'approach_date': close_approach['close_approach_date']
-            })
-            
-            # Store complete object data
-            processed_data['all_objects'].append({
-                'id': asteroid['neo_reference_id'],
-                'name': asteroid['name'],
-                'diameter_km': diameter_km,
-                'hazardous': asteroid['is_potentially_hazardous_asteroid'],
-                'velocity_kph': float(close_approach['relative_velocity']['kilometers_per_hour']),
-                'miss_distance_km': float(close_approach['miss_distance']['kilometers']),
-                'approach_date': close_approach['close_approach_date']
-            })
-    
-    # Sort closest approaches
-    processed_data['closest_approaches'] = sorted(
-        processed_data['closest_approaches'],
-        key=lambda x: x['distance_km']
-    )[:5]  # Keep only top 5 closest 
\ No newline at end of file
+    """Aggregate a NEO feed into daily counts, hazard/size breakdowns and the closest approaches"""
+    return aggregate(NEOColumns.from_feed(neo_data))
\ No newline at end of file
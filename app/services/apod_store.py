@@ -0,0 +1,71 @@
+from datetime import date, datetime, timedelta
+from app import db
+from app.models import APOD, SyncState
+from app.services.bulk import bulk_upsert
+
+# The first Astronomy Picture of the Day
+FIRST_APOD_DATE = date(1995, 6, 16)
+BACKFILL_WINDOW_DAYS = 90
+BACKFILL_STATE = 'apod_backfill'
+
+def apod_row(item):
+    """Map an APOD API item to APOD column values"""
+    return {
+        'date': datetime.strptime(item['date'], '%Y-%m-%d').date(),
+        'title': item.get('title', '')[:200],
+        'explanation': item.get('explanation'),
+        'image_url': item.get('url') or item.get('hdurl') or item.get('thumbnail_url') or '',
+        'media_type': item.get('media_type'),
+        'created_at': datetime.utcnow()
+    }
+
+def store_apods(items):
+    """Bulk-insert APOD items; dates already stored are left untouched"""
+    rows = [apod_row(item) for item in items if item.get('date')]
+    bulk_upsert(APOD, rows, ['date'])
+    return len(rows)
+
+def backfill_windows(since, until, window_days=BACKFILL_WINDOW_DAYS):
+    start = since
+    while start <= until:
+        end = min(until, start + timedelta(days=window_days - 1))
+        yield start, end
+        start = end + timedelta(days=1)
+
+def backfill(api, since=FIRST_APOD_DATE, until=None, window_days=BACKFILL_WINDOW_DAYS,
+             restart=False, progress=None):
+    """Pull the APOD archive into the APOD table in large date-range windows.
+
+    Progress is committed after every window as the covered span
+    "since:done_until", so an interrupted run resumes where it stopped
+    unless restart is set.
+    """
+    until = until or datetime.utcnow().date() - timedelta(days=1)
+    state = db.session.get(SyncState, BACKFILL_STATE) or SyncState(name=BACKFILL_STATE)
+    covered_since = since
+    start_from = since
+    if not restart and state.cursor:
+        done_since, done_until = (datetime.strptime(value, '%Y-%m-%d').date()
+                                  for value in state.cursor.split(':'))
+        if done_since <= since <= done_until + timedelta(days=1):
+            covered_since = done_since
+            start_from = done_until + timedelta(days=1)
+
+    stored = 0
+    for start, end in backfill_windows(start_from, until, window_days):
+        items = api.get_apod_range(start_date=start.strftime('%Y-%m-%d'),
+                                   end_date=end.strftime('%Y-%m-%d'))
+        stored += store_apods(items)
+        state.cursor = f"{covered_since:%Y-%m-%d}:{end:%Y-%m-%d}"
+        db.session.add(state)
+        db.session.commit()
+        if progress:
+            progress(start, end, len(items))
+    return stored
+
+def archive_page(before=None, limit=30):
+    """Keyset page of stored APODs, newest first, strictly before `before`"""
+    query = APOD.query
+    if before is not None:
+        query = query.filter(APOD.date < before)
+    return query.order_by(APOD.date.desc()).limit(limit).all()
@@ -0,0 +1,68 @@
+import asyncio
+from app.services.nasa_api import NASAAPI
+
+class AsyncNASAAPI:
+    """asyncio facade over NASAAPI.
+
+    Each call runs the blocking NASAAPI method in a worker thread, so it
+    still goes through the shared pooled transport, response cache and rate
+    limiter. Independent calls awaited together overlap their upstream
+    latency instead of adding it up.
+    """
+
+    def __init__(self, api=None):
+        self.api = api or NASAAPI()
+
+    async def _call(self, method, *args, **kwargs):
+        return await asyncio.to_thread(getattr(self.api, method), *args, **kwargs)
+
+    async def get_apod(self, date=None):
+        return await self._call('get_apod', date=date)
+
+    async def get_apod_range(self, start_date=None, end_date=None, count=None):
+        return await self._call('get_apod_range', start_date=start_date, end_date=end_date, count=count)
+
+    async def get_mars_photos(self, rover="perseverance", sol=None, earth_date=None, camera=None, page=1):
+        return await self._call('get_mars_photos', rover=rover, sol=sol, earth_date=earth_date,
+                                camera=camera, page=page)
+
+    async def get_neo_feed(self, start_date=None, end_date=None):
+        return await self._call('get_neo_feed', start_date=start_date, end_date=end_date)
+
+    async def get_neo_feed_range(self, start_date, end_date):
+        return await self._call('get_neo_feed_range', start_date, end_date)
+
+    async def get_earth_assets(self, lat, lon, begin_date=None, end_date=None):
+        return await self._call('get_earth_assets', lat, lon, begin_date, end_date)
+
+    async def get_earth_imagery(self, lat, lon, date=None, dim=None):
+        return await self._call('get_earth_imagery', lat, lon, date, dim)
+
+    async def get_earth_events(self, status=None, start=None, end=None, category=None, limit=None):
+        return await self._call('get_earth_events', status=status, start=start, end=end,
+                                category=category, limit=limit)
+
+    async def get_earth_categories(self):
+        return await self._call('get_earth_categories')
+
+    async def get_earth_layers(self):
+        return await self._call('get_earth_layers')
+
+    async def get_iss_position(self):
+        return await self._call('get_iss_position')
+
+    async def get_iss_pass_times(self, lat, lon):
+        return await self._call('get_iss_pass_times', lat, lon)
+
+    async def get_astronauts(self):
+        return await self._call('get_astronauts')
+
+def gather(*coros, return_exceptions=False):
+    """Run coroutines concurrently from synchronous (Flask view) code.
+
+    Returns their results in order. With return_exceptions=True a failed
+    call yields its exception instead of cancelling the others.
+    """
+    async def _gather():
+        return await asyncio.gather(*coros, return_exceptions=return_exceptions)
+    return asyncio.run(_gather())
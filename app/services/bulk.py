@@ -0,0 +1,44 @@
+from app import db
+
+def _dialect_insert(dialect_name):
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect_name in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+        return insert
+    return None
+
+def bulk_upsert(model, rows, index_elements, update_columns=None):
+    """Insert rows in one executemany, resolving conflicts on index_elements.
+
+    With update_columns the conflicting rows are updated from the new values
+    (INSERT ... ON CONFLICT DO UPDATE); without, they are left untouched
+    (ON CONFLICT DO NOTHING). Dialects without upsert support fall back to
+    a per-row merge. The caller commits.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    insert = _dialect_insert(db.session.get_bind().dialect.name)
+
+    if insert is None:
+        for row in rows:
+            db.session.merge(model(**row))
+        return
+
+    stmt = insert(table)
+    if db.session.get_bind().dialect.name in ('mysql', 'mariadb'):
+        columns = update_columns or index_elements[:1]
+        stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in columns})
+    elif update_columns:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={c: stmt.excluded[c] for c in update_columns}
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+    db.session.execute(stmt, rows)
@@ -0,0 +1,129 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+# requests-cache's sentinels: NEVER_EXPIRE keeps a response for good and
+# DO_NOT_CACHE skips the cache for both reading and writing
+from requests_cache import DO_NOT_CACHE, NEVER_EXPIRE
+
+load_dotenv()
+
+CACHE_BACKEND = os.getenv('NASA_CACHE_BACKEND', 'memory')
+CACHE_PATH = os.getenv('NASA_CACHE_PATH', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'instance', 'http_cache.sqlite'
+))
+CACHE_REDIS_URL = os.getenv('NASA_CACHE_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+
+class CachePolicy:
+    """How long a response may be served fresh, and then stale while it is refreshed"""
+    __slots__ = ('expire_after', 'stale_while_revalidate')
+
+    def __init__(self, expire_after, stale_while_revalidate=0):
+        self.expire_after = expire_after
+        self.stale_while_revalidate = stale_while_revalidate
+
+    def __repr__(self):
+        return f"CachePolicy(expire_after={self.expire_after}, stale_while_revalidate={self.stale_while_revalidate})"
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+DEFAULT_POLICY = CachePolicy(5 * MINUTE)
+NO_CACHE_POLICY = CachePolicy(DO_NOT_CACHE)
+
+def _is_past(date_str, margin_days=1):
+    """True if date_str is safely in the past (NASA publishes on US time, so keep a margin)"""
+    try:
+        date = datetime.strptime(date_str, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return False
+    return date < datetime.utcnow().date() - timedelta(days=margin_days)
+
+def policy_for(endpoint, params=None):
+    """Return the CachePolicy for an upstream endpoint and its query parameters"""
+    params = params or {}
+
+    if endpoint == '/planetary/apod':
+        # A past APOD never changes; today's may still be edited
+        if params.get('date') and _is_past(params['date']):
+            return CachePolicy(NEVER_EXPIRE)
+        if params.get('start_date') and params.get('end_date') and _is_past(params['end_date']):
+            return CachePolicy(NEVER_EXPIRE)
+        if params.get('count'):
+            return NO_CACHE_POLICY  # random selection
+        return CachePolicy(HOUR, 10 * MINUTE)
+
+    if endpoint == '/neo/rest/v1/feed':
+        if _is_past(params.get('end_date'), margin_days=2):
+            return CachePolicy(NEVER_EXPIRE)
+        return CachePolicy(HOUR, HOUR)
+
+    if endpoint.startswith('/mars-photos/'):
+        return CachePolicy(DAY, DAY)
+
+    if endpoint == '/EONET/v3/events':
+        return CachePolicy(10 * MINUTE, 30 * MINUTE)
+
+    if endpoint == '/EONET/v3/categories':
+        return CachePolicy(DAY, DAY)
+
+    if endpoint == '/iss-now.json':
+        # Polled once per interval by the ISS tracker, which shares the result
+        return NO_CACHE_POLICY
+
+    if endpoint == '/astros.json':
+        return CachePolicy(HOUR, HOUR)
+
+    return DEFAULT_POLICY
+
+def create_backend(name=CACHE_BACKEND):
+    """Create a requests-cache storage backend: memory, sqlite or redis"""
+    name = (name or 'memory').lower()
+    if name == 'memory':
+        return 'memory'
+    if name == 'sqlite':
+        from requests_cache import SQLiteCache
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        return SQLiteCache(CACHE_PATH)
+    if name == 'redis':
+        import redis
+        from requests_cache import RedisCache
+        return RedisCache(connection=redis.from_url(CACHE_REDIS_URL))
+    if name in ('none', 'off', 'disabled'):
+        return None
+    raise ValueError(f"Unknown cache backend: {name}")
+
+class CacheStats:
+    """Thread-safe hit/miss counters for the response cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.stale_hits = 0
+            self.misses = 0
+
+    def record(self, response):
+        with self._lock:
+            if getattr(response, 'from_cache', False):
+                if getattr(response, 'is_expired', False):
+                    self.stale_hits += 1
+                else:
+                    self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self):
+        with self._lock:
+            total = self.hits + self.stale_hits + self.misses
+            return {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_ratio': round((self.hits + self.stale_hits) / total, 4) if total else 0.0
+            }
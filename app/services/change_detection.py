@@ -0,0 +1,284 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+import threading
+import time
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+from app.services import earth_tiles, geodesy
+from app.services.concurrency import bounded_map
+from app.services.http_cache import is_historical
+
+load_dotenv()
+
+COMPARE_CACHE_DIR = os.getenv('COMPARE_CACHE_DIR', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'instance', 'compare_cache'
+))
+# Bump when the pipeline changes so old results are not reused
+PIPELINE_VERSION = 1
+IMAGE_NAMES = ('before', 'after', 'difference', 'vegetation')
+IMAGE_URL = '/earth/compare/{key}/{name}.jpg'
+JPEG_QUALITY = 85
+# Tiles of recent days are still being filled in upstream, so comparisons
+# involving one are recomputed after this many seconds instead of kept
+RECENT_TTL = 3600
+
+TILE_FETCH_WINDOW = 6
+# Registration shifts larger than this share of the image are not trusted
+MAX_SHIFT_FRACTION = 0.1
+CHANGE_THRESHOLD = 0.2        # colour distance (0-1) counted as changed
+VEGETATION_THRESHOLD = 0.1    # green leaf index change counted as gain/loss
+
+class ComparisonError(ValueError):
+    pass
+
+def comparison_key(lat, lon, date1, date2, layer, dim, revision=None):
+    """Content address of a comparison: a hash over its rounded parameters.
+
+    revision tells apart recomputations of a comparison whose imagery can
+    still change (see RECENT_TTL).
+    """
+    parts = [round(lat, 4), round(lon, 4), date1, date2, layer, round(dim, 3), PIPELINE_VERSION]
+    if revision is not None:
+        parts.append(revision)
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+def image_url(key, name):
+    return IMAGE_URL.format(key=key, name=name)
+
+def mosaic(layer, date, lat, lon, dim, zoom):
+    """RGB array of the dim x dim degree box around a point, stitched from cached tiles.
+
+    Returns (image, stored_tiles); stored_tiles lists the tiles fetched
+    upstream for the first time, for the caller to index.
+    """
+    size = earth_tiles.TILE_SIZE
+    n = 2 ** zoom
+    west, north = geodesy.mercator_pixel(lat + dim / 2, lon - dim / 2, zoom, size)
+    east, south = geodesy.mercator_pixel(lat - dim / 2, lon + dim / 2, zoom, size)
+    x_tiles = range(math.floor(west / size), math.floor((east - 1) / size) + 1)
+    y_tiles = range(max(0, math.floor(north / size)), min(n - 1, math.floor((south - 1) / size)) + 1)
+
+    def fetch(tile):
+        tx, ty = tile
+        try:
+            data, _, stored = earth_tiles.tile_cache.get(layer, date, zoom, tx % n, ty)
+        except earth_tiles.TileNotFound:
+            return tile, None, False
+        return tile, cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR), stored
+
+    canvas = np.zeros((len(y_tiles) * size, len(x_tiles) * size, 3), dtype=np.uint8)
+    stored_tiles = []
+    found = 0
+    tiles = [(tx, ty) for ty in y_tiles for tx in x_tiles]
+    for (tx, ty), image, stored in bounded_map(fetch, tiles, TILE_FETCH_WINDOW):
+        if image is None:
+            continue
+        found += 1
+        if stored:
+            stored_tiles.append((layer, date, zoom, tx % n, ty))
+        row, col = (ty - y_tiles.start) * size, (tx - x_tiles.start) * size
+        canvas[row:row + size, col:col + size] = cv2.resize(image, (size, size)) if image.shape[:2] != (size, size) else image
+    if not found:
+        raise ComparisonError(f"No {layer} imagery for {date} at this location")
+
+    left, top = int(west - x_tiles.start * size), int(max(north, 0) - y_tiles.start * size)
+    right, bottom = int(math.ceil(east - x_tiles.start * size)), int(math.ceil(min(south, n * size) - y_tiles.start * size))
+    return canvas[top:bottom, left:right], stored_tiles
+
+def register(reference, image):
+    """Translate image onto reference by phase correlation; returns (aligned, (dx, dy), response)"""
+    gray_reference = cv2.cvtColor(reference, cv2.COLOR_BGR2GRAY).astype(np.float32)
+    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY).astype(np.float32)
+    window = cv2.createHanningWindow(gray_reference.shape[::-1], cv2.CV_32F)
+    (dx, dy), response = cv2.phaseCorrelate(gray_reference, gray_image, window)
+    height, width = reference.shape[:2]
+    if abs(dx) > width * MAX_SHIFT_FRACTION or abs(dy) > height * MAX_SHIFT_FRACTION:
+        return image, (0.0, 0.0), response
+    shift = np.float32([[1, 0, -dx], [0, 1, -dy]])
+    return cv2.warpAffine(image, shift, (width, height)), (dx, dy), response
+
+def normalize(reference, image, valid):
+    """Match each channel's 2nd-98th percentile range of image to the reference"""
+    reference_low, reference_high = np.percentile(reference[valid], [2, 98], axis=0)
+    image_low, image_high = np.percentile(image[valid], [2, 98], axis=0)
+    scale = (reference_high - reference_low) / np.maximum(image_high - image_low, 1)
+    return np.clip((image - image_low) * scale + reference_low, 0, 255)
+
+def green_leaf_index(image):
+    """(2G - R - B) / (2G + R + B): a vegetation index for true-colour (no NIR) imagery"""
+    blue, green, red = image[..., 0], image[..., 1], image[..., 2]
+    return (2 * green - red - blue) / np.maximum(2 * green + red + blue, 1)
+
+def _diverging_lut():
+    """BGR colour per index change: red for loss, grey for none, green for gain"""
+    t = np.linspace(-1, 1, 256)[:, None]
+    neutral = np.array([[128, 128, 128]])
+    loss = np.array([[40, 40, 220]])
+    gain = np.array([[60, 200, 60]])
+    colours = np.where(t < 0, neutral + (loss - neutral) * -t, neutral + (gain - neutral) * t)
+    return colours.astype(np.uint8).reshape(256, 1, 3)
+
+VEGETATION_LUT = _diverging_lut()
+
+def analyse(before, after):
+    """Register, normalize and difference two BGR images; returns (images, stats)"""
+    height = min(before.shape[0], after.shape[0])
+    width = min(before.shape[1], after.shape[1])
+    before, after = before[:height, :width], after[:height, :width]
+    after, (dx, dy), response = register(before, after)
+
+    valid = before.any(axis=-1) & after.any(axis=-1)
+    if not valid.any():
+        raise ComparisonError("The two images do not overlap")
+    reference = before.astype(np.float32)
+    adjusted = normalize(reference, after.astype(np.float32), valid)
+
+    difference = np.linalg.norm(adjusted - reference, axis=-1) / (255 * math.sqrt(3))
+    difference[~valid] = 0
+    vegetation_before = green_leaf_index(reference)
+    vegetation_after = green_leaf_index(adjusted)
+    vegetation_change = np.where(valid, vegetation_after - vegetation_before, 0)
+
+    difference_map = cv2.applyColorMap(np.clip(difference * 2 * 255, 0, 255).astype(np.uint8),
+                                       cv2.COLORMAP_INFERNO)
+    lut_index = np.clip((vegetation_change * 2 + 1) * 127.5, 0, 255).astype(np.uint8)
+    colours = cv2.LUT(cv2.merge([lut_index] * 3), VEGETATION_LUT)
+    base = cv2.cvtColor(cv2.cvtColor(before, cv2.COLOR_BGR2GRAY), cv2.COLOR_GRAY2BGR)
+    alpha = np.clip(np.abs(vegetation_change) * 4, 0, 1)[..., None]
+    vegetation_map = (base * (1 - alpha) + colours * alpha).astype(np.uint8)
+
+    count = int(valid.sum())
+    stats = {
+        'size': [width, height],
+        'registration': {'dx': round(dx, 2), 'dy': round(dy, 2), 'response': round(float(response), 3)},
+        'mean_difference': round(float(difference[valid].mean()), 4),
+        'changed_fraction': round(float((difference[valid] > CHANGE_THRESHOLD).sum()) / count, 4),
+        'vegetation': {
+            'before_mean': round(float(vegetation_before[valid].mean()), 4),
+            'after_mean': round(float(vegetation_after[valid].mean()), 4),
+            'gain_fraction': round(float((vegetation_change[valid] > VEGETATION_THRESHOLD).sum()) / count, 4),
+            'loss_fraction': round(float((vegetation_change[valid] < -VEGETATION_THRESHOLD).sum()) / count, 4)
+        }
+    }
+    images = {
+        'before': before,
+        'after': adjusted.astype(np.uint8),
+        'difference': difference_map,
+        'vegetation': vegetation_map
+    }
+    return images, stats
+
+class ComparisonCache:
+    """Finished comparisons on disk: ``<key[:2]>/<key>/`` holds result.json and the images.
+
+    A result directory is renamed into place only once complete, so
+    readers never see a partial one. Comparisons involving a recent date
+    go under ``recent/<key>/`` instead, and are deleted once RECENT_TTL
+    has passed twice.
+    """
+
+    def __init__(self, root=COMPARE_CACHE_DIR):
+        self.root = root
+        # Striped locks so concurrent requests for one comparison compute it once
+        self._locks = [threading.Lock() for _ in range(64)]
+
+    def directory(self, key, recent=False):
+        if recent:
+            return os.path.join(self.root, 'recent', key)
+        return os.path.join(self.root, key[:2], key)
+
+    def lock(self, key):
+        return self._locks[int(key[:8], 16) % len(self._locks)]
+
+    def load(self, key, recent=False):
+        try:
+            with open(os.path.join(self.directory(key, recent), 'result.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key, result, images, recent=False):
+        directory = self.directory(key, recent)
+        tmp_directory = f"{directory}.{threading.get_ident()}.tmp"
+        os.makedirs(tmp_directory, exist_ok=True)
+        try:
+            for name, image in images.items():
+                ok, data = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+                with open(os.path.join(tmp_directory, f"{name}.jpg"), 'wb') as f:
+                    f.write(data.tobytes())
+            with open(os.path.join(tmp_directory, 'result.json'), 'w') as f:
+                json.dump(result, f)
+            os.replace(tmp_directory, directory)
+        except OSError:
+            # Another worker stored the same result first
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+        if recent:
+            self.purge_recent()
+
+    def purge_recent(self, now=None):
+        """Delete recent comparisons older than two RECENT_TTL periods"""
+        cutoff = (now or time.time()) - 2 * RECENT_TTL
+        recent_root = os.path.join(self.root, 'recent')
+        try:
+            names = os.listdir(recent_root)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(recent_root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
+
+    def image_path(self, key, name):
+        path = os.path.join(self.directory(key), f"{name}.jpg")
+        if os.path.exists(path):
+            return path
+        return os.path.join(self.directory(key, recent=True), f"{name}.jpg")
+
+comparison_cache = ComparisonCache()
+
+def compare(lat, lon, date1, date2, dim, layer=earth_tiles.DEFAULT_LAYER):
+    """Change between two dates around a point, computed once per parameter set.
+
+    Both dates are stitched from the tile cache at the zoom matching dim,
+    the later image is registered and radiometrically matched to the
+    earlier one, and a colour-difference map and a vegetation-change map
+    are derived. Returns the stats with the URLs of the cached images.
+    Newly fetched tiles are indexed; the caller commits. While either
+    date is recent, the result is only reused for RECENT_TTL seconds.
+    """
+    recent = not (is_historical(date1) and is_historical(date2))
+    revision = int(time.time() // RECENT_TTL) if recent else None
+    key = comparison_key(lat, lon, date1, date2, layer, dim, revision)
+    result = comparison_cache.load(key, recent)
+    if result is not None:
+        return result
+
+    with comparison_cache.lock(key):
+        result = comparison_cache.load(key, recent)
+        if result is not None:
+            return result
+
+        zoom = earth_tiles.zoom_for_dim(dim, layer)
+        before, stored_before = mosaic(layer, date1, lat, lon, dim, zoom)
+        after, stored_after = mosaic(layer, date2, lat, lon, dim, zoom)
+        earth_tiles.record_tiles(stored_before + stored_after)
+
+        images, stats = analyse(before, after)
+        result = {
+            'key': key,
+            'layer': layer,
+            'zoom': zoom,
+            'dates': [date1, date2],
+            **stats,
+            'images': {name: image_url(key, name) for name in IMAGE_NAMES}
+        }
+        comparison_cache.store(key, result, images, recent)
+        return result
@@ -0,0 +1,145 @@
+from datetime import date, datetime, timedelta
+import numpy as np
+from app import db
+from app.models import ClimateData
+from app.services.bulk import bulk_upsert
+from app.services import timeseries
+
+# Clicks within the same 0.5 degree cell share one synthetic series
+CELL_SIZE_DEG = 0.5
+CELL_ROWS = int(180 / CELL_SIZE_DEG)
+CELL_COLS = int(360 / CELL_SIZE_DEG)
+SERIES_DAYS = 366
+MAX_SERIES_DAYS = 5 * 366
+RETENTION_DAYS = MAX_SERIES_DAYS + 30
+
+def cell_key(lat, lon):
+    """Integer key of the grid cell containing (lat, lon)"""
+    row = min(int((lat + 90) // CELL_SIZE_DEG), CELL_ROWS - 1)
+    col = int(((lon + 180) % 360) // CELL_SIZE_DEG)
+    return row * CELL_COLS + col
+
+def cell_center(key):
+    row, col = divmod(key, CELL_COLS)
+    return (row + 0.5) * CELL_SIZE_DEG - 90, (col + 0.5) * CELL_SIZE_DEG - 180
+
+def generate_series(key, start, days):
+    """Sample climate for `days` days from `start` in one cell, as NumPy arrays.
+
+    Temperature and precipitation follow latitude and season (reversed in
+    the southern hemisphere) plus noise from a generator seeded by the cell
+    and start date, so regenerating a window gives the same values.
+    """
+    lat, _ = cell_center(key)
+    dates = np.arange(np.datetime64(start), np.datetime64(start) + days)
+    day_of_year = (dates - dates.astype('datetime64[Y]')).astype(np.int64) + 1
+    season = np.cos(day_of_year / 365 * 2 * np.pi)
+    if lat < 0:
+        season = -season
+
+    # Higher temps and more rain near the equator
+    base_temp = 30 - abs(lat) * 0.5
+    base_precip = max(100 - abs(lat), 20)
+    rng = np.random.default_rng([key, start.toordinal()])
+    temperature = base_temp + season * 10 + rng.uniform(-3, 3, days)
+    precipitation = np.maximum(0, (base_precip + rng.uniform(0, base_precip * 0.5, days)) * (1 + season * 0.2))
+    return dates, np.round(temperature, 1), np.round(precipitation, 1)
+
+def _missing_ranges(existing, start, end):
+    """Contiguous (first_day, days) runs between start and end not in existing"""
+    runs = []
+    day = start
+    while day <= end:
+        if day in existing:
+            day += timedelta(days=1)
+            continue
+        first = day
+        while day <= end and day not in existing:
+            day += timedelta(days=1)
+        runs.append((first, (day - first).days))
+    return runs
+
+def ensure_cell(key, start, end):
+    """Generate and bulk-insert the days of a cell's series not stored yet"""
+    existing = {day for day, in db.session.query(ClimateData.date)
+                .filter(ClimateData.cell_key == key, ClimateData.date.between(start, end))}
+    lat, lon = cell_center(key)
+    now = datetime.utcnow()
+    rows = []
+    for first, days in _missing_ranges(existing, start, end):
+        dates, temperature, precipitation = generate_series(key, first, days)
+        rows.extend({
+            'cell_key': key,
+            'latitude': lat,
+            'longitude': lon,
+            'date': day,
+            'temperature': temp,
+            'precipitation': precip,
+            'created_at': now
+        } for day, temp, precip in zip(dates.tolist(), temperature.tolist(), precipitation.tolist()))
+    bulk_upsert(ClimateData, rows, ['cell_key', 'date'])
+    return len(rows)
+
+def get_series(lat, lon, days=SERIES_DAYS, today=None):
+    """(dates, temperature, precipitation) arrays for the last `days` days of a location's cell"""
+    end = today or date.today()
+    start = end - timedelta(days=days - 1)
+    key = cell_key(lat, lon)
+    if ensure_cell(key, start, end):
+        db.session.commit()
+    rows = db.session.query(ClimateData.date, ClimateData.temperature, ClimateData.precipitation)\
+        .filter(ClimateData.cell_key == key, ClimateData.date.between(start, end))\
+        .order_by(ClimateData.date).all()
+    dates, temperature, precipitation = zip(*rows) if rows else ((), (), ())
+    return (np.array(dates, dtype='datetime64[D]'),
+            np.array(temperature, dtype=np.float64),
+            np.array(precipitation, dtype=np.float64))
+
+def series_payload(dates, temperature, precipitation, resolution='daily', window=None, points=None):
+    """The /earth/climate payload: bucket means plus optional statistics.
+
+    dates/temperatures/precipitation keep their original meaning (one mean
+    per bucket). Weekly and monthly buckets add min, max and percentile
+    bands; window adds a trailing rolling mean over that many buckets;
+    points downsamples the buckets with LTTB, keeping the union of the
+    points selected for either series.
+    """
+    bucket_dates, temperature_stats = timeseries.resample(dates, temperature, resolution)
+    _, precipitation_stats = timeseries.resample(dates, precipitation, resolution)
+    for stats in (temperature_stats, precipitation_stats):
+        if window:
+            stats['rolling_mean'] = timeseries.rolling_mean(stats['mean'], window)
+        if resolution == 'daily':
+            for name in ('min', 'max', *(f'p{p:g}' for p in timeseries.PERCENTILES)):
+                del stats[name]
+
+    if points and points < len(bucket_dates):
+        x = bucket_dates.astype(np.int64)
+        keep = np.union1d(timeseries.lttb(x, temperature_stats['mean'], points),
+                          timeseries.lttb(x, precipitation_stats['mean'], points))
+        bucket_dates = bucket_dates[keep]
+        for stats in (temperature_stats, precipitation_stats):
+            for name in stats:
+                stats[name] = stats[name][keep]
+
+    payload = {
+        'dates': [str(day) for day in bucket_dates],
+        'temperatures': timeseries.to_list(temperature_stats.pop('mean')),
+        'precipitation': timeseries.to_list(precipitation_stats.pop('mean')),
+        'resolution': resolution
+    }
+    if temperature_stats:
+        payload['temperature_stats'] = {name: timeseries.to_list(values) for name, values in temperature_stats.items()}
+        payload['precipitation_stats'] = {name: timeseries.to_list(values) for name, values in precipitation_stats.items()}
+    return payload
+
+def compact(retention_days=RETENTION_DAYS, today=None):
+    """Delete rows past retention and legacy rows without a cell key.
+
+    Returns (expired, legacy) row counts. Legacy rows were keyed by float
+    coordinates and are regenerated per cell on demand. The caller commits.
+    """
+    cutoff = (today or date.today()) - timedelta(days=retention_days)
+    expired = ClimateData.query.filter(ClimateData.date < cutoff).delete(synchronize_session=False)
+    legacy = ClimateData.query.filter(ClimateData.cell_key.is_(None)).delete(synchronize_session=False)
+    return expired, legacy
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+import cv2
+import numpy as np
+import requests
+from app import db
+from app.models import EarthImagery
+from app.services import earth_tiles, geodesy
+from app.services.bulk import bulk_upsert
+from app.services.concurrency import bounded_map
+from app.services.rate_limit import RateLimitExceeded
+
+# Scores come from the single 256 px tile containing the location at this
+# zoom (about 300 km across), fetched through the tile cache
+PREVIEW_ZOOM = 7
+FETCH_WINDOW = 8
+BATCH_SIZE = 32
+# Bright and nearly grey pixels count as cloud; black pixels are gaps
+# between satellite swaths and are left out
+CLOUD_BRIGHTNESS = 180
+CLOUD_MAX_SPREAD = 40
+NO_DATA_BRIGHTNESS = 10
+MIN_VALID_FRACTION = 0.2
+# Stored for dates the layer has no imagery for, so they are not fetched
+# again; never returned as a score
+NO_IMAGERY = -1.0
+
+def cloud_fractions(previews):
+    """Cloud fraction of each image in a (n, h, w, 3) uint8 stack, as one vectorized pass.
+
+    Images with too few valid pixels score 1.0 so they rank last.
+    """
+    previews = previews.astype(np.int16)
+    brightest = previews.max(axis=-1)
+    darkest = previews.min(axis=-1)
+    valid = brightest > NO_DATA_BRIGHTNESS
+    cloudy = valid & (darkest >= CLOUD_BRIGHTNESS) & (brightest - darkest <= CLOUD_MAX_SPREAD)
+    valid_count = valid.sum(axis=(1, 2))
+    fractions = cloudy.sum(axis=(1, 2)) / np.maximum(valid_count, 1)
+    usable = valid_count >= MIN_VALID_FRACTION * valid[0].size
+    return np.where(usable, fractions, 1.0)
+
+def preview_tile(lat, lon):
+    return (PREVIEW_ZOOM, *geodesy.tile_for(lat, lon, PREVIEW_ZOOM))
+
+def _tile_filter(query, layer, tile, begin, end):
+    zoom, x, y = tile
+    return query.filter(EarthImagery.layer == layer, EarthImagery.zoom == zoom,
+                        EarthImagery.tile_x == x, EarthImagery.tile_y == y,
+                        EarthImagery.date >= begin, EarthImagery.date <= end)
+
+def scores(lat, lon, begin, end, layer=earth_tiles.DEFAULT_LAYER, include_missing=False):
+    """{date: cloud score} already indexed for the location's preview tile.
+
+    With include_missing, dates known to have no imagery are included
+    with the NO_IMAGERY score.
+    """
+    query = db.session.query(EarthImagery.date, EarthImagery.cloud_score)
+    query = _tile_filter(query, layer, preview_tile(lat, lon), begin, end)
+    if include_missing:
+        return dict(query.filter(EarthImagery.cloud_score.isnot(None)).all())
+    return dict(query.filter(EarthImagery.cloud_score >= 0).all())
+
+def clearest(lat, lon, begin, end, k, layer=earth_tiles.DEFAULT_LAYER):
+    """The k indexed dates with the lowest cloud score, as (date, score) pairs"""
+    query = db.session.query(EarthImagery.date, EarthImagery.cloud_score)
+    query = _tile_filter(query, layer, preview_tile(lat, lon), begin, end)
+    return (query.filter(EarthImagery.cloud_score >= 0)
+            .order_by(EarthImagery.cloud_score, EarthImagery.date.desc())
+            .limit(k).all())
+
+def score_range(lat, lon, begin, end, layer=earth_tiles.DEFAULT_LAYER, limit=None, progress=None):
+    """Fill in cloud scores for every date in [begin, end] not scored yet.
+
+    Previews are fetched in parallel, scored a batch at a time and upserted
+    into EarthImagery; the caller commits. Dates without imagery are
+    stored as NO_IMAGERY. The most recent dates go first and at most
+    `limit` are fetched. Returns (scored, pending), where pending counts
+    the unscored dates left over by the limit or by failed fetches, which
+    are retried on a later call.
+    """
+    # The newest day is still being filled in upstream
+    end = min(end, datetime.utcnow().date() - timedelta(days=2))
+    tile = preview_tile(lat, lon)
+    known = scores(lat, lon, begin, end, layer, include_missing=True)
+    missing = [end - timedelta(days=i) for i in range((end - begin).days + 1)]
+    missing = [day for day in missing if day not in known]
+    pending = max(0, len(missing) - limit) if limit is not None else 0
+    if limit is not None:
+        missing = missing[:limit]
+
+    def fetch(day):
+        """(date, image); image is None without imagery and False when the fetch failed"""
+        date = day.strftime('%Y-%m-%d')
+        try:
+            data, _, _ = earth_tiles.tile_cache.get(layer, date, *tile)
+        except earth_tiles.TileNotFound:
+            return date, None
+        except (earth_tiles.TileError, requests.RequestException, RateLimitExceeded) as e:
+            print(f"Error fetching cloud preview for {date}: {e}")
+            return date, False
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return date, None
+        if image.shape[:2] != (earth_tiles.TILE_SIZE, earth_tiles.TILE_SIZE):
+            image = cv2.resize(image, (earth_tiles.TILE_SIZE, earth_tiles.TILE_SIZE))
+        return date, image
+
+    def score_row(date, score):
+        row = earth_tiles.tile_row(layer, date, *tile)
+        row['cloud_score'] = score
+        return row
+
+    def upsert(rows):
+        bulk_upsert(EarthImagery, rows, ['layer', 'date', 'zoom', 'tile_x', 'tile_y'], ['cloud_score'])
+
+    scored = 0
+    batch = []
+    no_imagery = []
+
+    def flush():
+        dates, images = zip(*batch)
+        upsert([score_row(date, round(score, 4))
+                for date, score in zip(dates, cloud_fractions(np.stack(images)).tolist())])
+        batch.clear()
+        return len(dates)
+
+    for date, image in bounded_map(fetch, missing, FETCH_WINDOW):
+        if image is False:
+            pending += 1
+            continue
+        if image is None:
+            no_imagery.append(score_row(date, NO_IMAGERY))
+            continue
+        batch.append((date, image))
+        if len(batch) >= BATCH_SIZE:
+            scored += flush()
+            if progress:
+                progress(scored)
+    if batch:
+        scored += flush()
+    upsert(no_imagery)
+    return scored, pending
@@ -0,0 +1,29 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+def bounded_map(func, items, window=4):
+    """Yield func(item) for each item in order, keeping at most `window` calls in flight.
+
+    items may be unbounded (e.g. itertools.count()); only `window` results
+    are ever buffered. Closing the generator early cancels calls that have
+    not started yet.
+    """
+    items = iter(items)
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=window)
+    try:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= window:
+                break
+        while pending:
+            yield pending.popleft().result()
+            # Refill only once the consumer asks for more, so stopping early
+            # never starts calls past the window
+            for item in items:
+                pending.append(executor.submit(func, item))
+                break
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
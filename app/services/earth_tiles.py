@@ -0,0 +1,174 @@
+import os
+import shutil
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+from app import db
+from app.models import EarthImagery
+from app.services import geodesy
+from app.services.bulk import bulk_upsert
+from app.services.cache import NO_CACHE_POLICY
+from app.services.http_cache import is_historical
+from app.services.transport import get_transport
+
+load_dotenv()
+
+# WMTS REST template of a GIBS-style tile source (Web Mercator tile matrix sets)
+GIBS_WMTS_URL = os.getenv(
+    'GIBS_WMTS_URL',
+    'https://gibs.earthdata.nasa.gov/wmts/epsg3857/best/{layer}/default/{date}/'
+    'GoogleMapsCompatible_Level{max_zoom}/{z}/{y}/{x}.{ext}'
+)
+EARTH_TILE_DIR = os.getenv('EARTH_TILE_DIR', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'instance', 'earth_tiles'
+))
+
+# Layer name -> deepest zoom level served upstream and tile format
+LAYERS = {
+    'MODIS_Terra_CorrectedReflectance_TrueColor': {'max_zoom': 9, 'ext': 'jpg'},
+    'MODIS_Aqua_CorrectedReflectance_TrueColor': {'max_zoom': 9, 'ext': 'jpg'},
+    'VIIRS_SNPP_CorrectedReflectance_TrueColor': {'max_zoom': 9, 'ext': 'jpg'},
+}
+DEFAULT_LAYER = 'MODIS_Terra_CorrectedReflectance_TrueColor'
+MIMETYPES = {'jpg': 'image/jpeg', 'png': 'image/png'}
+TILE_SIZE = 256
+TILE_URL = '/earth/tiles/{layer}/{date}/{z}/{x}/{y}'
+MAX_TILE_BYTES = 4 * 1024 * 1024
+
+class TileError(ValueError):
+    pass
+
+class TileNotFound(TileError):
+    pass
+
+def check_tile(layer, date, z, x, y):
+    """Validate tile coordinates; returns the layer's settings"""
+    config = LAYERS.get(layer)
+    if config is None:
+        raise TileError(f"Unknown layer: {layer}")
+    try:
+        day = datetime.strptime(date, '%Y-%m-%d').date()
+    except ValueError:
+        raise TileError("Date must be YYYY-MM-DD")
+    if day > datetime.utcnow().date():
+        raise TileError("Cannot request imagery for future dates")
+    if not 0 <= z <= config['max_zoom']:
+        raise TileError(f"Zoom must be between 0 and {config['max_zoom']} for {layer}")
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise TileError("Tile is outside the zoom level")
+    return config
+
+def tile_url(layer, date, z, x, y):
+    """Local URL of a tile (the cached proxy, not the upstream source)"""
+    return TILE_URL.format(layer=layer, date=date, z=z, x=x, y=y)
+
+def tile_row(layer, date, z, x, y):
+    """EarthImagery column values for a cached tile"""
+    lat, lon = geodesy.tile_center(z, x, y)
+    return {
+        'layer': layer,
+        'date': datetime.strptime(date, '%Y-%m-%d').date(),
+        'zoom': z,
+        'tile_x': x,
+        'tile_y': y,
+        'latitude': lat,
+        'longitude': lon,
+        'image_url': tile_url(layer, date, z, x, y),
+        'created_at': datetime.utcnow()
+    }
+
+def record_tiles(tiles):
+    """Index cached (layer, date, z, x, y) tiles in EarthImagery; the caller commits"""
+    bulk_upsert(EarthImagery, [tile_row(*tile) for tile in tiles],
+                ['layer', 'date', 'zoom', 'tile_x', 'tile_y'])
+
+class TileCache:
+    """256 px imagery tiles fetched once from the WMTS source and kept on disk.
+
+    Files live under ``<date>/<layer>/<z>/<x>/<y>.<ext>``, so a whole
+    day can be dropped at once. Tiles of past days never change, so there
+    is no expiry; purge() removes old dates. The latest day is still
+    being filled in upstream and is passed through uncached.
+    """
+
+    def __init__(self, root=EARTH_TILE_DIR, source_url=GIBS_WMTS_URL):
+        self.root = root
+        self.source_url = source_url
+
+    def path(self, layer, date, z, x, y):
+        ext = LAYERS[layer]['ext']
+        return os.path.join(self.root, date, layer, str(z), str(x), f"{y}.{ext}")
+
+    def get(self, layer, date, z, x, y):
+        """Return (bytes, mimetype, stored); stored is True when the tile was newly cached"""
+        config = check_tile(layer, date, z, x, y)
+        mimetype = MIMETYPES[config['ext']]
+        path = self.path(layer, date, z, x, y)
+        try:
+            with open(path, 'rb') as f:
+                return f.read(), mimetype, False
+        except FileNotFoundError:
+            pass
+
+        data = self.fetch(layer, date, z, x, y, config)
+        if not is_historical(date):
+            return data, mimetype, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return data, mimetype, True
+
+    def fetch(self, layer, date, z, x, y, config):
+        url = self.source_url.format(layer=layer, date=date, z=z, x=x, y=y, **config)
+        response = get_transport().get(url, cache_policy=NO_CACHE_POLICY,
+                                       headers={'Accept': 'image/*'}, read_timeout=30)
+        # GIBS answers dates or tiles without imagery with 400/404 and an XML
+        # body; other errors are not a statement about the imagery
+        if response.status_code in (400, 404):
+            raise TileNotFound(f"No {layer} imagery for {date} at {z}/{x}/{y}")
+        response.raise_for_status()
+        if not response.headers.get('Content-Type', '').startswith('image/'):
+            raise TileNotFound(f"No {layer} imagery for {date} at {z}/{x}/{y}")
+        if len(response.content) > MAX_TILE_BYTES:
+            raise TileError("Tile is too large")
+        return response.content
+
+    def purge(self, before):
+        """Delete cached tiles for imagery dates before `before`; returns the days removed"""
+        removed = 0
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return 0
+        for name in names:
+            try:
+                day = datetime.strptime(name, '%Y-%m-%d').date()
+            except ValueError:
+                continue
+            if day < before:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+                removed += 1
+        return removed
+
+def purge(before):
+    """Drop tiles for dates before `before` from disk and from the index; the caller commits.
+
+    Rows with a cloud score are kept, since the score stays valid.
+    """
+    days = tile_cache.purge(before)
+    rows = EarthImagery.query.filter(EarthImagery.zoom.isnot(None),
+                                     EarthImagery.cloud_score.is_(None),
+                                     EarthImagery.date < before).delete(synchronize_session=False)
+    return days, rows
+
+def zoom_for_dim(dim, layer=DEFAULT_LAYER, tiles_across=3):
+    """Map zoom at which about tiles_across tiles span dim degrees of longitude"""
+    zoom = 0
+    while zoom < LAYERS[layer]['max_zoom'] and 360 / 2 ** (zoom + 1) * tiles_across >= dim:
+        zoom += 1
+    return zoom
+
+tile_cache = TileCache()
@@ -0,0 +1,265 @@
+from datetime import datetime, timedelta
+from functools import lru_cache
+import numpy as np
+from app import db
+from app.models import EarthEvent, SyncState
+from app.services.bulk import bulk_upsert
+from app.services import geodesy
+
+SYNC_STATE = 'eonet_events'
+RECHECK_STATE = 'eonet_open_recheck'
+# First sync pulls a year of events; later syncs re-read a small overlap
+# so events that gained geometry around the cursor are refreshed
+INITIAL_SYNC_DAYS = 365
+SYNC_OVERLAP = timedelta(days=2)
+# Pages trigger an incremental sync when the last attempt is older than this
+SYNC_INTERVAL = timedelta(minutes=10)
+# Stored open events outside the incremental window are re-polled this often
+OPEN_RECHECK_INTERVAL = timedelta(hours=1)
+SPATIAL_LIMIT = 500
+
+UPDATE_COLUMNS = ['title', 'description', 'category', 'latitude', 'longitude', 'geohash', 'date', 'source',
+                  'link', 'closed', 'categories', 'sources', 'geometry', 'updated_at']
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    return datetime.strptime(value[:19], '%Y-%m-%dT%H:%M:%S')
+
+def _point(geometry):
+    """(lat, lon) of a geometry; the first vertex for polygons"""
+    coordinates = geometry.get('coordinates')
+    while isinstance(coordinates, list) and coordinates and isinstance(coordinates[0], list):
+        coordinates = coordinates[0]
+    if not coordinates or len(coordinates) < 2:
+        return None, None
+    return coordinates[1], coordinates[0]
+
+def event_row(event, now=None):
+    """Map an EONET v3 event to EarthEvent column values"""
+    geometry = event.get('geometry') or []
+    categories = event.get('categories') or []
+    sources = event.get('sources') or []
+    first = geometry[0] if geometry else {}
+    lat, lon = _point(first)
+    now = now or datetime.utcnow()
+    return {
+        'event_id': event['id'],
+        'title': (event.get('title') or '')[:200],
+        'description': event.get('description'),
+        # Filtering uses the primary category, as events rarely have more
+        'category': categories[0]['id'] if categories else None,
+        'latitude': lat,
+        'longitude': lon,
+        'geohash': geodesy.geohash_encode(lat, lon) if lat is not None else None,
+        'date': _parse_datetime(first.get('date')),
+        'source': sources[0]['id'][:100] if sources else None,
+        'link': event.get('link'),
+        'closed': _parse_datetime(event.get('closed')),
+        'categories': categories,
+        'sources': sources,
+        'geometry': geometry,
+        'created_at': now,
+        'updated_at': now
+    }
+
+def to_eonet(event):
+    """Serialize an EarthEvent row in the EONET v3 event shape"""
+    return {
+        'id': event.event_id,
+        'title': event.title,
+        'description': event.description,
+        'link': event.link,
+        'closed': event.closed.strftime('%Y-%m-%dT%H:%M:%SZ') if event.closed else None,
+        'categories': event.categories or [],
+        'sources': event.sources or [],
+        'geometry': event.geometry or []
+    }
+
+def store_events(events):
+    """Upsert EONET events by event_id. The caller commits."""
+    now = datetime.utcnow()
+    rows = []
+    for event in events:
+        try:
+            rows.append(event_row(event, now))
+        except (KeyError, ValueError, TypeError) as e:
+            print(f"Error processing EONET event: {e}")
+    bulk_upsert(EarthEvent, rows, ['event_id'], UPDATE_COLUMNS)
+    return len(rows)
+
+def sync(api, full=False, category=None, days=INITIAL_SYNC_DAYS):
+    """Pull events changed since the last sync into EarthEvent.
+
+    Asks EONET for open and closed events with geometry dated from the
+    saved cursor (minus a small overlap) to today; the first or a full
+    sync starts `days` ago. Stored open events older than that window are
+    re-polled at most every OPEN_RECHECK_INTERVAL (always on a full sync).
+    Returns the number of events stored.
+    """
+    state = db.session.get(SyncState, SYNC_STATE) or SyncState(name=SYNC_STATE)
+    today = datetime.utcnow().date()
+    if state.cursor and not full:
+        start = datetime.strptime(state.cursor, '%Y-%m-%d').date() - SYNC_OVERLAP
+    else:
+        start = today - timedelta(days=days)
+
+    data = api.get_earth_events(status='all', start=start.strftime('%Y-%m-%d'),
+                                end=today.strftime('%Y-%m-%d'), category=category)
+    stored = store_events(data.get('events', []))
+    # A category-only sync does not advance the shared cursor
+    if not category:
+        state.cursor = today.strftime('%Y-%m-%d')
+        # Touch the row even when the cursor is unchanged, to mark this sync
+        state.updated_at = datetime.utcnow()
+        db.session.add(state)
+    db.session.commit()
+    if not category and (full or _claim(RECHECK_STATE, OPEN_RECHECK_INTERVAL)):
+        recheck_open(api, start)
+        db.session.commit()
+    return stored
+
+def recheck_open(api, before):
+    """Re-poll stored open events dated before `before` in case EONET has closed them.
+
+    EONET's start/end select events by geometry date, so an event whose
+    last geometry predates the incremental window is never returned by it
+    again, even after it closes. One status=closed query over the span of
+    those events catches them. Returns the number of events updated; the
+    caller commits.
+    """
+    cutoff = datetime.combine(before, datetime.min.time())
+    rows = db.session.query(EarthEvent.event_id, EarthEvent.date)\
+        .filter(EarthEvent.closed.is_(None), db.or_(EarthEvent.date < cutoff, EarthEvent.date.is_(None))).all()
+    if not rows:
+        return 0
+    open_ids = {event_id for event_id, _ in rows}
+    dates = [event_date for _, event_date in rows if event_date is not None]
+    start = min(dates).date() if dates else before - timedelta(days=INITIAL_SYNC_DAYS)
+    data = api.get_earth_events(status='closed', start=start.strftime('%Y-%m-%d'),
+                                end=datetime.utcnow().date().strftime('%Y-%m-%d'))
+    return store_events([event for event in data.get('events', []) if event.get('id') in open_ids])
+
+def _claim(name, interval):
+    """Mark a job as attempted now unless some worker did so within interval; True if claimed.
+
+    The conditional UPDATE is atomic, so of several workers (or threads)
+    finding the job due, one runs it. The attempt time is recorded up
+    front, so a failing upstream is not retried by every request.
+    """
+    now = datetime.utcnow()
+    bulk_upsert(SyncState, [{'name': name, 'cursor': None, 'updated_at': None}], ['name'])
+    result = db.session.execute(
+        db.update(SyncState)
+        .where(SyncState.name == name,
+               db.or_(SyncState.updated_at.is_(None), SyncState.updated_at <= now - interval))
+        .values(updated_at=now)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+def sync_if_stale(api):
+    """Run an incremental sync if no worker has attempted one within SYNC_INTERVAL"""
+    state = db.session.get(SyncState, SYNC_STATE)
+    if state and state.updated_at and state.updated_at > datetime.utcnow() - SYNC_INTERVAL:
+        return
+    try:
+        if not _claim(SYNC_STATE, SYNC_INTERVAL):
+            return
+        sync(api)
+    except Exception as e:
+        print(f"Error syncing EONET events: {e}")
+        db.session.rollback()
+
+def _filtered(query, category=None, days=None, status='open'):
+    if category:
+        query = query.filter(EarthEvent.category == category)
+    if days:
+        query = query.filter(EarthEvent.date > datetime.utcnow() - timedelta(days=days))
+    if status == 'open':
+        query = query.filter(EarthEvent.closed.is_(None))
+    elif status == 'closed':
+        query = query.filter(EarthEvent.closed.isnot(None))
+    return query
+
+def query_events(category=None, days=None, status='open', limit=None):
+    """Stored events newest first, filtered in SQL by category, age and status"""
+    query = _filtered(EarthEvent.query, category, days, status).order_by(EarthEvent.date.desc())
+    if limit:
+        query = query.limit(limit)
+    return [to_eonet(event) for event in query]
+
+@lru_cache(maxsize=256)
+def _box_statement(prefix_count, box_count, category, days, status, columns):
+    """Core SELECT for one query shape, built once; values are bound per call.
+
+    The geohash prefix ranges drive index range scans and the coordinate
+    ranges make the box test exact. Reusing the statement skips rebuilding
+    the expression, which otherwise costs more than running the query.
+    """
+    table = EarthEvent.__table__
+    prefix_ranges = [db.and_(table.c.geohash >= db.bindparam(f'prefix_{i}'),
+                             table.c.geohash < db.bindparam(f'prefix_end_{i}'))
+                     for i in range(prefix_count)]
+    coordinates = [db.and_(table.c.latitude.between(db.bindparam(f'south_{i}'), db.bindparam(f'north_{i}')),
+                           table.c.longitude.between(db.bindparam(f'west_{i}'), db.bindparam(f'east_{i}')))
+                   for i in range(box_count)]
+    stmt = db.select(*(table.c[name] for name in columns))\
+        .where(db.or_(*prefix_ranges), db.or_(*coordinates))
+    if category:
+        stmt = stmt.where(table.c.category == db.bindparam('category'))
+    if days:
+        stmt = stmt.where(table.c.date > db.bindparam('since'))
+    if status == 'open':
+        stmt = stmt.where(table.c.closed.is_(None))
+    elif status == 'closed':
+        stmt = stmt.where(table.c.closed.isnot(None))
+    return stmt
+
+def _box_rows(south, west, north, east, columns, category=None, days=None, status='open'):
+    """Rows (of columns) of stored events inside a box, via the geohash index"""
+    prefixes = geodesy.covering_prefixes(south, west, north, east)
+    boxes = geodesy.split_bbox(south, west, north, east)
+    params = {}
+    for i, prefix in enumerate(prefixes):
+        params[f'prefix_{i}'] = prefix
+        params[f'prefix_end_{i}'] = prefix + geodesy.GEOHASH_UPPER
+    for i, (box_south, box_west, box_north, box_east) in enumerate(boxes):
+        params.update({f'south_{i}': box_south, f'west_{i}': box_west,
+                       f'north_{i}': box_north, f'east_{i}': box_east})
+    if category:
+        params['category'] = category
+    if days:
+        params['since'] = datetime.utcnow() - timedelta(days=days)
+    stmt = _box_statement(len(prefixes), len(boxes), bool(category), bool(days), status, columns)
+    return db.session.execute(stmt, params).all()
+
+def _load(ids):
+    """EarthEvent rows for ids, in the order of ids"""
+    rows = {event.id: event for event in EarthEvent.query.filter(EarthEvent.id.in_(ids))}
+    return [rows[event_id] for event_id in ids if event_id in rows]
+
+def nearest_ids(lat, lon, radius_km, limit=SPATIAL_LIMIT, **filters):
+    """(ids, distances_km) of stored events within radius_km, closest first"""
+    rows = _box_rows(*geodesy.radius_bbox(lat, lon, radius_km), ('id', 'latitude', 'longitude'), **filters)
+    candidates = np.array(rows, dtype=np.float64).reshape(-1, 3)
+    distances = geodesy.haversine_km(lat, lon, candidates[:, 1], candidates[:, 2])
+    inside = np.flatnonzero(distances <= radius_km)
+    order = inside[np.argsort(distances[inside], kind='stable')][:limit]
+    return candidates[order, 0].astype(np.int64).tolist(), distances[order].tolist()
+
+def bbox_ids(south, west, north, east, limit=SPATIAL_LIMIT, **filters):
+    """Ids of stored events inside a box, newest first"""
+    rows = _box_rows(south, west, north, east, ('id', 'date'), **filters)
+    rows.sort(key=lambda row: (row.date is not None, row.date), reverse=True)
+    return [row.id for row in rows[:limit]]
+
+def near(lat, lon, radius_km, limit=SPATIAL_LIMIT, **filters):
+    """Stored events within radius_km of (lat, lon), closest first, with distance_km"""
+    ids, distances = nearest_ids(lat, lon, radius_km, limit, **filters)
+    distance_by_id = dict(zip(ids, distances))
+    return [dict(to_eonet(event), distance_km=round(distance_by_id[event.id], 3)) for event in _load(ids)]
+
+def within_bbox(south, west, north, east, limit=SPATIAL_LIMIT, **filters):
+    """Stored events inside a box, newest first; west > east crosses the antimeridian"""
+    return [to_eonet(event) for event in _load(bbox_ids(south, west, north, east, limit, **filters))]
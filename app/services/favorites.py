@@ -0,0 +1,88 @@
+from datetime import datetime
+from app import db
+from app.models import Favorite
+from app.services.bulk import bulk_upsert
+from app.services.user_cache import mark_changed
+
+PER_PAGE = 8
+# Keep IN lists well below the bound-parameter limits of every backend
+MAX_IDS_PER_QUERY = 500
+
+def _chunks(values, size=MAX_IDS_PER_QUERY):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def favorited_ids(user_id, nasa_ids):
+    """The subset of nasa_ids the user has favorited, in one IN query per 500 ids"""
+    nasa_ids = list(dict.fromkeys(str(nasa_id) for nasa_id in nasa_ids))
+    found = set()
+    for chunk in _chunks(nasa_ids):
+        rows = db.session.query(Favorite.nasa_id)\
+            .filter(Favorite.user_id == user_id, Favorite.nasa_id.in_(chunk))
+        found.update(nasa_id for nasa_id, in rows)
+    return found
+
+def favorited_by(user, nasa_ids):
+    """favorited_ids for a logged-in user, through the snapshot's remembered states when there is one"""
+    nasa_ids = list(dict.fromkeys(str(nasa_id) for nasa_id in nasa_ids))
+    favorited = getattr(user, 'favorited', None)
+    if favorited is None:
+        return favorited_ids(user.id, nasa_ids)
+    return favorited(nasa_ids, lambda missing: favorited_ids(user.id, missing))
+
+def is_favorited(user, nasa_id):
+    return str(nasa_id) in favorited_by(user, [nasa_id])
+
+def toggle(user_id, items):
+    """Flip the favorite state of many items at once.
+
+    items are dicts with nasa_id, title and image_url. Favorited items are
+    removed with one DELETE, the rest inserted with one executemany.
+    Returns {nasa_id: is_favorite}. The caller commits.
+    """
+    items = {str(item['nasa_id']): item for item in items}
+    existing = favorited_ids(user_id, items)
+
+    for chunk in _chunks(list(existing)):
+        Favorite.query.filter(Favorite.user_id == user_id, Favorite.nasa_id.in_(chunk))\
+            .delete(synchronize_session=False)
+
+    now = datetime.utcnow()
+    # Concurrent toggles of the same item are resolved by the unique constraint
+    bulk_upsert(Favorite, [{
+        'user_id': user_id,
+        'nasa_id': nasa_id,
+        'title': (item.get('title') or '')[:200],
+        'image_url': item.get('image_url') or '',
+        'created_at': now
+    } for nasa_id, item in items.items() if nasa_id not in existing], ['user_id', 'nasa_id'])
+
+    # Bulk statements bypass the ORM events that invalidate the user cache
+    mark_changed(db.session, user_id)
+    return {nasa_id: nasa_id not in existing for nasa_id in items}
+
+def encode_cursor(favorite):
+    return f"{favorite.created_at.isoformat()}_{favorite.id}"
+
+def decode_cursor(cursor):
+    created_at, favorite_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(created_at), int(favorite_id)
+
+def page(user_id, after=None, limit=PER_PAGE):
+    """Keyset page of a user's favorites, newest first.
+
+    after is the cursor of the last favorite on the previous page. Returns
+    (favorites, next_cursor); next_cursor is None on the last page. Served
+    by the (user_id, created_at, id) index without OFFSET or COUNT.
+    """
+    query = Favorite.query.filter(Favorite.user_id == user_id)
+    if after:
+        created_at, favorite_id = decode_cursor(after)
+        query = query.filter(db.or_(
+            Favorite.created_at < created_at,
+            db.and_(Favorite.created_at == created_at, Favorite.id < favorite_id)
+        ))
+    favorites = query.order_by(Favorite.created_at.desc(), Favorite.id.desc())\
+        .limit(limit + 1).all()
+    next_cursor = encode_cursor(favorites[limit - 1]) if len(favorites) > limit else None
+    return favorites[:limit], next_cursor
@@ -0,0 +1,127 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Every geohash character sorts below this, so [prefix, prefix + '{') is
+# exactly the set of hashes starting with prefix
+GEOHASH_UPPER = '{'
+GEOHASH_PRECISION = 9
+MAX_COVER_CELLS = 32
+# Web Mercator stops here so the map is square
+MERCATOR_MAX_LAT = 85.0511287798
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; arguments broadcast like NumPy arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64))
+                              for value in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def footprint_radius_km(altitude_km, min_elevation=0.0):
+    """Great-circle radius of the ground area that sees a satellite above min_elevation degrees"""
+    elevation = np.radians(np.asarray(min_elevation, dtype=np.float64))
+    altitude = np.asarray(altitude_km, dtype=np.float64)
+    central_angle = np.arccos(EARTH_RADIUS_KM * np.cos(elevation) / (EARTH_RADIUS_KM + altitude)) - elevation
+    return EARTH_RADIUS_KM * np.maximum(central_angle, 0)
+
+def geohash_encode(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+def geohash_cell_size(precision):
+    """(height, width) in degrees of a geohash cell"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180 / 2 ** lat_bits, 360 / 2 ** lon_bits
+
+def split_bbox(south, west, north, east):
+    """Boxes not crossing the antimeridian; west > east means it is crossed"""
+    south, north = max(south, -90.0), min(north, 90.0)
+    if west <= east:
+        return [(south, max(west, -180.0), north, min(east, 180.0))]
+    return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+def _cells(south, west, north, east, precision):
+    height, width = geohash_cell_size(precision)
+    rows = range(int((south + 90) // height), int(min(north + 90, 180 - 1e-9) // height) + 1)
+    cols = range(int((west + 180) // width), int(min(east + 180, 360 - 1e-9) // width) + 1)
+    return rows, cols, height, width
+
+def covering_prefixes(south, west, north, east, max_cells=MAX_COVER_CELLS):
+    """Geohash prefixes whose cells together cover the box.
+
+    Uses the longest prefix length that needs at most max_cells cells, so
+    each prefix becomes one short index range scan.
+    """
+    boxes = split_bbox(south, west, north, east)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        covers = [_cells(*box, precision) for box in boxes]
+        if sum(len(rows) * len(cols) for rows, cols, _, _ in covers) <= max_cells:
+            break
+    prefixes = set()
+    for rows, cols, height, width in covers:
+        for row in rows:
+            for col in cols:
+                prefixes.add(geohash_encode((row + 0.5) * height - 90, (col + 0.5) * width - 180, precision))
+    return sorted(prefixes)
+
+def radius_bbox(lat, lon, radius_km):
+    """(south, west, north, east) enclosing a circle; whole longitudes near the poles"""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    south, north = lat - dlat, lat + dlat
+    if south <= -90 or north >= 90:
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    dlon = math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) /
+                                      math.cos(math.radians(lat)))))
+    if dlon >= 180:
+        return south, -180.0, north, 180.0
+    west, east = lon - dlon, lon + dlon
+    # Wrap into [-180, 180]; west > east then marks an antimeridian crossing
+    west = (west + 180) % 360 - 180
+    east = (east + 180) % 360 - 180
+    return south, west, north, east
+
+def tile_for(lat, lon, zoom):
+    """(x, y) of the Web Mercator (XYZ) tile containing a point"""
+    n = 2 ** zoom
+    lat = math.radians(max(-MERCATOR_MAX_LAT, min(MERCATOR_MAX_LAT, lat)))
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(lat)) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def mercator_pixel(lat, lon, zoom, tile_size=256):
+    """(x, y) pixel position of a point in the Web Mercator world image at zoom"""
+    world = tile_size * 2 ** zoom
+    lat = math.radians(max(-MERCATOR_MAX_LAT, min(MERCATOR_MAX_LAT, lat)))
+    return (lon + 180) / 360 * world, (1 - math.asinh(math.tan(lat)) / math.pi) / 2 * world
+
+def tile_center(zoom, x, y):
+    """(lat, lon) at the center of a Web Mercator tile"""
+    n = 2 ** zoom
+    lon = (x + 0.5) / n * 360 - 180
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 0.5) / n))))
+    return lat, lon
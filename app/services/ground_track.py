@@ -0,0 +1,69 @@
+import math
+import time
+from functools import lru_cache
+import numpy as np
+from app.services import geodesy, orbit
+from app.services.iss_passes import current_elements
+
+# Tracks start at the beginning of a bucket, so every request within the
+# same minute shares one computation
+TRACK_BUCKET = 60
+MAX_ORBITS = 16
+MIN_STEP, MAX_STEP = 5.0, 300.0
+
+def bucket_start(now=None, bucket=TRACK_BUCKET):
+    now = time.time() if now is None else now
+    return math.floor(now / bucket) * bucket
+
+def antimeridian_segments(lats, lons):
+    """[[lat, lon], ...] runs of a track, split where it wraps around +-180"""
+    breaks = np.nonzero(np.abs(np.diff(lons)) > 180)[0] + 1
+    return [np.column_stack(part).tolist()
+            for part in zip(np.split(lats, breaks), np.split(lons, breaks)) if len(part[0])]
+
+@lru_cache(maxsize=64)
+def _ground_track(elements, start, orbits, step):
+    period = orbit.SECONDS_PER_DAY / elements.mean_motion
+    times = start + np.arange(0, orbits * period + step, step)
+    lats, lons, alts = orbit.subsatellite_points(elements, times)
+    lats, lons = lats.round(4), lons.round(4)
+    return {
+        'start': int(start),
+        'step': step,
+        'orbits': orbits,
+        'period_minutes': round(period / 60, 2),
+        'tle_epoch': elements.epoch_datetime.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'timestamps': times.astype(int).tolist(),
+        'latitudes': lats.tolist(),
+        'longitudes': lons.tolist(),
+        'altitudes': alts.round(1).tolist(),
+        'footprint_radius_km': geodesy.footprint_radius_km(alts).round(1).tolist(),
+        'segments': antimeridian_segments(lats, lons)
+    }
+
+def ground_track(orbits=2, step=30.0, now=None):
+    """Sub-satellite points and footprint radii for the next `orbits` orbits.
+
+    Sampled every `step` seconds from the start of the current time
+    bucket; the result is shared by every caller in that bucket. Raises
+    StaleElementsError rather than propagate missing or old elements.
+    """
+    if not 1 <= orbits <= MAX_ORBITS:
+        raise ValueError(f"orbits must be between 1 and {MAX_ORBITS}")
+    if not MIN_STEP <= step <= MAX_STEP:
+        raise ValueError(f"step must be between {MIN_STEP:g} and {MAX_STEP:g} seconds")
+    start = bucket_start(now)
+    return _ground_track(current_elements(start), start, int(orbits), float(step))
+
+def visible_from(points, times, min_elevation=0.0, elements=None):
+    """Which observers see the ISS when: a boolean array of shape (len(times), len(points)).
+
+    points are (lat, lon) pairs. An observer sees the station while its
+    great-circle distance to the sub-satellite point is inside the
+    footprint for min_elevation degrees (spherical Earth).
+    """
+    elements = elements or current_elements()
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    lats, lons, alts = orbit.subsatellite_points(elements, np.atleast_1d(times))
+    distance = geodesy.haversine_km(lats[:, None], lons[:, None], points[None, :, 0], points[None, :, 1])
+    return distance <= geodesy.footprint_radius_km(alts, min_elevation)[:, None]
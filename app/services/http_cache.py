@@ -0,0 +1,67 @@
+import hashlib
+import json
+from datetime import date, datetime, timedelta
+from flask import request, session, make_response, jsonify
+from flask_login import current_user
+
+ONE_YEAR = 365 * 24 * 3600
+RECENT_MAX_AGE = 300
+
+def compute_etag(*parts):
+    """Strong ETag over JSON-serializable parts (rows, payloads, parameters)"""
+    data = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+def is_historical(day, margin_days=1):
+    """True if content for `day` can no longer change (NASA publishes on US time)"""
+    if day is None:
+        return False
+    if isinstance(day, str):
+        try:
+            day = datetime.strptime(day, '%Y-%m-%d').date()
+        except ValueError:
+            return False
+    if isinstance(day, datetime):
+        day = day.date()
+    return day < date.today() - timedelta(days=margin_days)
+
+def _apply_headers(response, etag, historical, per_user):
+    response.set_etag(etag)
+    if per_user and current_user.is_authenticated:
+        response.cache_control.private = True
+        response.cache_control.max_age = RECENT_MAX_AGE
+    else:
+        response.cache_control.public = True
+        if historical:
+            response.cache_control.max_age = ONE_YEAR
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.max_age = RECENT_MAX_AGE
+    if per_user:
+        response.vary.add('Cookie')
+    return response
+
+def conditional_response(etag_source, build, historical=False, per_user=False):
+    """Answer If-None-Match with 304 before building the body, else build and tag it.
+
+    etag_source is the data the body is derived from (a row or payload).
+    per_user marks HTML pages whose layout depends on the login state (the
+    navbar): their ETag includes the user id, and logged-in responses are
+    private so shared caches only ever store the anonymous variant. Pages
+    with pending flash messages are never cached.
+    """
+    if session.get('_flashes'):
+        return make_response(build())
+
+    user_key = current_user.get_id() if per_user and current_user.is_authenticated else None
+    etag = compute_etag(etag_source, user_key)
+
+    if request.if_none_match.contains(etag):
+        return _apply_headers(make_response('', 304), etag, historical, per_user)
+
+    response = make_response(build())
+    return _apply_headers(response, etag, historical, per_user)
+
+def conditional_json(payload, historical=False):
+    """JSON response for payload with a content ETag; 304 if the client has it"""
+    return conditional_response(payload, lambda: jsonify(payload), historical=historical)
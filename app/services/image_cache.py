@@ -0,0 +1,198 @@
+import hashlib
+import io
+import os
+import threading
+from urllib.parse import urljoin, urlparse
+from dotenv import load_dotenv
+from PIL import Image
+from app.services.cache import NO_CACHE_POLICY
+from app.services.transport import get_transport
+
+load_dotenv()
+
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'instance', 'image_cache'
+))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_MB', 2048)) * 1024 * 1024
+
+SIZE_BUCKETS = (256, 512, 1024)
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+MAX_SOURCE_BYTES = 40 * 1024 * 1024
+MAX_REDIRECTS = 5
+
+class ImageProxyError(ValueError):
+    pass
+
+def is_allowed_source(src):
+    """Only NASA-hosted images are proxied"""
+    try:
+        parsed = urlparse(src)
+    except ValueError:
+        return False
+    host = (parsed.hostname or '').lower()
+    return parsed.scheme in ('http', 'https') and (host == 'nasa.gov' or host.endswith('.nasa.gov'))
+
+def open_source(src):
+    """Stream src, following redirects only while every hop stays on an allowed host"""
+    if not is_allowed_source(src):
+        raise ImageProxyError("Only NASA-hosted images can be proxied")
+    url = src
+    for _ in range(MAX_REDIRECTS + 1):
+        response = get_transport().get(url, cache_policy=NO_CACHE_POLICY, stream=True, allow_redirects=False,
+                                       headers={'Accept': 'image/*'}, read_timeout=30)
+        if not response.is_redirect:
+            return response
+        url = urljoin(url, response.headers['Location'])
+        response.close()
+        if not is_allowed_source(url):
+            raise ImageProxyError("Source image redirected to a disallowed host")
+    raise ImageProxyError("Source image redirected too many times")
+
+def size_bucket(width):
+    """Snap a requested width up to the nearest bucket"""
+    for bucket in SIZE_BUCKETS:
+        if width <= bucket:
+            return bucket
+    return SIZE_BUCKETS[-1]
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+class ImageCache:
+    """Content-addressed on-disk image cache with LRU size eviction.
+
+    Originals are stored under the hash of their bytes, with a small index
+    file mapping each source URL to that hash; thumbnails are stored under
+    a hash of (original hash, width, format), which doubles as the ETag.
+    File mtimes are bumped on every hit so eviction removes the least
+    recently used files first.
+    """
+
+    def __init__(self, root=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None
+
+    def _path(self, kind, key, ext=''):
+        return os.path.join(self.root, kind, key[:2], key + ext)
+
+    def _read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data)
+        self._evict_if_needed()
+
+    def _files(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith('.tmp'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def _evict_if_needed(self):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._files())
+            if self._size <= self.max_bytes:
+                return
+            # Evict down to 90% so eviction scans stay rare
+            target = self.max_bytes * 0.9
+            for _, size, path in sorted(self._files()):
+                if self._size <= target:
+                    break
+                try:
+                    os.remove(path)
+                    self._size -= size
+                except FileNotFoundError:
+                    pass
+
+    def get_source(self, src):
+        """Original bytes of src and their content hash, fetched upstream only once"""
+        url_key = _sha256(src.encode())
+        index_path = self._path('urls', url_key)
+        content_key = self._read(index_path)
+        if content_key:
+            content_key = content_key.decode()
+            data = self._read(self._path('originals', content_key))
+            if data is not None:
+                return data, content_key
+
+        response = open_source(src)
+        try:
+            response.raise_for_status()
+            data = response.raw.read(MAX_SOURCE_BYTES + 1, decode_content=True)
+        finally:
+            response.close()
+        if len(data) > MAX_SOURCE_BYTES:
+            raise ImageProxyError("Source image is too large")
+
+        content_key = _sha256(data)
+        self._write(self._path('originals', content_key), data)
+        self._write(index_path, content_key.encode())
+        return data, content_key
+
+    def get_thumbnail(self, src, width, fmt):
+        """Return (bytes, etag, mimetype) for a size-bucketed thumbnail of src"""
+        if fmt not in FORMATS:
+            raise ImageProxyError(f"Unsupported format: {fmt}")
+        width = size_bucket(width)
+        pil_format, mimetype, save_options = FORMATS[fmt]
+
+        url_key = _sha256(src.encode())
+        content_key = self._read(self._path('urls', url_key))
+        if content_key:
+            thumb_key = _sha256(f"{content_key.decode()}:{width}:{fmt}".encode())
+            data = self._read(self._path('thumbs', thumb_key, '.' + fmt))
+            if data is not None:
+                return data, thumb_key, mimetype
+
+        source, content_key = self.get_source(src)
+        thumb_key = _sha256(f"{content_key}:{width}:{fmt}".encode())
+        data = render_thumbnail(source, width, pil_format, save_options)
+        self._write(self._path('thumbs', thumb_key, '.' + fmt), data)
+        return data, thumb_key, mimetype
+
+def render_thumbnail(source, width, pil_format, save_options):
+    """Downscale image bytes so the longer side is at most width"""
+    try:
+        image = Image.open(io.BytesIO(source))
+        # For JPEGs, let the decoder scale by 1/2..1/8 during decoding
+        # instead of decoding the full-resolution image
+        image.draft('RGB', (width, width))
+        image.thumbnail((width, width), Image.LANCZOS)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ImageProxyError(f"Cannot decode image: {e}")
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    output = io.BytesIO()
+    image.save(output, pil_format, **save_options)
+    return output.getvalue()
+
+image_cache = ImageCache()
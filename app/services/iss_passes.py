@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from app.services import orbit
+from app.services.cache import NO_CACHE_POLICY
+from app.services.transport import get_transport
+
+load_dotenv()
+
+TLE_PATH = os.getenv('ISS_TLE_PATH', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'instance', 'iss_tle.txt'
+))
+TLE_URL = os.getenv('ISS_TLE_URL', 'https://celestrak.org/NORAD/elements/gp.php?CATNR=25544&FORMAT=TLE')
+# Stored elements older than this are refreshed in the background (one
+# attempt per hour); predictions from elements older than TLE_MAX_AGE are
+# refused rather than shown with made-up times
+TLE_REFRESH_AFTER = 86400
+TLE_MAX_AGE = 3 * 86400
+TLE_RETRY_AFTER = 3600
+
+PASS_COUNT = 10
+MIN_ELEVATION = 10.0
+HORIZON_HOURS = 72
+# Observers in the same 0.1 degree cell (about 11 km) share predictions;
+# entries are recomputed after 12 hours so the horizon stays ahead
+CELL_DEG = 0.1
+CACHE_REFRESH = 12 * 3600
+CACHE_MAX_ENTRIES = 4096
+
+def parse_tle_text(text, verify_checksum=True):
+    lines = [line.rstrip() for line in text.strip().splitlines() if line.strip()]
+    for i in range(len(lines) - 1):
+        if lines[i].startswith('1 ') and lines[i + 1].startswith('2 '):
+            name = lines[i - 1].strip() if i > 0 else None
+            return orbit.parse_tle(lines[i], lines[i + 1], name=name, verify_checksum=verify_checksum)
+    raise orbit.TLEError("No two-line element set found")
+
+def write_tle(elements, path=TLE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(f"{elements.name or 'ISS (ZARYA)'}\n{elements.line1}\n{elements.line2}\n")
+    os.replace(tmp_path, path)
+
+def update_tle(text=None, url=TLE_URL, path=TLE_PATH):
+    """Store the current ISS elements, downloaded from url unless text is given"""
+    if text is None:
+        response = get_transport().get(url, cache_policy=NO_CACHE_POLICY, read_timeout=10,
+                                       headers={'Accept': 'text/plain'})
+        response.raise_for_status()
+        text = response.text
+    elements = parse_tle_text(text)
+    write_tle(elements, path)
+    return elements
+
+class StaleElementsError(orbit.TLEError):
+    pass
+
+class TLEStore:
+    """The ISS elements from the TLE file, re-read when the file changes.
+
+    Old or missing elements are refreshed from TLE_URL on a background
+    thread, so no request waits on the download or the lock.
+    """
+
+    def __init__(self, path=TLE_PATH, check_interval=60):
+        self.path = path
+        self.check_interval = check_interval
+        self._elements = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._refresh_attempted_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        if mtime is None:
+            self._elements = None
+        else:
+            try:
+                with open(self.path) as f:
+                    self._elements = parse_tle_text(f.read())
+            except (OSError, orbit.TLEError) as e:
+                print(f"Error reading ISS TLE file: {e}")
+        self._mtime = mtime
+
+    def _refresh_due(self, now):
+        if self._elements is not None and now - self._elements.epoch < TLE_REFRESH_AFTER:
+            return False
+        return not self._refreshing and now - self._refresh_attempted_at >= TLE_RETRY_AFTER
+
+    def _refresh(self):
+        try:
+            update_tle(path=self.path)
+        except Exception as e:
+            print(f"Error refreshing ISS TLE: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+                # Re-read the file on the next call
+                self._checked_at = 0.0
+
+    def elements(self):
+        """The stored elements, or None before any have been stored"""
+        now = time.time()
+        if now - self._checked_at < self.check_interval:
+            return self._elements
+        with self._lock:
+            self._load()
+            self._checked_at = now
+            if self._refresh_due(now):
+                self._refreshing = True
+                self._refresh_attempted_at = now
+                threading.Thread(target=self._refresh, name='iss-tle-refresh', daemon=True).start()
+            return self._elements
+
+def current_elements(now=None):
+    """Elements recent enough for predictions; raises StaleElementsError otherwise"""
+    now = time.time() if now is None else now
+    elements = tle_store.elements()
+    if elements is None:
+        raise StaleElementsError("No ISS orbital elements stored yet; run 'flask iss update-tle'")
+    if now - elements.epoch > TLE_MAX_AGE:
+        raise StaleElementsError(f"ISS orbital elements are {(now - elements.epoch) / 86400:.0f} days old; "
+                                 "run 'flask iss update-tle'")
+    return elements
+
+def cell_of(lat, lon):
+    return round(lat / CELL_DEG), round(lon / CELL_DEG)
+
+class PassCache:
+    """Predicted passes per (grid cell, TLE epoch), least recently used evicted"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not 0 <= now - entry[0] <= CACHE_REFRESH:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, passes, computed_at):
+        with self._lock:
+            self._entries[key] = (computed_at, passes)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+tle_store = TLEStore()
+pass_cache = PassCache()
+
+def predict_many(points, count=PASS_COUNT, now=None, elements=None):
+    """Upcoming passes for many (lat, lon) observers.
+
+    Cells missing from the cache are computed together in one batched
+    find_passes call. Returns one list of pass dicts per point.
+    """
+    now = time.time() if now is None else now
+    elements = elements or current_elements(now)
+    keys = [(*cell_of(lat, lon), elements.epoch) for lat, lon in points]
+
+    found = {key: pass_cache.get(key, now) for key in set(keys)}
+    missing = [key for key, passes in found.items() if passes is None]
+    if missing:
+        computed = orbit.find_passes(elements,
+                                     [key[0] * CELL_DEG for key in missing],
+                                     [key[1] * CELL_DEG for key in missing],
+                                     start=now, hours=HORIZON_HOURS, min_elevation=MIN_ELEVATION)
+        for key, passes in zip(missing, computed):
+            pass_cache.put(key, passes, now)
+            found[key] = passes
+
+    return [[p for p in found[key] if p['set'] > now][:count] for key in keys]
+
+def pass_predictions(lat, lon, count=PASS_COUNT, now=None):
+    """Upcoming passes of one observer in the shape of open-notify's iss-pass.json.
+
+    Without recent elements the response is empty and the message says why.
+    """
+    now = time.time() if now is None else now
+    request = {
+        'latitude': lat,
+        'longitude': lon,
+        'altitude': 0,
+        'passes': count,
+        'datetime': int(now),
+        'min_elevation': MIN_ELEVATION
+    }
+    try:
+        elements = current_elements(now)
+    except StaleElementsError as e:
+        return {'message': str(e), 'request': request, 'response': []}
+
+    passes = predict_many([(lat, lon)], count, now, elements)[0]
+    request['tle_epoch'] = elements.epoch_datetime.strftime('%Y-%m-%dT%H:%M:%SZ')
+    return {
+        'message': 'success',
+        'request': request,
+        'response': [{
+            'risetime': int(round(p['rise'])),
+            'duration': int(round(p['set'] - p['rise'])),
+            'max_elevation': round(p['max_elevation'], 1),
+            'culmination': int(round(p['culmination'])),
+            'settime': int(round(p['set']))
+        } for p in passes]
+    }
@@ -0,0 +1,277 @@
+import json
+import os
+import threading
+import time
+import uuid
+import numpy as np
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, every worker polls
+    fcntl = None
+
+load_dotenv()
+
+POLL_INTERVAL = float(os.getenv('ISS_POLL_INTERVAL', 5))               # seconds between upstream calls
+TRACK_MINUTES = float(os.getenv('ISS_TRACK_MINUTES', 360))             # history kept in the ring buffer
+TRACK_CAPACITY = max(1, int(TRACK_MINUTES * 60 / POLL_INTERVAL))
+TRACKER_BACKEND = os.getenv('ISS_TRACKER_BACKEND', 'file')
+TRACKER_DIR = os.getenv('ISS_TRACKER_DIR', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'instance', 'iss_tracker'
+))
+TRACKER_REDIS_URL = os.getenv('ISS_TRACKER_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+
+# Followers check the shared store this often for the leader's new samples
+FOLLOW_INTERVAL = 1.0
+# A sample older than a few missed polls is not shown as the live position
+STALE_AFTER = POLL_INTERVAL * 4
+
+def is_stale(sample, now=None):
+    return (now or time.time()) - sample[0] > STALE_AFTER
+
+def position_payload(sample, now=None):
+    """A (timestamp, lat, lon) sample in the open-notify iss-now shape, flagged when stale"""
+    timestamp, lat, lon = sample
+    return {
+        'message': 'success',
+        'timestamp': int(timestamp),
+        'iss_position': {'latitude': f"{lat:.4f}", 'longitude': f"{lon:.4f}"},
+        'stale': is_stale(sample, now)
+    }
+
+class RingBuffer:
+    """Fixed-size (timestamp, lat, lon) history; the oldest rows are overwritten"""
+
+    def __init__(self, capacity=TRACK_CAPACITY, data=None):
+        self.data = np.zeros((capacity, 3)) if data is None else data
+        self.capacity = len(self.data)
+        self.head = 0
+        self.count = 0
+
+    def append(self, sample):
+        self.data[self.head] = sample
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def ordered(self, head=None, count=None):
+        """Rows oldest first (optionally for a head/count published by another process)"""
+        head = self.head if head is None else head
+        count = self.count if count is None else min(count, self.capacity)
+        start = (head - count) % self.capacity
+        if start + count <= self.capacity:
+            return self.data[start:start + count].copy()
+        return np.concatenate((self.data[start:], self.data[:head]))
+
+def since(rows, seconds, now=None):
+    """Rows from the last `seconds`"""
+    now = time.time() if now is None else now
+    return rows[rows[:, 0] >= now - seconds]
+
+class FileTrackStore:
+    """Tracker state shared by the workers of one host.
+
+    An exclusive flock on ``leader.lock`` elects the polling worker; the OS
+    drops it if that worker dies, so another takes over. The ring buffer
+    is a memory-mapped ``.npy`` file and ``latest.json`` (replaced
+    atomically after each write) holds the newest sample with the buffer's
+    head and count.
+    """
+
+    def __init__(self, root=TRACKER_DIR, capacity=TRACK_CAPACITY):
+        self.root = root
+        self.capacity = capacity
+        self.latest_path = os.path.join(root, 'latest.json')
+        self.track_path = os.path.join(root, 'track.npy')
+        self._lock_file = None
+        self._buffer = None
+        os.makedirs(root, exist_ok=True)
+
+    def acquire_leadership(self):
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            self._lock_file = True
+            return True
+        lock_file = open(os.path.join(self.root, 'leader.lock'), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _writable_buffer(self):
+        if self._buffer is None:
+            state = self._read_state() or {}
+            try:
+                data = np.load(self.track_path, mmap_mode='r+')
+                if data.shape != (self.capacity, 3):
+                    raise ValueError("capacity changed")
+            except (OSError, ValueError):
+                data = np.lib.format.open_memmap(self.track_path, mode='w+', dtype=np.float64,
+                                                 shape=(self.capacity, 3))
+                state = {}
+            self._buffer = RingBuffer(data=data)
+            self._buffer.head = state.get('head', 0) % self.capacity
+            self._buffer.count = min(state.get('count', 0), self.capacity)
+        return self._buffer
+
+    def publish(self, sample):
+        buffer = self._writable_buffer()
+        buffer.append(sample)
+        buffer.data.flush()
+        state = {'sample': list(sample), 'head': buffer.head, 'count': buffer.count}
+        tmp_path = f"{self.latest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.latest_path)
+
+    def _read_state(self):
+        try:
+            with open(self.latest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def latest(self):
+        state = self._read_state()
+        return tuple(state['sample']) if state else None
+
+    def history(self):
+        state = self._read_state()
+        if not state:
+            return np.empty((0, 3))
+        try:
+            data = np.load(self.track_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return np.empty((0, 3))
+        return RingBuffer(data=data).ordered(state['head'], state['count'])
+
+class RedisTrackStore:
+    """Tracker state shared across hosts: a renewed SET NX lock and a capped list"""
+
+    RENEW_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+    )
+
+    def __init__(self, url=TRACKER_REDIS_URL, client=None, capacity=TRACK_CAPACITY, prefix='nasa:iss:'):
+        if client is None:
+            import redis
+            client = redis.from_url(url)
+        self.client = client
+        self.capacity = capacity
+        self.prefix = prefix
+        self.token = uuid.uuid4().hex
+        self.lock_ms = int(POLL_INTERVAL * 3 * 1000)
+
+    def acquire_leadership(self):
+        key = self.prefix + 'leader'
+        if self.client.eval(self.RENEW_SCRIPT, 1, key, self.token, self.lock_ms):
+            return True
+        return bool(self.client.set(key, self.token, nx=True, px=self.lock_ms))
+
+    def publish(self, sample):
+        packed = np.asarray(sample, dtype=np.float64).tobytes()
+        with self.client.pipeline() as pipe:
+            pipe.rpush(self.prefix + 'track', packed)
+            pipe.ltrim(self.prefix + 'track', -self.capacity, -1)
+            pipe.set(self.prefix + 'latest', packed)
+            pipe.execute()
+
+    def latest(self):
+        packed = self.client.get(self.prefix + 'latest')
+        return tuple(np.frombuffer(packed, dtype=np.float64).tolist()) if packed else None
+
+    def history(self):
+        rows = self.client.lrange(self.prefix + 'track', 0, -1)
+        if not rows:
+            return np.empty((0, 3))
+        return np.frombuffer(b''.join(rows), dtype=np.float64).reshape(-1, 3)
+
+def create_store(name=TRACKER_BACKEND):
+    """Create a tracker store: file (one host) or redis (many hosts)"""
+    name = (name or 'file').lower()
+    if name == 'file':
+        return FileTrackStore()
+    if name == 'redis':
+        return RedisTrackStore()
+    raise ValueError(f"Unknown ISS tracker backend: {name}")
+
+class ISSTracker:
+    """One upstream ISS poller per deployment, shared by every viewer.
+
+    Every worker runs a background thread. The worker holding the store's
+    leader lock calls the position API every POLL_INTERVAL seconds and
+    publishes the sample; the others follow the store. Each thread wakes
+    its local stream subscribers whenever a new sample appears, so the
+    upstream call rate does not depend on the number of viewers.
+    """
+
+    def __init__(self, fetch, store_factory=create_store, interval=POLL_INTERVAL):
+        self.fetch = fetch
+        self.store_factory = store_factory
+        self.interval = interval
+        self.store = None
+        self._latest = None
+        self._condition = threading.Condition()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self.store = self.store_factory()
+                self._latest = self.store.latest()
+                self._thread = threading.Thread(target=self._run, name='iss-tracker', daemon=True)
+                self._thread.start()
+
+    def _poll(self):
+        data = self.fetch()
+        position = data['iss_position']
+        return (float(data.get('timestamp') or time.time()),
+                float(position['latitude']), float(position['longitude']))
+
+    def _run(self):
+        next_poll = 0.0
+        while True:
+            try:
+                if self.store.acquire_leadership():
+                    now = time.monotonic()
+                    if now >= next_poll:
+                        next_poll = now + self.interval
+                        self.store.publish(self._poll())
+                self._notify(self.store.latest())
+            except Exception as e:
+                print(f"Error tracking ISS position: {e}")
+            time.sleep(FOLLOW_INTERVAL)
+
+    def _notify(self, sample):
+        if sample is None or sample == self._latest:
+            return
+        with self._condition:
+            self._latest = sample
+            self._condition.notify_all()
+
+    def latest(self):
+        """Newest (timestamp, lat, lon) sample, or None before the first poll"""
+        self.ensure_started()
+        return self._latest
+
+    def wait_for_update(self, previous, timeout):
+        """Block until a sample newer than previous arrives; None on timeout"""
+        self.ensure_started()
+        with self._condition:
+            self._condition.wait_for(lambda: self._latest is not None and self._latest != previous,
+                                     timeout=timeout)
+            return self._latest if self._latest != previous else None
+
+    def track(self, minutes):
+        """(timestamp, lat, lon) rows of the last `minutes`, oldest first"""
+        self.ensure_started()
+        return since(self.store.history(), minutes * 60)
@@ -0,0 +1,202 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+from flask import current_app
+from app import db
+from app.models import MarsPhoto, MarsPhotoFetch
+from app.services.bulk import bulk_upsert
+
+# Queries whose newest photo is older than this are final; newer ones may
+# still receive downlinked photos and are refetched daily
+SETTLED_AFTER = timedelta(days=30)
+REFRESH_AFTER = timedelta(days=1)
+
+# Photos shown per gallery page
+PER_PAGE = 50
+
+# Queries first seen in a request are completed here, one at a time, so a
+# request never waits on more than one rate-limited page
+_ingest_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mars-ingest')
+_queued = set()
+_queued_lock = threading.Lock()
+
+def query_key(rover, sol=None, earth_date=None, camera=None):
+    return f"{rover}:sol={'' if sol is None else sol}:date={earth_date or ''}:camera={camera or ''}"
+
+def photo_row(rover, photo):
+    """Map an API photo to MarsPhoto column values, deriving image metadata from img_src"""
+    img_src = photo['img_src']
+    parsed = urlparse(img_src)
+    filename = os.path.basename(parsed.path)
+    return {
+        'nasa_id': str(photo['id']),
+        'rover_name': rover,
+        'camera_name': photo['camera']['name'],
+        'camera_full_name': photo['camera'].get('full_name'),
+        'image_url': img_src,
+        'image_host': parsed.hostname,
+        'image_filename': filename[:200],
+        'image_format': os.path.splitext(filename)[1].lstrip('.').lower()[:10] or None,
+        'sol': photo.get('sol'),
+        'earth_date': datetime.strptime(photo['earth_date'], '%Y-%m-%d').date(),
+        'created_at': datetime.utcnow()
+    }
+
+def to_dict(photo):
+    """Serialize a MarsPhoto row in the API's photo shape used by the templates"""
+    return {
+        'id': photo.nasa_id,
+        'sol': photo.sol,
+        'img_src': photo.image_url,
+        'earth_date': photo.earth_date.strftime('%Y-%m-%d') if photo.earth_date else None,
+        'camera': {'name': photo.camera_name, 'full_name': photo.camera_full_name or photo.camera_name},
+        'rover': {'name': photo.rover_name}
+    }
+
+# Refreshed on photos already stored, since rows stored before the sol
+# columns existed lack them
+REFRESH_COLUMNS = ['sol', 'camera_full_name']
+
+def store_photos(rover, photos):
+    """Bulk-upsert API photos by nasa_id, filling in REFRESH_COLUMNS on stored ones"""
+    rows = []
+    for photo in photos:
+        try:
+            rows.append(photo_row(rover, photo))
+        except (KeyError, ValueError) as e:
+            print(f"Error processing photo data: {e}")
+    bulk_upsert(MarsPhoto, rows, ['nasa_id'], REFRESH_COLUMNS)
+    return rows
+
+def _is_current(fetch):
+    if fetch is None:
+        return False
+    if fetch.latest_earth_date and fetch.latest_earth_date < datetime.utcnow().date() - SETTLED_AFTER:
+        return True
+    return fetch.fetched_at is not None and fetch.fetched_at > datetime.utcnow() - REFRESH_AFTER
+
+def find_fetch(rover, sol=None, earth_date=None, camera=None):
+    """The stored fetch that covers this query: the exact one, or a complete all-cameras one"""
+    exact_key = query_key(rover, sol, earth_date, camera)
+    keys = [exact_key]
+    if camera:
+        keys.append(query_key(rover, sol, earth_date))
+    for fetch in MarsPhotoFetch.query.filter(MarsPhotoFetch.query_key.in_(keys)).all():
+        if _is_current(fetch) and (fetch.query_key == exact_key or fetch.complete):
+            return fetch
+    return None
+
+def query_photos(rover, sol=None, earth_date=None, camera=None):
+    query = MarsPhoto.query.filter_by(rover_name=rover)
+    if sol is not None:
+        query = query.filter_by(sol=sol)
+    if earth_date is not None:
+        query = query.filter_by(earth_date=earth_date)
+    if camera:
+        query = query.filter_by(camera_name=camera)
+    return query.order_by(MarsPhoto.camera_name, MarsPhoto.id)
+
+def record_fetch(rover, sol, earth_date, camera, photo_count, latest_earth_date, complete=True):
+    bulk_upsert(MarsPhotoFetch, [{
+        'query_key': query_key(rover, sol, earth_date, camera),
+        'rover_name': rover,
+        'sol': sol,
+        'earth_date': earth_date,
+        'camera_name': camera or None,
+        'photo_count': photo_count,
+        'complete': complete,
+        'latest_earth_date': latest_earth_date,
+        'fetched_at': datetime.utcnow()
+    }], ['query_key'], ['photo_count', 'complete', 'latest_earth_date', 'fetched_at'])
+
+def ingest(api, rover, sol=None, earth_date=None, camera=None):
+    """Fetch every page of a query into the store, one page (bulk insert) at a time"""
+    count = 0
+    latest = None
+    for photos in api.iter_mars_photos(rover=rover, sol=sol,
+                                       earth_date=earth_date.strftime('%Y-%m-%d') if earth_date else None,
+                                       camera=camera):
+        rows = store_photos(rover, photos)
+        db.session.commit()
+        count += len(rows)
+        page_latest = max((row['earth_date'] for row in rows), default=None)
+        if page_latest and (latest is None or page_latest > latest):
+            latest = page_latest
+    record_fetch(rover, sol, earth_date, camera, count, latest or earth_date)
+    db.session.commit()
+    return count
+
+def ingest_first_page(api, rover, sol=None, earth_date=None, camera=None):
+    """Store the first page of a query and record it; returns whether that was every photo"""
+    page_data = api.get_mars_photos(rover=rover, sol=sol,
+                                    earth_date=earth_date.strftime('%Y-%m-%d') if earth_date else None,
+                                    camera=camera)
+    photos = page_data.get('photos', []) if page_data else []
+    rows = store_photos(rover, photos)
+    complete = len(photos) < api.MARS_PAGE_SIZE
+    latest = max((row['earth_date'] for row in rows), default=None)
+    record_fetch(rover, sol, earth_date, camera, len(rows), latest or earth_date, complete=complete)
+    db.session.commit()
+    return complete
+
+def queue_ingest(app, api, rover, sol=None, earth_date=None, camera=None):
+    """Run ingest() for a query on the background worker unless it is already queued"""
+    key = query_key(rover, sol, earth_date, camera)
+    with _queued_lock:
+        if key in _queued:
+            return False
+        _queued.add(key)
+
+    def run():
+        try:
+            with app.app_context():
+                try:
+                    ingest(api, rover, sol=sol, earth_date=earth_date, camera=camera)
+                except Exception as e:
+                    # The partial fetch record stays, so the next request queues it again
+                    print(f"Error ingesting Mars photos for {key}: {e}")
+                    db.session.rollback()
+        finally:
+            with _queued_lock:
+                _queued.discard(key)
+
+    _ingest_executor.submit(run)
+    return True
+
+def get_photos(api, rover, camera=None, earth_date=None, sol=None, page=1, per_page=PER_PAGE):
+    """Mars photos for a filter combination, answered from the local store once fetched.
+
+    Returns (photos, pagination, complete); pagination is None when
+    neither sol nor earth_date is given, since such queries are not stored.
+    A query seen for the first time stores only its first page here; the
+    other pages are ingested in the background (or by 'flask mars ingest')
+    and complete is False until they are.
+    """
+    sol = int(sol) if sol not in (None, '') else None
+    earth_date = datetime.strptime(earth_date, '%Y-%m-%d').date() if earth_date else None
+    camera = camera.upper() if camera else None
+
+    if sol is None and earth_date is None:
+        photos_data = api.get_mars_photos(rover=rover, camera=camera)
+        photos = photos_data.get('photos', []) if photos_data else []
+        try:
+            store_photos(rover, photos)
+            db.session.commit()
+        except Exception as e:
+            print(f"Error committing to database: {e}")
+            db.session.rollback()
+        return photos, None, True
+
+    fetch = find_fetch(rover, sol, earth_date, camera)
+    if fetch is None:
+        complete = ingest_first_page(api, rover, sol=sol, earth_date=earth_date, camera=camera)
+    else:
+        complete = fetch.complete
+    if not complete:
+        queue_ingest(current_app._get_current_object(), api, rover, sol=sol, earth_date=earth_date, camera=camera)
+
+    pagination = query_photos(rover, sol, earth_date, camera)\
+        .paginate(page=page, per_page=per_page, error_out=False)
+    return [to_dict(photo) for photo in pagination.items], pagination, complete
@@ -2,49 +2,46 @@ import os
 import requests
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-import time
-from functools import wraps
-import math
+import itertools
+from app.services.transport import get_transport
+from app.services.rate_limit import RateLimitExceeded
+from app.services.cache import policy_for
+from app.services.neo_feed import fetch_neo_range
+from app.services.concurrency import bounded_map
+from app.services import earth_tiles, iss_passes
 
 load_dotenv()
 
-def rate_limit(calls_per_second=2):
-    """Rate limiting decorator"""
-    min_interval = 1.0 / float(calls_per_second)
-    def decorator(func):
-        last_time_called = [0.0]
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            elapsed = time.time() - last_time_called[0]
-            if elapsed < min_interval:
-                time.sleep(min_interval - elapsed)
-            ret = func(*args, **kwargs)
-            last_time_called[0] = time.time()
-            return ret
-        return wrapper
-    return decorator
+# Earth imagery area widths in degrees; snapshots get about one pixel per
+# 0.0075 degrees (roughly MODIS zoom 7), capped at the old fixed size
+DEFAULT_DIM = 12.0
+MIN_DIM, MAX_DIM = 0.1, 20.0
+SNAPSHOT_DEGREES_PER_PIXEL = 0.0075
+MAX_SNAPSHOT_PIXELS = 1600
+MAX_ASSET_DAYS = 366
 
 class NASAAPI:
     BASE_URL = "https://api.nasa.gov"
     ISS_BASE_URL = "http://api.open-notify.org"
     API_KEY = os.getenv('NASA_API_KEY')
+    MARS_PAGE_SIZE = 25
 
     def __init__(self):
         if not self.API_KEY:
             raise ValueError("NASA API key not found. Please set NASA_API_KEY in your environment variables.")
         
     @staticmethod
-    @rate_limit(calls_per_second=2)
     def _make_request(endpoint, params=None):
         if params is None:
             params = {}
         params['api_key'] = NASAAPI.API_KEY
         
         try:
-            response = requests.get(
+            response = get_transport().get(
                 f"{NASAAPI.BASE_URL}{endpoint}",
                 params=params,
-                timeout=10  # 10 seconds timeout
+                read_timeout=10,  # 10 seconds read timeout
+                cache_policy=policy_for(endpoint, params)
             )
             response.raise_for_status()
             return response.json()
@@ -52,6 +49,8 @@ class NASAAPI:
             raise TimeoutError("Request to NASA API timed out. Please try again later.")
         except requests.RequestException as e:
             raise ConnectionError(f"Error connecting to NASA API: {str(e)}")
+        except RateLimitExceeded as e:
+            raise ConnectionError(str(e)) from e
 
     @staticmethod
     def _make_iss_request(endpoint, params=None):
@@ -59,10 +58,11 @@ class NASAAPI:
         if params is None:
             params = {}
         try:
-            response = requests.get(
+            response = get_transport().get(
                 f"{NASAAPI.ISS_BASE_URL}{endpoint}",
                 params=params,
-                timeout=5  # 5 seconds timeout for ISS API
+                read_timeout=5,  # 5 seconds read timeout for ISS API
+                cache_policy=policy_for(endpoint, params)
             )
             response.raise_for_status()
             return response.json()
@@ -77,6 +77,21 @@ class NASAAPI:
         params = {'date': date} if date else {}
         return self._make_request(endpoint, params)
 
+    def get_apod_range(self, start_date=None, end_date=None, count=None):
+        """Get every Astronomy Picture of the Day in a date range (or `count` random ones)"""
+        endpoint = "/planetary/apod"
+        if count is not None:
+            if start_date or end_date:
+                raise ValueError("Cannot specify count together with a date range")
+            params = {'count': int(count)}
+        else:
+            if not start_date:
+                raise ValueError("start_date is required for a date range")
+            params = {'start_date': start_date}
+            if end_date:
+                params['end_date'] = end_date
+        return self._make_request(endpoint, params)
+
     def get_mars_photos(self, rover="perseverance", sol=None, earth_date=None, camera=None, page=1):
         """Get Mars Rover photos with enhanced parameters and error handling"""
         endpoint = f"/mars-photos/api/v1/rovers/{rover}/photos"
@@ -113,6 +128,23 @@ class NASAAPI:
             else:
                 raise
 
+    def iter_mars_photos(self, rover="perseverance", sol=None, earth_date=None, camera=None, window=3):
+        """Yield Mars photos one page (list) at a time, prefetching up to `window` pages concurrently.
+
+        Stops at the first empty or short page, so memory stays bounded by
+        the window no matter how many photos the sol has.
+        """
+        def fetch(page):
+            return self.get_mars_photos(rover=rover, sol=sol, earth_date=earth_date, camera=camera, page=page)
+
+        for page_data in bounded_map(fetch, itertools.count(1), window):
+            photos = page_data.get('photos', []) if page_data else []
+            if not photos:
+                return
+            yield photos
+            if len(photos) < self.MARS_PAGE_SIZE:
+                return
+
     def get_neo_feed(self, start_date=None, end_date=None):
         """Get Near Earth Objects feed"""
         endpoint = "/neo/rest/v1/feed"
@@ -127,8 +159,16 @@ class NASAAPI:
         }
         return self._make_request(endpoint, params)
 
+    def get_neo_feed_range(self, start_date, end_date):
+        """Get Near Earth Objects for any date range, in parallel 7-day windows with a per-day cache"""
+        return fetch_neo_range(self, start_date, end_date)
+
     def get_earth_assets(self, lat, lon, begin_date=None, end_date=None):
-        """Get available Earth imagery dates for a location using GIBS Worldview"""
+        """Get available Earth imagery dates for a location using GIBS Worldview
+
+        Returns one result per date from begin_date to end_date (default:
+        the last year), oldest first.
+        """
         today = datetime.now().date()
         
         try:
@@ -148,35 +188,43 @@ class NASAAPI:
                 
             if begin > end:
                 raise ValueError("Begin date must be before end date")
+            if (end - begin).days >= MAX_ASSET_DAYS:
+                raise ValueError(f"Date range is limited to {MAX_ASSET_DAYS} days")
 
-            # Calculate a wider bounding box (roughly 12-degree area)
-            bbox = f"{lon-6},{lat-6},{lon+6},{lat+6}"
-            date_str = begin.strftime('%Y-%m-%d')
-
-            # Generate Worldview URL
-            url = (
-                f"https://wvs.earthdata.nasa.gov/api/v1/snapshot?"
-                f"REQUEST=GetSnapshot&"
-                f"TIME={date_str}&"
-                f"BBOX={bbox}&"
-                f"CRS=EPSG:4326&"
-                f"LAYERS=MODIS_Terra_CorrectedReflectance_TrueColor&"
-                f"WIDTH=1600&"  # Increased width for better detail
-                f"HEIGHT=1600&"  # Increased height for better detail
-                f"FORMAT=image/jpeg"
-            )
-
+            # MODIS images the whole globe daily, so every date in the range is available
+            dates = [(begin + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((end - begin).days + 1)]
             return {
                 'results': [{
                     'date': date_str,
-                    'url': url
-                }]
+                    'url': self._snapshot_url(lat, lon, date_str, DEFAULT_DIM)
+                } for date_str in dates]
             }
         except ValueError as e:
             raise ValueError(str(e))
 
-    def get_earth_imagery(self, lat, lon, date=None, dim=0.025):
-        """Get Earth imagery for a specific location using GIBS Worldview"""
+    def _snapshot_url(self, lat, lon, date_str, dim, layer=earth_tiles.DEFAULT_LAYER):
+        """Worldview snapshot of a dim x dim degree box, sized to the imagery's resolution"""
+        half = dim / 2
+        size = int(min(MAX_SNAPSHOT_PIXELS, max(earth_tiles.TILE_SIZE, dim / SNAPSHOT_DEGREES_PER_PIXEL)))
+        return (
+            f"https://wvs.earthdata.nasa.gov/api/v1/snapshot?"
+            f"REQUEST=GetSnapshot&"
+            f"TIME={date_str}&"
+            f"BBOX={lon - half},{lat - half},{lon + half},{lat + half}&"
+            f"CRS=EPSG:4326&"
+            f"LAYERS={layer}&"
+            f"WIDTH={size}&"
+            f"HEIGHT={size}&"
+            f"FORMAT=image/jpeg"
+        )
+
+    def get_earth_imagery(self, lat, lon, date=None, dim=None):
+        """Get Earth imagery for a specific location using GIBS Worldview
+
+        dim is the width of the area in degrees. Besides a snapshot URL the
+        result carries the local tile URL template and a zoom level for
+        map views, which load only the visible 256 px tiles.
+        """
         today = datetime.now().date()
         
         try:
@@ -187,34 +235,36 @@ class NASAAPI:
             else:
                 request_date = today - timedelta(days=30)
 
-            # Calculate a wider bounding box (roughly 12-degree area)
-            bbox = f"{lon-6},{lat-6},{lon+6},{lat+6}"
+            dim = DEFAULT_DIM if dim is None else min(MAX_DIM, max(MIN_DIM, dim))
             date_str = request_date.strftime('%Y-%m-%d')
-
-            # Generate Worldview URL with adjusted parameters
-            url = (
-                f"https://wvs.earthdata.nasa.gov/api/v1/snapshot?"
-                f"REQUEST=GetSnapshot&"
-                f"TIME={date_str}&"
-                f"BBOX={bbox}&"
-                f"CRS=EPSG:4326&"
-                f"LAYERS=MODIS_Terra_CorrectedReflectance_TrueColor&"
-                f"WIDTH=1600&"  # Increased width for better detail
-                f"HEIGHT=1600&"  # Increased height for better detail
-                f"FORMAT=image/jpeg"
-            )
+            layer = earth_tiles.DEFAULT_LAYER
 
             return {
                 'date': date_str,
-                'url': url
+                'dim': dim,
+                'url': self._snapshot_url(lat, lon, date_str, dim, layer),
+                'layer': layer,
+                'tiles': earth_tiles.TILE_URL.format(layer=layer, date=date_str, z='{z}', x='{x}', y='{y}'),
+                'zoom': earth_tiles.zoom_for_dim(dim, layer)
             }
         except Exception as e:
             raise ValueError(f"Error generating Earth imagery URL: {str(e)}")
 
-    def get_earth_events(self):
-        """Get EONET (Earth Observatory Natural Event Tracker) events"""
+    def get_earth_events(self, status=None, start=None, end=None, category=None, limit=None):
+        """Get EONET (Earth Observatory Natural Event Tracker) events
+
+        status is open (the API default), closed or all; start/end
+        (YYYY-MM-DD) select events with geometry dated in that range.
+        """
         endpoint = "/EONET/v3/events"
-        return self._make_request(endpoint)
+        params = {
+            'status': status,
+            'start': start,
+            'end': end,
+            'category': category,
+            'limit': limit
+        }
+        return self._make_request(endpoint, {k: v for k, v in params.items() if v is not None})
 
     def get_earth_categories(self):
         """Get EONET event categories"""
@@ -231,79 +281,17 @@ class NASAAPI:
         return self._make_iss_request("/iss-now.json")
 
     def get_iss_pass_times(self, lat, lon):
-        """Get ISS pass predictions for a location"""
-        params = {
-            'lat': lat,
-            'lon': lon,
-            'alt': 0,  # altitude in meters above sea level
-            'n': 10  # Number of passes to predict
-        }
-        try:
-            return self._make_iss_request("/iss-pass.json", params)
-        except requests.exceptions.RequestException as e:
-            # If the primary endpoint fails, use the backup calculation
-            return self._calculate_pass_predictions(lat, lon)
+        """Get ISS pass predictions for a location.
+
+        open-notify retired /iss-pass.json, so passes are computed locally
+        from the stored two-line elements (see app.services.iss_passes).
+        """
+        return self._calculate_pass_predictions(lat, lon)
 
     def _calculate_pass_predictions(self, lat, lon):
-        """Calculate ISS pass predictions when the API is unavailable"""
-        current_time = datetime.now()
-        predictions = []
-        
+        """Predict the next ISS passes from the orbital elements"""
         try:
-            # Get current ISS position
-            iss_data = self.get_iss_position()
-            iss_lat = float(iss_data['iss_position']['latitude'])
-            iss_lon = float(iss_data['iss_position']['longitude'])
-            
-            # ISS orbital parameters
-            orbital_period = 92.68  # minutes
-            orbital_height = 408    # km
-            earth_radius = 6371     # km
-            visibility_radius = 2000 # km
-            
-            # Calculate next 10 passes
-            for i in range(10):
-                # Calculate future position based on orbital mechanics
-                pass_time = current_time + timedelta(minutes=orbital_period * (i + 1))
-                
-                # Calculate ground track progression
-                time_diff = (pass_time - current_time).total_seconds() / 60  # in minutes
-                lon_progression = (time_diff / orbital_period) * 360  # degrees
-                new_lon = (iss_lon + lon_progression) % 360
-                
-                # Calculate if visible from location
-                lat_diff = abs(lat - iss_lat)
-                lon_diff = min(abs(new_lon - lon), 360 - abs(new_lon - lon))
-                
-                # Use great circle distance formula
-                distance = earth_radius * 2 * abs(
-                    math.asin(
-                        math.sqrt(
-                            math.sin(math.radians(lat_diff) / 2) ** 2 +
-                            math.cos(math.radians(lat)) *
-                            math.cos(math.radians(iss_lat)) *
-                            math.sin(math.radians(lon_diff) / 2) ** 2
-                        )
-                    )
-                )
-                
-                if distance <= visibility_radius:
-                    # Calculate visibility duration based on orbital velocity
-                    duration = int(
-                        (2 * math.acos(earth_radius / (earth_radius + orbital_height)) *
-                        (earth_radius + orbital_height) / 7.66) # 7.66 km/s is ISS velocity
-                    )
-                    
-                    predictions.append({
-                        'risetime': int(pass_time.timestamp()),
-                        'duration': duration,
-                        'max_elevation': int(90 - math.degrees(math.asin(distance / visibility_radius)))
-                    })
-            
-            return {
-                'message': 'Calculated predictions (approximations)',
-                'response': predictions
-            }
+            return iss_passes.pass_predictions(lat, lon)
         except Exception as e:
             print(f"Error calculating ISS predictions: {e}")
             return {
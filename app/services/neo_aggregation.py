@@ -0,0 +1,123 @@
+import numpy as np
+
+SMALL_DIAMETER_KM = 0.5
+MEDIUM_DIAMETER_KM = 2
+TOP_CLOSEST = 5
+
+def _floats(values):
+    """Parse a list of numbers or numeric strings (the API sends both) into float64"""
+    return np.array(values, dtype=np.float64).reshape(len(values))
+
+class NEOColumns:
+    """A NEO feed loaded once into columnar NumPy arrays.
+
+    One row per asteroid; ``miss_distance_km``, ``velocity_kph`` and
+    ``approach_date`` hold the asteroid's closest approach.
+    """
+    __slots__ = ('daily_counts', 'ids', 'names', 'hazardous_values', 'hazardous',
+                 'diameter_km', 'miss_distance_km', 'velocity_kph', 'approach_date')
+
+    @classmethod
+    def from_feed(cls, neo_data):
+        columns = cls()
+        days = neo_data['near_earth_objects']
+        columns.daily_counts = {date: len(asteroids) for date, asteroids in days.items()}
+        asteroids = [asteroid for day in days.values() for asteroid in day]
+
+        # One comprehension per column keeps the JSON walk in C-speed loops
+        columns.ids = [a['neo_reference_id'] for a in asteroids]
+        columns.names = [a['name'] for a in asteroids]
+        columns.hazardous_values = [a['is_potentially_hazardous_asteroid'] for a in asteroids]
+        columns.hazardous = np.array(columns.hazardous_values, dtype=bool)
+        diameters = [a['estimated_diameter']['kilometers'] for a in asteroids]
+        columns.diameter_km = (
+            _floats([d['estimated_diameter_min'] for d in diameters]) +
+            _floats([d['estimated_diameter_max'] for d in diameters])
+        ) / 2
+
+        approach_lists = [a['close_approach_data'] for a in asteroids]
+        counts = np.fromiter(map(len, approach_lists), dtype=np.int64, count=len(approach_lists))
+        if np.any(counts == 0):
+            raise ValueError("Every asteroid needs at least one close approach")
+        approaches = [approach for approach_list in approach_lists for approach in approach_list]
+        miss_distance = _floats([a['miss_distance']['kilometers'] for a in approaches])
+
+        if len(approaches) == len(asteroids):
+            closest = np.arange(len(asteroids))
+        else:
+            # Closest approach per asteroid: sort by (owner, distance); lexsort
+            # is stable so ties keep the first approach, like min() does
+            owner = np.repeat(np.arange(len(asteroids)), counts)
+            order = np.lexsort((miss_distance, owner))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = owner[order][1:] != owner[order][:-1]
+            closest = order[first]
+
+        chosen = [approaches[i] for i in closest.tolist()]
+        columns.miss_distance_km = miss_distance[closest]
+        columns.velocity_kph = _floats([a['relative_velocity']['kilometers_per_hour'] for a in chosen])
+        columns.approach_date = [a['close_approach_date'] for a in chosen]
+        return columns
+
+    def __len__(self):
+        return len(self.ids)
+
+def top_k_closest(distances, k=TOP_CLOSEST):
+    """Indices of the k smallest distances, in ascending order (ties by position)"""
+    n = len(distances)
+    if n == 0:
+        return np.array([], dtype=np.int64)
+    k = min(k, n)
+    if k < n:
+        kth = np.partition(distances, k - 1)[k - 1]
+        candidates = np.flatnonzero(distances <= kth)
+    else:
+        candidates = np.arange(n)
+    ranked = candidates[np.lexsort((candidates, distances[candidates]))]
+    return ranked[:k]
+
+def aggregate(columns):
+    """Aggregate NEOColumns into the dashboard payload"""
+    diameter = columns.diameter_km
+    small = diameter < SMALL_DIAMETER_KM
+    medium = ~small & (diameter < MEDIUM_DIAMETER_KM)
+    hazardous = int(np.count_nonzero(columns.hazardous))
+
+    distances = columns.miss_distance_km.tolist()
+    velocities = columns.velocity_kph.tolist()
+    dates = columns.approach_date
+    diameters = diameter.tolist()
+
+    closest_approaches = [{
+        'name': columns.names[i],
+        'distance_km': distances[i],
+        'velocity_kph': velocities[i],
+        'approach_date': dates[i]
+    } for i in top_k_closest(columns.miss_distance_km).tolist()]
+
+    all_objects = [{
+        'id': object_id,
+        'name': name,
+        'diameter_km': diameter_km,
+        'hazardous': is_hazardous,
+        'velocity_kph': velocity_kph,
+        'miss_distance_km': miss_distance_km,
+        'approach_date': approach_date
+    } for object_id, name, diameter_km, is_hazardous, velocity_kph, miss_distance_km, approach_date
+        in zip(columns.ids, columns.names, diameters, columns.hazardous_values,
+               velocities, distances, dates)]
+
+    return {
+        'daily_counts': columns.daily_counts,
+        'hazardous_counts': {
+            'hazardous': hazardous,
+            'non_hazardous': len(columns) - hazardous
+        },
+        'size_distribution': {
+            'small': int(np.count_nonzero(small)),
+            'medium': int(np.count_nonzero(medium)),
+            'large': len(columns) - int(np.count_nonzero(small | medium))
+        },
+        'closest_approaches': closest_approaches,
+        'all_objects': all_objects
+    }
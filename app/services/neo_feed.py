@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+# The NEO feed API accepts at most 7 days per request
+MAX_WINDOW_DAYS = 7
+MAX_WORKERS = 4
+
+# Days in the past are final; today and future days are re-fetched hourly
+RECENT_DAY_TTL = 3600
+
+def parse_date(value):
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def date_range(start, end):
+    """All calendar days from start to end, inclusive"""
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+def plan_windows(days, max_days=MAX_WINDOW_DAYS):
+    """Split sorted days into windows of consecutive days, each at most max_days long"""
+    windows = []
+    for day in days:
+        if (windows and day == windows[-1][1] + timedelta(days=1)
+                and (day - windows[-1][0]).days < max_days):
+            windows[-1][1] = day
+        else:
+            windows.append([day, day])
+    return [(start, end) for start, end in windows]
+
+class NEODayCache:
+    """Thread-safe LRU cache of NEO feed results keyed by calendar day"""
+
+    def __init__(self, max_days=3660):
+        self.max_days = max_days
+        self._lock = threading.Lock()
+        self._days = OrderedDict()
+
+    def get(self, day):
+        with self._lock:
+            entry = self._days.get(day)
+            if entry is None:
+                return None
+            objects, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._days[day]
+                return None
+            self._days.move_to_end(day)
+            return objects
+
+    def set(self, day, objects):
+        expires_at = None if day < date.today() else time.time() + RECENT_DAY_TTL
+        with self._lock:
+            self._days[day] = (objects, expires_at)
+            self._days.move_to_end(day)
+            while len(self._days) > self.max_days:
+                self._days.popitem(last=False)
+
+day_cache = NEODayCache()
+
+def fetch_neo_days(api, days, cache=day_cache, max_workers=MAX_WORKERS):
+    """Fetch the NEO feed for a set of calendar days, returning {day: objects}.
+
+    Days already in the cache are reused; the missing ones are grouped into
+    <=7-day windows fetched in parallel (each call still goes through the
+    shared rate limiter).
+    """
+    results = {}
+    missing = []
+    for day in sorted(days):
+        objects = cache.get(day)
+        if objects is None:
+            missing.append(day)
+        else:
+            results[day] = objects
+
+    windows = plan_windows(missing)
+    if windows:
+        def fetch(window):
+            window_start, window_end = window
+            return window, api.get_neo_feed(
+                start_date=window_start.strftime('%Y-%m-%d'),
+                end_date=window_end.strftime('%Y-%m-%d')
+            )
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(windows))) as executor:
+            for (window_start, window_end), feed in executor.map(fetch, windows):
+                by_day = feed.get('near_earth_objects', {})
+                for day in date_range(window_start, window_end):
+                    objects = by_day.get(day.strftime('%Y-%m-%d'), [])
+                    cache.set(day, objects)
+                    results[day] = objects
+    return results
+
+def merge_days(days, results):
+    """Merge per-day results into the feed shape process_neo_data expects"""
+    near_earth_objects = {
+        day.strftime('%Y-%m-%d'): results.get(day, []) for day in days
+    }
+    return {
+        'element_count': sum(len(objects) for objects in near_earth_objects.values()),
+        'near_earth_objects': near_earth_objects
+    }
+
+def fetch_neo_range(api, start_date, end_date, cache=day_cache, max_workers=MAX_WORKERS):
+    """Fetch the NEO feed for any date range in the feed shape process_neo_data expects"""
+    start, end = parse_date(start_date), parse_date(end_date)
+    if end < start:
+        raise ValueError("End date must be after start date")
+
+    days = date_range(start, end)
+    return merge_days(days, fetch_neo_days(api, days, cache=cache, max_workers=max_workers))
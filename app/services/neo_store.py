@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import NEO, NEOCloseApproach, NEOFeedDay
+from app.services.bulk import bulk_upsert
+from app.services.neo_feed import date_range, fetch_neo_days, merge_days, parse_date
+
+# Stored days in the past are final; recent and future days are refreshed
+RECENT_DAY_MAX_AGE = timedelta(hours=6)
+IN_CHUNK = 500
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _chunks(items, size=IN_CHUNK):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def ingest_feed(days):
+    """Bulk-upsert per-day feed results ({date: [asteroid, ...]}) into NEO tables"""
+    now = datetime.utcnow()
+    neo_rows = {}
+    approaches = []
+
+    for day, asteroids in days.items():
+        for asteroid in asteroids:
+            reference_id = str(asteroid['neo_reference_id'])
+            diameter = asteroid.get('estimated_diameter', {}).get('kilometers', {})
+            neo_rows[reference_id] = {
+                'neo_reference_id': reference_id,
+                'name': asteroid['name'],
+                'nasa_jpl_url': asteroid.get('nasa_jpl_url'),
+                'absolute_magnitude_h': _float(asteroid.get('absolute_magnitude_h')),
+                'estimated_diameter_min': _float(diameter.get('estimated_diameter_min')),
+                'estimated_diameter_max': _float(diameter.get('estimated_diameter_max')),
+                'is_potentially_hazardous': bool(asteroid.get('is_potentially_hazardous_asteroid')),
+                'created_at': now,
+                'updated_at': now
+            }
+            for approach in asteroid.get('close_approach_data', []):
+                approaches.append((reference_id, {
+                    'approach_date': parse_date(approach['close_approach_date']),
+                    'miss_distance_km': float(approach['miss_distance']['kilometers']),
+                    'velocity_kph': _float(approach['relative_velocity']['kilometers_per_hour']),
+                    'orbiting_body': approach.get('orbiting_body')
+                }))
+
+    bulk_upsert(NEO, list(neo_rows.values()), ['neo_reference_id'], [
+        'name', 'nasa_jpl_url', 'absolute_magnitude_h', 'estimated_diameter_min',
+        'estimated_diameter_max', 'is_potentially_hazardous', 'updated_at'
+    ])
+
+    ids = {}
+    for chunk in _chunks(neo_rows):
+        ids.update(db.session.query(NEO.neo_reference_id, NEO.id)
+                   .filter(NEO.neo_reference_id.in_(chunk)).all())
+
+    approach_rows = {}
+    for reference_id, row in approaches:
+        row['neo_id'] = ids[reference_id]
+        approach_rows[(row['neo_id'], row['approach_date'])] = row
+    bulk_upsert(NEOCloseApproach, list(approach_rows.values()), ['neo_id', 'approach_date'],
+                ['miss_distance_km', 'velocity_kph', 'orbiting_body'])
+
+    bulk_upsert(NEOFeedDay, [
+        {'date': day, 'object_count': len(asteroids), 'fetched_at': now}
+        for day, asteroids in days.items()
+    ], ['date'], ['object_count', 'fetched_at'])
+    db.session.commit()
+
+def stored_days(start, end):
+    """Days between start and end whose stored feed can be served as is"""
+    today = datetime.utcnow().date()
+    fresh_after = datetime.utcnow() - RECENT_DAY_MAX_AGE
+    rows = NEOFeedDay.query.filter(NEOFeedDay.date.between(start, end)).all()
+    return {
+        row.date for row in rows
+        if row.date < today - timedelta(days=1) or (row.fetched_at and row.fetched_at > fresh_after)
+    }
+
+def load_days(start, end):
+    """Rebuild {date: [asteroid, ...]} in feed shape from stored close approaches"""
+    rows = db.session.query(NEOCloseApproach, NEO)\
+        .join(NEO, NEOCloseApproach.neo_id == NEO.id)\
+        .filter(NEOCloseApproach.approach_date.between(start, end))\
+        .order_by(NEOCloseApproach.approach_date, NEOCloseApproach.id)\
+        .all()
+
+    days = {}
+    for approach, neo in rows:
+        date_str = approach.approach_date.strftime('%Y-%m-%d')
+        days.setdefault(approach.approach_date, []).append({
+            'neo_reference_id': neo.neo_reference_id,
+            'name': neo.name,
+            'nasa_jpl_url': neo.nasa_jpl_url,
+            'absolute_magnitude_h': neo.absolute_magnitude_h,
+            'estimated_diameter': {'kilometers': {
+                'estimated_diameter_min': neo.estimated_diameter_min,
+                'estimated_diameter_max': neo.estimated_diameter_max
+            }},
+            'is_potentially_hazardous_asteroid': neo.is_potentially_hazardous,
+            'close_approach_data': [{
+                'close_approach_date': date_str,
+                'miss_distance': {'kilometers': approach.miss_distance_km},
+                'relative_velocity': {'kilometers_per_hour': approach.velocity_kph},
+                'orbiting_body': approach.orbiting_body
+            }]
+        })
+    return days
+
+def get_neo_feed(api, start_date, end_date):
+    """NEO feed for a date range, answered from SQL for days already stored.
+
+    Only days missing from the store go upstream; they are ingested before
+    the merged feed is returned.
+    """
+    start, end = parse_date(start_date), parse_date(end_date)
+    days = date_range(start, end)
+    stored = stored_days(start, end)
+    results = load_days(start, end) if stored else {}
+    results = {day: objects for day, objects in results.items() if day in stored}
+
+    missing = [day for day in days if day not in stored]
+    if missing:
+        fetched = fetch_neo_days(api, missing)
+        try:
+            ingest_feed(fetched)
+        except Exception as e:
+            print(f"Error storing NEO feed: {e}")
+            db.session.rollback()
+        results.update(fetched)
+
+    return merge_days(days, results)
@@ -0,0 +1,231 @@
+import math
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+# WGS-84 / EGM-96 constants
+MU_KM3_S2 = 398600.4418
+EARTH_EQUATORIAL_RADIUS_KM = 6378.137
+EARTH_FLATTENING = 1 / 298.257223563
+J2 = 1.08262668e-3
+SECONDS_PER_DAY = 86400.0
+UNIX_EPOCH_JD = 2440587.5
+J2000_JD = 2451545.0
+
+class TLEError(ValueError):
+    pass
+
+def _checksum(line):
+    total = sum(int(c) if c.isdigit() else 1 if c == '-' else 0 for c in line[:68])
+    return total % 10
+
+class Elements:
+    """Mean orbital elements of a two-line element set (angles in radians)"""
+    __slots__ = ('name', 'line1', 'line2', 'epoch', 'inclination', 'raan', 'eccentricity',
+                 'arg_perigee', 'mean_anomaly', 'mean_motion', 'mean_motion_dot')
+
+    @property
+    def epoch_datetime(self):
+        return datetime.fromtimestamp(self.epoch, tz=timezone.utc)
+
+def parse_tle(line1, line2, name=None, verify_checksum=True):
+    line1, line2 = line1.rstrip(), line2.rstrip()
+    if not (line1.startswith('1 ') and line2.startswith('2 ')) or len(line1) < 68 or len(line2) < 68:
+        raise TLEError("Not a two-line element set")
+    if verify_checksum and len(line1) >= 69 and len(line2) >= 69:
+        if _checksum(line1) != int(line1[68]) or _checksum(line2) != int(line2[68]):
+            raise TLEError("TLE checksum mismatch")
+    try:
+        year = int(line1[18:20])
+        year += 2000 if year < 57 else 1900
+        day_of_year = float(line1[20:32])
+        epoch = datetime(year, 1, 1, tzinfo=timezone.utc) + timedelta(days=day_of_year - 1)
+
+        elements = Elements()
+        elements.name = name
+        elements.line1 = line1
+        elements.line2 = line2
+        elements.epoch = epoch.timestamp()
+        elements.mean_motion_dot = float(line1[33:43])          # rev/day^2, already halved
+        elements.inclination = math.radians(float(line2[8:16]))
+        elements.raan = math.radians(float(line2[17:25]))
+        elements.eccentricity = float('0.' + line2[26:33].strip())
+        elements.arg_perigee = math.radians(float(line2[34:42]))
+        elements.mean_anomaly = math.radians(float(line2[43:51]))
+        elements.mean_motion = float(line2[52:63])              # rev/day
+    except ValueError as e:
+        raise TLEError(f"Malformed TLE: {e}")
+    return elements
+
+def _solve_kepler(mean_anomaly, eccentricity, iterations=8):
+    anomaly = mean_anomaly.copy()
+    for _ in range(iterations):
+        anomaly -= (anomaly - eccentricity * np.sin(anomaly) - mean_anomaly) / (1 - eccentricity * np.cos(anomaly))
+    return anomaly
+
+def _unkozai(n, e, cos_i):
+    """Brouwer mean motion from the Kozai mean motion a TLE carries (as SGP4 does)"""
+    a1 = (MU_KM3_S2 / n ** 2) ** (1 / 3) / EARTH_EQUATORIAL_RADIUS_KM
+    d1 = 0.75 * J2 * (3 * cos_i ** 2 - 1) / (1 - e ** 2) ** 1.5
+    delta = d1 / a1 ** 2
+    a0 = a1 * (1 - delta ** 2 - delta * (1 / 3 + 134 * delta ** 2 / 81))
+    return n / (1 + d1 / a0 ** 2)
+
+def gmst(times):
+    """Greenwich mean sidereal angle (radians) at unix times"""
+    days = np.asarray(times, dtype=np.float64) / SECONDS_PER_DAY + UNIX_EPOCH_JD - J2000_JD
+    return np.radians((280.46061837 + 360.98564736629 * days) % 360.0)
+
+def propagate(elements, times):
+    """Earth-fixed satellite positions (km, shape (n, 3)) at unix times.
+
+    Two-body motion from the TLE mean elements plus the secular J2 drift
+    of the node, perigee and mean anomaly and the TLE's mean-motion decay
+    term. Short-period terms and drag modelling are left out, so for the
+    ISS positions stay within about 15 km of SGP4 over five days, i.e. a
+    couple of seconds along the track.
+    """
+    t = np.asarray(times, dtype=np.float64) - elements.epoch
+    e = elements.eccentricity
+    i = elements.inclination
+    cos_i = math.cos(i)
+    n = _unkozai(elements.mean_motion * 2 * np.pi / SECONDS_PER_DAY, e, cos_i)
+    a = (MU_KM3_S2 / n ** 2) ** (1 / 3)
+    p = a * (1 - e ** 2)
+    k = 0.75 * n * J2 * (EARTH_EQUATORIAL_RADIUS_KM / p) ** 2
+
+    raan = elements.raan - 2 * k * cos_i * t
+    arg_perigee = elements.arg_perigee + k * (5 * cos_i ** 2 - 1) * t
+    mean_anomaly = (elements.mean_anomaly + (n + k * math.sqrt(1 - e ** 2) * (3 * cos_i ** 2 - 1)) * t +
+                    2 * np.pi * elements.mean_motion_dot * (t / SECONDS_PER_DAY) ** 2)
+
+    anomaly = _solve_kepler(np.mod(mean_anomaly, 2 * np.pi), e)
+    true_anomaly = 2 * np.arctan2(math.sqrt(1 + e) * np.sin(anomaly / 2),
+                                  math.sqrt(1 - e) * np.cos(anomaly / 2))
+    radius = a * (1 - e * np.cos(anomaly))
+    u = arg_perigee + true_anomaly
+
+    cos_raan, sin_raan = np.cos(raan), np.sin(raan)
+    cos_u, sin_u = np.cos(u), np.sin(u)
+    x = radius * (cos_raan * cos_u - sin_raan * sin_u * cos_i)
+    y = radius * (sin_raan * cos_u + cos_raan * sin_u * cos_i)
+    z = radius * sin_u * math.sin(i)
+
+    theta = gmst(times)
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    return np.stack((cos_t * x + sin_t * y, -sin_t * x + cos_t * y, z), axis=-1)
+
+def observer_frames(lats, lons, alts_km=0.0):
+    """Earth-fixed positions (k, 3) and local up unit vectors (k, 3) of observers"""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    e2 = EARTH_FLATTENING * (2 - EARTH_FLATTENING)
+    normal = EARTH_EQUATORIAL_RADIUS_KM / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+    alt = np.asarray(alts_km, dtype=np.float64)
+    position = np.stack(((normal + alt) * np.cos(lat) * np.cos(lon),
+                         (normal + alt) * np.cos(lat) * np.sin(lon),
+                         (normal * (1 - e2) + alt) * np.sin(lat)), axis=-1)
+    up = np.stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)), axis=-1)
+    return position, up
+
+def geodetic(positions):
+    """WGS-84 latitude, longitude (degrees) and altitude (km) of Earth-fixed positions (..., 3)"""
+    x, y, z = positions[..., 0], positions[..., 1], positions[..., 2]
+    a = EARTH_EQUATORIAL_RADIUS_KM
+    b = a * (1 - EARTH_FLATTENING)
+    e2 = EARTH_FLATTENING * (2 - EARTH_FLATTENING)
+    p = np.hypot(x, y)
+    # Bowring's closed form; well below a metre of error at orbital altitudes
+    theta = np.arctan2(z * a, p * b)
+    lat = np.arctan2(z + e2 / (1 - e2) * b * np.sin(theta) ** 3, p - e2 * a * np.cos(theta) ** 3)
+    sin_lat = np.sin(lat)
+    normal = a / np.sqrt(1 - e2 * sin_lat ** 2)
+    alt = p * np.cos(lat) + (z + e2 * normal * sin_lat) * sin_lat - normal
+    return np.degrees(lat), np.degrees(np.arctan2(y, x)), alt
+
+def subsatellite_points(elements, times):
+    """Latitude, longitude (degrees) and altitude (km) below the satellite at unix times"""
+    return geodetic(propagate(elements, times))
+
+def elevations(satellite, positions, ups):
+    """Elevation angles (degrees, shape (k, n)) of satellite positions (n, 3) from k observers"""
+    rho = satellite[None, :, :] - positions[:, None, :]
+    sin_elevation = np.einsum('knd,kd->kn', rho, ups) / np.linalg.norm(rho, axis=-1)
+    return np.degrees(np.arcsin(np.clip(sin_elevation, -1, 1)))
+
+def _elevation_at(elements, positions, ups, observer_index, times):
+    """Elevation of observer_index[j] at times[j] for every j (one propagation call)"""
+    satellite = propagate(elements, times)
+    rho = satellite - positions[observer_index]
+    sin_elevation = np.einsum('jd,jd->j', rho, ups[observer_index]) / np.linalg.norm(rho, axis=-1)
+    return np.degrees(np.arcsin(np.clip(sin_elevation, -1, 1)))
+
+def _bisect(func, low, high, iterations):
+    """Vectorized bisection for the sign change of func inside each [low, high]"""
+    low, high = low.copy(), high.copy()
+    low_sign = np.sign(func(low))
+    for _ in range(iterations):
+        middle = (low + high) / 2
+        same = np.sign(func(middle)) == low_sign
+        low = np.where(same, middle, low)
+        high = np.where(same, high, middle)
+    return (low + high) / 2
+
+def find_passes(elements, lats, lons, start, hours=72, step=20.0, min_elevation=10.0, tolerance=0.5):
+    """Passes above min_elevation for many observers in one batched evaluation.
+
+    Elevations are sampled on a step-second grid for every observer; each
+    sign change of (elevation - min_elevation) brackets a rise or set,
+    refined by bisection, and the culmination is the root of the
+    elevation's time derivative between them. Returns, per observer, a
+    list of dicts with rise, culmination and set unix times and the
+    maximum elevation in degrees.
+    """
+    positions, ups = observer_frames(np.atleast_1d(lats), np.atleast_1d(lons))
+    times = start + np.arange(0, hours * 3600 + step, step)
+    above = elevations(propagate(elements, times), positions, ups) - min_elevation
+    iterations = max(1, int(math.ceil(math.log2(step / tolerance))))
+
+    crossing_observer, crossing_index = np.nonzero(np.diff(np.sign(above), axis=1))
+    rising = above[crossing_observer, crossing_index + 1] > above[crossing_observer, crossing_index]
+
+    def offset_elevation(observers):
+        return lambda t: _elevation_at(elements, positions, ups, observers, t) - min_elevation
+
+    crossing_times = _bisect(offset_elevation(crossing_observer),
+                             times[crossing_index], times[crossing_index + 1], iterations)
+
+    passes = [[] for _ in range(len(positions))]
+    rises = {}
+    for observer, is_rising, when, index in zip(crossing_observer.tolist(), rising.tolist(),
+                                                crossing_times.tolist(), crossing_index.tolist()):
+        if is_rising:
+            rises[observer] = (when, index)
+        elif observer in rises:
+            rise, rise_index = rises.pop(observer)
+            passes[observer].append((rise, when, rise_index, index + 1))
+
+    # Culminations: root of d(elevation)/dt around the highest grid sample
+    flat = [(observer, rise, set_time, first, last)
+            for observer, observer_passes in enumerate(passes)
+            for rise, set_time, first, last in observer_passes]
+    if not flat:
+        return [[] for _ in passes]
+    observer_ids = np.array([item[0] for item in flat])
+    peaks = np.array([item[3] + int(np.argmax(above[item[0], item[3]:item[4] + 1])) for item in flat])
+    low = np.maximum(times[np.maximum(peaks - 1, 0)], [item[1] for item in flat])
+    high = np.minimum(times[np.minimum(peaks + 1, len(times) - 1)], [item[2] for item in flat])
+    elevation = offset_elevation(observer_ids)
+    slope = lambda t: elevation(t + 0.05) - elevation(t - 0.05)
+    culminations = _bisect(slope, low, high, iterations + 2)
+    max_elevations = elevation(culminations) + min_elevation
+
+    results = [[] for _ in passes]
+    for (observer, rise, set_time, _, _), culmination, max_elevation in zip(
+            flat, culminations.tolist(), max_elevations.tolist()):
+        results[observer].append({
+            'rise': rise,
+            'culmination': culmination,
+            'set': set_time,
+            'max_elevation': max_elevation
+        })
+    return results
@@ -0,0 +1,293 @@
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RATE_LIMIT = float(os.getenv('NASA_RATE_LIMIT', 2))            # tokens per second
+RATE_BURST = float(os.getenv('NASA_RATE_BURST', 4))            # bucket capacity
+RATE_MAX_WAIT = float(os.getenv('NASA_RATE_LIMIT_WAIT', 5))    # seconds a call may queue
+RATE_BACKEND = os.getenv('NASA_RATE_LIMIT_BACKEND', 'sqlite')
+RATE_PATH = os.getenv('NASA_RATE_LIMIT_PATH', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'instance', 'rate_limit.sqlite'
+))
+RATE_REDIS_URL = os.getenv('NASA_RATE_LIMIT_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+# Imagery tiles are far cheaper than API calls but still shared upstream
+GIBS_HOST = os.getenv('GIBS_RATE_LIMIT_HOST', 'gibs.earthdata.nasa.gov')
+GIBS_RATE_LIMIT = float(os.getenv('GIBS_RATE_LIMIT', 20))
+GIBS_RATE_BURST = float(os.getenv('GIBS_RATE_BURST', 40))
+
+# Below this share of the hourly quota the refill rate is scaled down
+LOW_QUOTA_RATIO = 0.1
+MIN_RATE_SCALE = 0.05
+
+class RateLimitExceeded(Exception):
+    """Raised when a call cannot get a token before its deadline"""
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        super().__init__(
+            f"NASA API rate limit reached. Please try again in {max(1, round(retry_after))} seconds."
+        )
+
+class BucketState:
+    __slots__ = ('tokens', 'updated_at', 'scale', 'blocked_until')
+
+    def __init__(self, tokens, updated_at, scale=1.0, blocked_until=0.0):
+        self.tokens = tokens
+        self.updated_at = updated_at
+        self.scale = scale
+        self.blocked_until = blocked_until
+
+def reserve_token(state, now, rate, capacity, max_wait):
+    """Try to reserve one token from state (mutated in place).
+
+    Returns the number of seconds the caller must wait before using the
+    token. If that would exceed max_wait nothing is reserved and
+    RateLimitExceeded is raised, so callers never block without bound.
+    """
+    if now < state.blocked_until:
+        raise RateLimitExceeded(state.blocked_until - now)
+
+    effective_rate = rate * state.scale
+    elapsed = max(0.0, now - state.updated_at)
+    tokens = min(capacity, state.tokens + elapsed * effective_rate)
+
+    # Tokens may go negative: each queued caller reserves its own slot
+    wait = 0.0 if tokens >= 1 else (1 - tokens) / effective_rate
+    if wait > max_wait:
+        raise RateLimitExceeded(wait)
+
+    state.tokens = tokens - 1
+    state.updated_at = now
+    return wait
+
+def scale_from_headers(headers):
+    """Derive a refill scale from NASA's X-RateLimit-* headers"""
+    remaining = headers.get('X-RateLimit-Remaining')
+    if remaining is None:
+        return None
+    try:
+        remaining = int(remaining)
+        limit = int(headers.get('X-RateLimit-Limit', 1000))
+    except ValueError:
+        return None
+    threshold = max(1, limit * LOW_QUOTA_RATIO)
+    if remaining >= threshold:
+        return 1.0
+    return max(MIN_RATE_SCALE, remaining / threshold)
+
+class LocalBucketStore:
+    """In-process bucket store (single worker, or tests)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def _state(self, name, capacity, now):
+        if name not in self._states:
+            self._states[name] = BucketState(capacity, now)
+        return self._states[name]
+
+    def reserve(self, name, rate, capacity, max_wait):
+        now = time.time()
+        with self._lock:
+            return reserve_token(self._state(name, capacity, now), now, rate, capacity, max_wait)
+
+    def update(self, name, capacity, scale=None, blocked_until=None):
+        with self._lock:
+            state = self._state(name, capacity, time.time())
+            if scale is not None:
+                state.scale = scale
+            if blocked_until is not None:
+                state.blocked_until = max(state.blocked_until, blocked_until)
+
+class SQLiteBucketStore:
+    """Bucket store shared by every worker on the host through a SQLite file.
+
+    ``BEGIN IMMEDIATE`` takes the database write lock, so the
+    read-refill-write of a bucket is atomic across processes.
+    """
+
+    def __init__(self, path=RATE_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "name TEXT PRIMARY KEY, tokens REAL, updated_at REAL, "
+                "scale REAL DEFAULT 1.0, blocked_until REAL DEFAULT 0.0)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, name, capacity, apply):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated_at, scale, blocked_until FROM buckets WHERE name = ?", (name,)
+            ).fetchone()
+            state = BucketState(*row) if row else BucketState(capacity, now)
+            result = apply(state, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated_at, scale, blocked_until) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (name, state.tokens, state.updated_at, state.scale, state.blocked_until)
+            )
+            conn.execute('COMMIT')
+            return result
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def reserve(self, name, rate, capacity, max_wait):
+        return self._transaction(
+            name, capacity,
+            lambda state, now: reserve_token(state, now, rate, capacity, max_wait)
+        )
+
+    def update(self, name, capacity, scale=None, blocked_until=None):
+        def apply(state, now):
+            if scale is not None:
+                state.scale = scale
+            if blocked_until is not None:
+                state.blocked_until = max(state.blocked_until, blocked_until)
+        self._transaction(name, capacity, apply)
+
+class RedisBucketStore:
+    """Bucket store shared across hosts through Redis (optimistic WATCH/MULTI)"""
+
+    def __init__(self, url=RATE_REDIS_URL, client=None, prefix='nasa:ratelimit:'):
+        if client is None:
+            import redis
+            client = redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _transaction(self, name, capacity, apply):
+        import redis
+        key = self.prefix + name
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    now = time.time()
+                    raw = pipe.hgetall(key)
+                    if raw:
+                        state = BucketState(*(float(raw[field]) for field in
+                                              (b'tokens', b'updated_at', b'scale', b'blocked_until')))
+                    else:
+                        state = BucketState(capacity, now)
+                    result = apply(state, now)
+                    pipe.multi()
+                    pipe.hset(key, mapping={
+                        'tokens': state.tokens,
+                        'updated_at': state.updated_at,
+                        'scale': state.scale,
+                        'blocked_until': state.blocked_until
+                    })
+                    pipe.expire(key, 24 * 3600)
+                    pipe.execute()
+                    return result
+                except redis.WatchError:
+                    continue
+
+    def reserve(self, name, rate, capacity, max_wait):
+        return self._transaction(
+            name, capacity,
+            lambda state, now: reserve_token(state, now, rate, capacity, max_wait)
+        )
+
+    def update(self, name, capacity, scale=None, blocked_until=None):
+        def apply(state, now):
+            if scale is not None:
+                state.scale = scale
+            if blocked_until is not None:
+                state.blocked_until = max(state.blocked_until, blocked_until)
+        self._transaction(name, capacity, apply)
+
+def create_store(name=RATE_BACKEND):
+    """Create a bucket store: local, sqlite or redis"""
+    name = (name or 'sqlite').lower()
+    if name == 'local':
+        return LocalBucketStore()
+    if name == 'sqlite':
+        return SQLiteBucketStore()
+    if name == 'redis':
+        return RedisBucketStore()
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+class TokenBucketLimiter:
+    """Token-bucket limiter whose state lives in a shared store.
+
+    ``acquire`` reserves a token and sleeps only for the reserved slot, up
+    to ``max_wait`` seconds; past that it raises RateLimitExceeded right
+    away. ``observe`` feeds upstream rate-limit headers back into the
+    bucket so every worker slows down when the hourly quota runs low.
+    """
+
+    def __init__(self, store, name, rate=RATE_LIMIT, capacity=RATE_BURST, max_wait=RATE_MAX_WAIT):
+        self.store = store
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.max_wait = max_wait
+
+    def acquire(self, max_wait=None):
+        wait = self.store.reserve(
+            self.name, self.rate, self.capacity,
+            self.max_wait if max_wait is None else max_wait
+        )
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def observe(self, status_code, headers):
+        if status_code == 429:
+            try:
+                retry_after = float(headers.get('Retry-After', 60))
+            except ValueError:
+                retry_after = 60.0
+            self.store.update(self.name, self.capacity, scale=MIN_RATE_SCALE,
+                              blocked_until=time.time() + retry_after)
+            return
+        scale = scale_from_headers(headers)
+        if scale is not None:
+            self.store.update(self.name, self.capacity, scale=scale)
+
+# Hosts whose calls draw from a shared bucket: host -> (rate, burst)
+HOST_LIMITS = {
+    'api.nasa.gov': (RATE_LIMIT, RATE_BURST),
+    GIBS_HOST: (GIBS_RATE_LIMIT, GIBS_RATE_BURST),
+}
+RATE_LIMITED_HOSTS = tuple(HOST_LIMITS)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+_store = None
+
+def get_limiter(host):
+    """Return the shared limiter for a host, or None if the host is not limited"""
+    global _store
+    if host not in RATE_LIMITED_HOSTS:
+        return None
+    if host not in _limiters:
+        with _limiters_lock:
+            if _store is None:
+                _store = create_store()
+            if host not in _limiters:
+                rate, burst = HOST_LIMITS[host]
+                _limiters[host] = TokenBucketLimiter(_store, host, rate=rate, capacity=burst)
+    return _limiters[host]
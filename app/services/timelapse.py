@@ -0,0 +1,309 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import cv2
+from dotenv import load_dotenv
+from app import db
+from app.services import earth_tiles
+from app.services.change_detection import RECENT_TTL, ComparisonError, mosaic
+from app.services.concurrency import bounded_map
+from app.services.http_cache import is_historical
+from app.services.rate_limit import RateLimitExceeded
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, duplicate renders are possible
+    fcntl = None
+
+load_dotenv()
+
+TIMELAPSE_DIR = os.getenv('TIMELAPSE_DIR', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'instance', 'timelapse'
+))
+PIPELINE_VERSION = 1
+# Container -> (OpenCV fourcc, mimetype); VP8 WebM plays in every current browser
+FORMATS = {
+    'webm': ('VP80', 'video/webm'),
+    'mp4': ('mp4v', 'video/mp4'),
+}
+DEFAULT_FORMAT = 'webm'
+MAX_FRAMES = 120
+DEFAULT_DIM = 4.0
+MIN_DIM, MAX_DIM = 0.5, 20.0
+# Frames being fetched at once; each frame fetches its own tiles in parallel
+FRAME_WINDOW = 3
+ARTIFACT_URL = '/earth/timelapse/{key}.{ext}'
+# Renders running at once in this process; further requests get a 429
+MAX_RENDERS = int(os.getenv('TIMELAPSE_MAX_RENDERS', '2'))
+BUSY_RETRY_AFTER = 30
+
+_render_slots = threading.BoundedSemaphore(MAX_RENDERS)
+
+class TimelapseError(ValueError):
+    pass
+
+class TimelapseBusy(Exception):
+    pass
+
+class TimelapseRequest:
+    """Validated time-lapse parameters"""
+    __slots__ = ('lat', 'lon', 'start', 'end', 'step', 'dim', 'fps', 'fmt', 'layer', 'revision')
+
+    def __init__(self, lat, lon, start, end, step=7, dim=None, fps=4, fmt=DEFAULT_FORMAT,
+                 layer=earth_tiles.DEFAULT_LAYER):
+        if not (-85 <= lat <= 85 and -180 <= lon <= 180):
+            raise TimelapseError("Latitude or longitude out of range")
+        try:
+            self.start = datetime.strptime(start, '%Y-%m-%d').date()
+            self.end = datetime.strptime(end, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            raise TimelapseError("start and end must be YYYY-MM-DD")
+        if self.start > self.end:
+            raise TimelapseError("start must not be after end")
+        if self.end >= datetime.utcnow().date():
+            raise TimelapseError("end must be before today")
+        if not 1 <= step <= 366:
+            raise TimelapseError("step must be between 1 and 366 days")
+        if not 1 <= fps <= 30:
+            raise TimelapseError("fps must be between 1 and 30")
+        if fmt not in FORMATS:
+            raise TimelapseError(f"format must be one of: {', '.join(FORMATS)}")
+        if layer not in earth_tiles.LAYERS:
+            raise TimelapseError(f"Unknown layer: {layer}")
+        self.lat, self.lon = round(lat, 4), round(lon, 4)
+        self.step = step
+        self.dim = DEFAULT_DIM if dim is None else min(MAX_DIM, max(MIN_DIM, dim))
+        self.fps = fps
+        self.fmt = fmt
+        self.layer = layer
+        if len(self.dates()) > MAX_FRAMES:
+            raise TimelapseError(f"A time-lapse is limited to {MAX_FRAMES} frames; use a larger step")
+        # Recent imagery is still being filled in upstream, so a video
+        # reaching a recent date is only reused for RECENT_TTL seconds
+        self.revision = None if is_historical(self.end) else int(time.time() // RECENT_TTL)
+
+    @property
+    def recent(self):
+        return self.revision is not None
+
+    def dates(self):
+        count = (self.end - self.start).days // self.step + 1
+        return [(self.start + timedelta(days=i * self.step)).strftime('%Y-%m-%d') for i in range(count)]
+
+    @property
+    def key(self):
+        parts = [self.lat, self.lon, str(self.start), str(self.end), self.step, self.dim,
+                 self.fps, self.fmt, self.layer, PIPELINE_VERSION]
+        if self.recent:
+            parts.append(self.revision)
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+def artifact_url(key, fmt):
+    return ARTIFACT_URL.format(key=key, ext=fmt)
+
+def _directory(key, recent=False, root=TIMELAPSE_DIR):
+    if recent:
+        return os.path.join(root, 'recent', key[:2])
+    return os.path.join(root, key[:2])
+
+def artifact_path(key, fmt, recent=False, root=TIMELAPSE_DIR):
+    return os.path.join(_directory(key, recent, root), f"{key}.{fmt}")
+
+def status_path(key, recent=False, root=TIMELAPSE_DIR):
+    return os.path.join(_directory(key, recent, root), f"{key}.json")
+
+def find_artifact(key, fmt):
+    """Path of a finished video, or None"""
+    for recent in (False, True):
+        path = artifact_path(key, fmt, recent)
+        if os.path.exists(path):
+            return path
+    return None
+
+def read_status(key):
+    """Progress of a render as written by whichever worker runs it, or None"""
+    for recent in (False, True):
+        try:
+            with open(status_path(key, recent)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return None
+
+def purge_recent(now=None, root=TIMELAPSE_DIR):
+    """Delete videos reaching a recent date, and their status, after two RECENT_TTL periods"""
+    cutoff = (now or time.time()) - 2 * RECENT_TTL
+    # A running render rewrites its status on every frame, so only
+    # finished or abandoned ones are old enough
+    for path in glob.glob(os.path.join(root, 'recent', '*', '*.json')):
+        try:
+            if os.path.getmtime(path) >= cutoff:
+                continue
+        except OSError:
+            continue
+        for name in glob.glob(path[:-len('.json')] + '.*'):
+            _discard(name)
+
+def _write_status(key, recent, **status):
+    path = status_path(key, recent)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(dict(status, updated_at=time.time()), f)
+    os.replace(tmp_path, path)
+
+def frames(job, stored_tiles):
+    """Yield (date, BGR image) for each date in order; image is None without imagery.
+
+    Frames are fetched FRAME_WINDOW at a time, so only that many are ever
+    held in memory regardless of the range. Tiles fetched upstream for
+    the first time are appended to stored_tiles.
+    """
+    zoom = earth_tiles.zoom_for_dim(job.dim, job.layer)
+
+    def fetch(date):
+        try:
+            image, stored = mosaic(job.layer, date, job.lat, job.lon, job.dim, zoom)
+        except ComparisonError:
+            return date, None, []
+        return date, image, stored
+
+    for date, image, stored in bounded_map(fetch, job.dates(), FRAME_WINDOW):
+        stored_tiles.extend(stored)
+        yield date, image
+
+def encode(job, path, progress=None):
+    """Write the frames of job to a video file; returns the frame count"""
+    fourcc, _ = FORMATS[job.fmt]
+    tmp_path = _tmp_path(path, job.fmt)
+    stored_tiles = []
+    writer = None
+    size = None
+    count = 0
+    total = len(job.dates())
+    try:
+        for done, (date, image) in enumerate(frames(job, stored_tiles), 1):
+            if progress:
+                progress(done, total)
+            if image is None:
+                continue
+            if writer is None:
+                # yuv420 codecs need even dimensions
+                height, width = image.shape[0] // 2 * 2, image.shape[1] // 2 * 2
+                size = (width, height)
+                writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*fourcc), job.fps, size)
+                if not writer.isOpened():
+                    raise TimelapseError(f"This OpenCV build cannot encode {job.fmt}")
+            if image.shape[1::-1] != size:
+                image = cv2.resize(image, size) if abs(image.shape[1] - size[0]) > 1 else image[:size[1], :size[0]]
+            image = image.copy()
+            cv2.putText(image, date, (10, 28), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 4, cv2.LINE_AA)
+            cv2.putText(image, date, (10, 28), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2, cv2.LINE_AA)
+            writer.write(image)
+            count += 1
+    finally:
+        if writer is not None:
+            writer.release()
+        earth_tiles.record_tiles(stored_tiles)
+    if not count:
+        raise TimelapseError("No imagery for any date in the range")
+    os.replace(tmp_path, path)
+    return count
+
+def _tmp_path(path, fmt):
+    # OpenCV picks the container from the extension, so keep it last
+    return f"{path}.{threading.get_ident()}.tmp.{fmt}"
+
+def _discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _lock(key, recent):
+    """Non-blocking exclusive lock for rendering key; None if another worker holds it"""
+    if fcntl is None:
+        return True
+    path = status_path(key, recent) + '.lock'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lock_file = open(path, 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+def render(job):
+    """Render job unless it is cached or already rendering; keeps the status file current"""
+    key, recent = job.key, job.recent
+    lock_file = _lock(key, recent)
+    if lock_file is None:
+        return
+    try:
+        path = artifact_path(key, job.fmt, recent)
+        if os.path.exists(path):
+            return
+        total = len(job.dates())
+        _write_status(key, recent, status='running', done=0, total=total)
+        try:
+            count = encode(job, path,
+                           progress=lambda done, total: _write_status(key, recent, status='running',
+                                                                      done=done, total=total))
+            db.session.commit()
+        except (TimelapseError, earth_tiles.TileError, RateLimitExceeded, OSError) as e:
+            db.session.rollback()
+            _discard(_tmp_path(path, job.fmt))
+            _write_status(key, recent, status='failed', error=str(e), done=0, total=total)
+            return
+        except Exception as e:
+            db.session.rollback()
+            _discard(_tmp_path(path, job.fmt))
+            print(f"Error rendering time-lapse: {e}")
+            _write_status(key, recent, status='failed', error='Rendering failed', done=0, total=total)
+            return
+        _write_status(key, recent, status='done', done=total, total=total, frames=count,
+                      url=artifact_url(key, job.fmt))
+    finally:
+        if lock_file is not True:
+            lock_file.close()
+    if recent:
+        purge_recent()
+
+def start(job, app):
+    """Current status of job, starting a background render if nothing has produced it yet.
+
+    Raises TimelapseBusy when MAX_RENDERS renders are already running.
+    """
+    key, recent = job.key, job.recent
+    if os.path.exists(artifact_path(key, job.fmt, recent)):
+        return {'status': 'done', 'key': key, 'url': artifact_url(key, job.fmt)}
+    status = read_status(key)
+    if status is None or status['status'] == 'failed' or not _render_running(key, recent):
+        if not _render_slots.acquire(blocking=False):
+            raise TimelapseBusy("Too many time-lapses are rendering; try again shortly")
+        status = {'status': 'running', 'done': 0, 'total': len(job.dates())}
+        _write_status(key, recent, **status)
+
+        def run():
+            try:
+                with app.app_context():
+                    render(job)
+            finally:
+                _render_slots.release()
+
+        threading.Thread(target=run, name=f'timelapse-{key[:8]}', daemon=True).start()
+    return dict(status, key=key)
+
+def _render_running(key, recent):
+    lock_file = _lock(key, recent)
+    if lock_file is None:
+        return True
+    if lock_file is not True:
+        lock_file.close()
+    return False
@@ -0,0 +1,97 @@
+import numpy as np
+
+RESOLUTIONS = ('daily', 'weekly', 'monthly')
+PERCENTILES = (10, 90)
+
+def bucket_keys(dates, resolution):
+    """Integer bucket per datetime64[D] date: the day, the ISO week or the month"""
+    if resolution == 'daily':
+        return dates.astype(np.int64)
+    if resolution == 'weekly':
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        return (dates.astype(np.int64) + 3) // 7
+    if resolution == 'monthly':
+        return dates.astype('datetime64[M]').astype(np.int64)
+    raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+
+def resample(dates, values, resolution='daily', percentiles=PERCENTILES):
+    """Aggregate a sorted daily series into buckets.
+
+    Returns (first date of each bucket, stats) where stats holds mean, min, max
+    and one array per percentile ('p10', 'p90', ...) with one value per
+    bucket. NaN values are ignored.
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    values = np.asarray(values, dtype=np.float64)
+    keys = bucket_keys(dates, resolution)
+    if len(values) == 0:
+        empty = np.array([], dtype=np.float64)
+        return dates, {name: empty for name in ('mean', 'min', 'max', *(f'p{p:g}' for p in percentiles))}
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+    valid = ~np.isnan(values)
+    counts = np.add.reduceat(valid.astype(np.int64), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stats = {
+            'mean': np.add.reduceat(np.where(valid, values, 0.0), starts) / counts,
+            'min': np.fmin.reduceat(values, starts),
+            'max': np.fmax.reduceat(values, starts),
+        }
+    if len(starts) == len(values):
+        # One sample per bucket: every percentile is the sample itself
+        for p in percentiles:
+            stats[f'p{p:g}'] = values.copy()
+    elif percentiles:
+        bands = np.full((len(percentiles), len(starts)), np.nan)
+        for i, chunk in enumerate(np.split(values, starts[1:])):
+            chunk = chunk[~np.isnan(chunk)]
+            if len(chunk):
+                bands[:, i] = np.percentile(chunk, percentiles)
+        for p, band in zip(percentiles, bands):
+            stats[f'p{p:g}'] = band
+    return dates[starts], stats
+
+def rolling_mean(values, window):
+    """Trailing mean over `window` points; the first window - 1 points are NaN"""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if window < 1 or len(values) < window:
+        return result
+    sums = np.cumsum(np.r_[0.0, values])
+    result[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return result
+
+def lttb(x, y, threshold):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps out of (x, y).
+
+    Keeps the first and last point and, from each of threshold - 2 equal
+    buckets in between, the point forming the largest triangle with the
+    previously kept point and the mean of the next bucket.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean() if next_end > end else y[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous]) -
+            (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        kept[i + 1] = previous
+    return kept
+
+def to_list(values, decimals=1):
+    """JSON-friendly list: rounded floats with NaN as None"""
+    values = np.round(np.asarray(values, dtype=np.float64), decimals)
+    return [None if np.isnan(v) else v for v in values.tolist()]
@@ -0,0 +1,156 @@
+import os
+import threading
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from app.services.cache import CacheStats, DEFAULT_POLICY, create_backend
+from app.services.rate_limit import get_limiter
+
+load_dotenv()
+
+DEFAULT_POOL_SIZE = int(os.getenv('NASA_HTTP_POOL_SIZE', 10))
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv('NASA_HTTP_CONNECT_TIMEOUT', 3.05))
+DEFAULT_READ_TIMEOUT = float(os.getenv('NASA_HTTP_READ_TIMEOUT', 10))
+
+DEFAULT_HEADERS = {
+    'Accept': 'application/json',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'User-Agent': 'nasa-space-explorer',
+}
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that draws a token from the host's shared bucket per request.
+
+    Cached responses are answered by the session before they reach the
+    adapter, so only real upstream calls consume tokens.
+    """
+
+    def __init__(self, limiter_for=get_limiter, **kwargs):
+        self.limiter_for = limiter_for
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        limiter = self.limiter_for(urlparse(request.url).hostname) if self.limiter_for else None
+        if limiter is not None:
+            limiter.acquire()
+        response = super().send(request, **kwargs)
+        if limiter is not None:
+            limiter.observe(response.status_code, response.headers)
+        return response
+
+class HTTPTransport:
+    """Shared keep-alive HTTP transport with per-host connection pools.
+
+    A single ``requests.Session`` is shared by every thread of the worker.
+    urllib3 keeps one connection pool per host (api.nasa.gov, open-notify,
+    ...) so repeated calls reuse the TCP/TLS connection instead of paying
+    for a new handshake every time.
+
+    When a cache backend is given the session is a requests-cache
+    ``CachedSession``; callers pass a ``CachePolicy`` per request to choose
+    the TTL and stale-while-revalidate window. Requests that do go upstream
+    are throttled by the shared token-bucket limiter for their host.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, pool_block=False, cache_backend=None,
+                 limiter_for=get_limiter):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_block = pool_block
+        self.cache_backend = cache_backend
+        self.limiter_for = limiter_for
+        self.cache_stats = CacheStats()
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def cached(self):
+        return self.cache_backend is not None
+
+    def _create_session(self):
+        if self.cached:
+            from requests_cache import CachedSession
+            session = CachedSession(
+                backend=self.cache_backend,
+                expire_after=DEFAULT_POLICY.expire_after,
+                allowable_codes=(200,),
+                allowable_methods=('GET',),
+                cache_control=False
+            )
+        else:
+            session = requests.Session()
+        session.headers.update(DEFAULT_HEADERS)
+        adapter = self._create_adapter()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _create_adapter(self):
+        return RateLimitedAdapter(
+            limiter_for=self.limiter_for,
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            pool_block=self.pool_block
+        )
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def timeout(self, read_timeout=None):
+        """Return a (connect, read) timeout tuple"""
+        return (self.connect_timeout, read_timeout or self.read_timeout)
+
+    def get(self, url, params=None, read_timeout=None, cache_policy=None, **kwargs):
+        """GET a URL through the pooled (and, if configured, cached) session"""
+        kwargs.setdefault('timeout', self.timeout(read_timeout))
+        if not self.cached:
+            return self.session.get(url, params=params, **kwargs)
+
+        if cache_policy is not None:
+            kwargs['expire_after'] = cache_policy.expire_after
+            if cache_policy.stale_while_revalidate:
+                headers = dict(kwargs.pop('headers', None) or {})
+                headers['Cache-Control'] = f"stale-while-revalidate={cache_policy.stale_while_revalidate}"
+                kwargs['headers'] = headers
+        response = self.session.get(url, params=params, **kwargs)
+        self.cache_stats.record(response)
+        return response
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+_transport = None
+_transport_lock = threading.Lock()
+
+def get_transport():
+    """Return the process-wide shared transport"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = HTTPTransport(cache_backend=create_backend())
+    return _transport
+
+def set_transport(transport):
+    """Replace the process-wide transport (e.g. to point at a stub server)"""
+    global _transport
+    with _transport_lock:
+        if _transport is not None and _transport is not transport:
+            _transport.close()
+        _transport = transport
+
+def get_cache_stats():
+    """Hit/miss counters of the shared transport's response cache"""
+    return get_transport().cache_stats.as_dict()
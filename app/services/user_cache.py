@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+
+load_dotenv()
+
+# Snapshots are per process; the TTL bounds how long another worker can
+# serve a user that changed elsewhere
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 60))
+USER_CACHE_MAX_ENTRIES = int(os.getenv('USER_CACHE_MAX_ENTRIES', 10000))
+# Favorite states remembered per snapshot before they are dropped
+MAX_KNOWN_FAVORITES = 2000
+
+class UserSnapshot:
+    """Read-only copy of the User fields views need, plus favorite states seen so far.
+
+    Provides the Flask-Login user interface, so it can be returned from the
+    user loader in place of the ORM object. Favorites are not loaded up
+    front: favorited() looks up the ids a request asks about and remembers
+    the answers for the snapshot's lifetime.
+    """
+    __slots__ = ('id', 'username', 'email', 'created_at', 'known_favorites')
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, username, email, created_at):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.created_at = created_at
+        # nasa_id -> whether it is a favorite
+        self.known_favorites = {}
+
+    def get_id(self):
+        return str(self.id)
+
+    def favorited(self, nasa_ids, load):
+        """The subset of nasa_ids (strings) that are favorites; load(ids) queries the unseen ones"""
+        known = self.known_favorites
+        missing = [nasa_id for nasa_id in nasa_ids if nasa_id not in known]
+        found = load(missing) if missing else set()
+        result = {nasa_id for nasa_id in nasa_ids if nasa_id in found or known.get(nasa_id)}
+        if len(known) + len(missing) > MAX_KNOWN_FAVORITES:
+            known = self.known_favorites = {}
+        known.update((nasa_id, nasa_id in found) for nasa_id in missing)
+        return result
+
+class UserCache:
+    def __init__(self, ttl=USER_CACHE_TTL, max_entries=USER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Snapshot of a user, loaded from the database at most once per TTL"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry and entry[0] > now:
+            return entry[1]
+
+        snapshot = load_snapshot(user_id)
+        if snapshot is None:
+            return None
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries = {key: value for key, value in self._entries.items() if value[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[user_id] = (now + self.ttl, snapshot)
+        return snapshot
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def load_snapshot(user_id):
+    from app.models import User
+    row = db.session.query(User.id, User.username, User.email, User.created_at)\
+        .filter(User.id == user_id).first()
+    if row is None:
+        return None
+    return UserSnapshot(row.id, row.username, row.email, row.created_at)
+
+user_cache = UserCache()
+
+def mark_changed(session, user_id):
+    """Drop the user's snapshot once the session commits"""
+    session.info.setdefault('changed_user_ids', set()).add(user_id)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    from app.models import User, Favorite
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, User) and instance.id is not None:
+            mark_changed(session, instance.id)
+        elif isinstance(instance, Favorite) and instance.user_id is not None:
+            mark_changed(session, instance.user_id)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        user_cache.invalidate(user_id)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_users(session):
+    session.info.pop('changed_user_ids', None)
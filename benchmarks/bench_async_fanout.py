@@ -0,0 +1,57 @@
+"""Sequential vs. concurrent fan-out of independent upstream calls.
+
+Mirrors the /iss page: the crew and position calls against a stub server
+that adds artificial latency. Concurrent wall time should track the
+slowest single call rather than the sum.
+
+    python -m benchmarks.bench_async_fanout --latency-ms 200
+"""
+import argparse
+import time
+from app.services.nasa_api import NASAAPI
+from app.services.async_nasa_api import AsyncNASAAPI, gather
+from app.services.transport import HTTPTransport, set_transport
+from benchmarks.stub_server import StubServer
+
+def route(path):
+    if path.startswith('/astros.json'):
+        return 200, {'people': [], 'number': 0}, 'application/json'
+    if path.startswith('/iss-now.json'):
+        return 200, {'iss_position': {'latitude': '0', 'longitude': '0'}, 'timestamp': 0}, 'application/json'
+    return 404, b'', 'text/plain'
+
+def timed(func, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - started) / rounds * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency-ms', type=float, default=200.0)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    with StubServer(route=route, latency=args.latency_ms / 1000) as server:
+        # No cache and no limiter: measure the fan-out itself
+        set_transport(HTTPTransport(cache_backend=None, limiter_for=None))
+        NASAAPI.BASE_URL = server.url
+        NASAAPI.ISS_BASE_URL = server.url
+        api = NASAAPI()
+        async_api = AsyncNASAAPI(api)
+
+        pages = {
+            '/iss': (
+                lambda: (api.get_astronauts(), api.get_iss_position()),
+                lambda: gather(async_api.get_astronauts(), async_api.get_iss_position()),
+            ),
+        }
+
+        print(f"{args.latency_ms:.0f} ms artificial latency per call")
+        for page, (sequential, concurrent) in pages.items():
+            seq_ms = timed(sequential, args.rounds)
+            con_ms = timed(concurrent, args.rounds)
+            print(f"{page:<8} sequential={seq_ms:7.1f} ms  concurrent={con_ms:7.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Natural event lookups: linear scans vs. the geohash prefix index.
+
+Loads tens of thousands of synthetic events into a temporary SQLite
+database, checks that every strategy returns the same events for random
+radius and bounding-box queries, and reports the median time per query.
+
+    python -m benchmarks.bench_event_spatial
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+
+def synthetic_events(count, seed=42):
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        # Cluster most events like wildfires and storms do, spread the rest
+        if rng.random() < 0.7:
+            lat = rng.gauss(rng.choice([38, -15, 60, 5]), 8)
+            lon = rng.gauss(rng.choice([-120, 130, 25, -60]), 15)
+        else:
+            lat, lon = rng.uniform(-80, 80), rng.uniform(-180, 180)
+        lat = max(-89.9, min(89.9, lat))
+        lon = (lon + 180) % 360 - 180
+        events.append({
+            'id': f"EONET_{i}",
+            'title': f"Event {i}",
+            'categories': [{'id': 'wildfires', 'title': 'Wildfires'}],
+            'sources': [],
+            'geometry': [{'date': '2024-06-01T00:00:00Z', 'type': 'Point', 'coordinates': [lon, lat]}]
+        })
+    return events
+
+def python_haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(min(1.0, a)))
+
+def median_ms(func, queries):
+    timings = []
+    results = []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(func(*query))
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--radius-km', type=float, default=100)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'events.db')}"
+    os.environ.setdefault('NASA_API_KEY', 'benchmark')
+
+    import numpy as np
+    from app import create_app, db
+    from app.models import EarthEvent
+    from app.services import eonet_store, geodesy
+
+    app = create_app()
+    rng = random.Random(7)
+    with app.app_context():
+        for size in args.sizes:
+            EarthEvent.query.delete()
+            eonet_store.store_events(synthetic_events(size))
+            db.session.commit()
+
+            points = db.session.query(EarthEvent.id, EarthEvent.latitude, EarthEvent.longitude).all()
+            ids = np.array([p[0] for p in points])
+            lats = np.array([p[1] for p in points])
+            lons = np.array([p[2] for p in points])
+
+            centers = [(rng.gauss(38, 10), rng.gauss(-120, 15)) for _ in range(args.queries)]
+            radius_queries = [(lat, lon, args.radius_km) for lat, lon in centers]
+            boxes = [(lat - 1, lon - 1.5, lat + 1, lon + 1.5) for lat, lon in centers]
+
+            def python_scan(lat, lon, radius_km):
+                rows = db.session.query(EarthEvent.id, EarthEvent.latitude, EarthEvent.longitude).all()
+                return sorted(row[0] for row in rows if python_haversine(lat, lon, row[1], row[2]) <= radius_km)
+
+            def numpy_scan(lat, lon, radius_km):
+                return sorted(ids[geodesy.haversine_km(lat, lon, lats, lons) <= radius_km].tolist())
+
+            def indexed(lat, lon, radius_km):
+                return sorted(eonet_store.nearest_ids(lat, lon, radius_km, limit=size, status='all')[0])
+
+            def bbox_sql_scan(south, west, north, east):
+                # No index covers latitude/longitude, so SQLite reads every row
+                query = db.session.query(EarthEvent.id).filter(
+                    EarthEvent.latitude.between(south, north), EarthEvent.longitude.between(west, east))
+                return sorted(row[0] for row in query)
+
+            def bbox_scan(south, west, north, east):
+                inside = (lats >= south) & (lats <= north) & (lons >= west) & (lons <= east)
+                return sorted(ids[inside].tolist())
+
+            def bbox_indexed(south, west, north, east):
+                return sorted(eonet_store.bbox_ids(south, west, north, east, limit=size, status='all'))
+
+            python_ms, expected = median_ms(python_scan, radius_queries[:10])
+            numpy_ms, numpy_results = median_ms(numpy_scan, radius_queries)
+            indexed_ms, indexed_results = median_ms(indexed, radius_queries)
+            assert indexed_results[:10] == expected and indexed_results == numpy_results, "radius results differ"
+
+            bbox_sql_ms, bbox_expected = median_ms(bbox_sql_scan, boxes)
+            bbox_scan_ms, bbox_scan_results = median_ms(bbox_scan, boxes)
+            bbox_ms, bbox_results = median_ms(bbox_indexed, boxes)
+            assert bbox_results == bbox_expected == bbox_scan_results, "bbox results differ"
+
+            matches = statistics.median(len(result) for result in indexed_results)
+            print(f"{size:>6} events  radius {args.radius_km:g} km (median {matches:g} hits): "
+                  f"python scan={python_ms:8.2f} ms  numpy scan (rows preloaded)={numpy_ms:6.2f} ms  "
+                  f"geohash={indexed_ms:6.3f} ms")
+            print(f"{'':>6}         bbox 2x3 deg: sql scan={bbox_sql_ms:6.2f} ms  "
+                  f"numpy scan (rows preloaded)={bbox_scan_ms:6.3f} ms  geohash={bbox_ms:6.3f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""ISS pass prediction: batched propagation and the per-cell pass cache.
+
+Times one find_passes call for growing numbers of observers (cold), then
+repeated pass_predictions lookups for observers whose grid cell is
+already cached (warm).
+
+    python -m benchmarks.bench_iss_passes
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# A real ISS element set; the benchmark propagates from its own epoch
+SAMPLE_TLE = (
+    "ISS (ZARYA)\n"
+    "1 25544U 98067A   08264.51782528 -.00002182  00000-0 -11606-4 0  2927\n"
+    "2 25544  51.6416 247.4627 0006703 130.5360 325.0288 15.72125391563537\n"
+)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--observers', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--hours', type=float, default=72)
+    parser.add_argument('--lookups', type=int, default=10000)
+    args = parser.parse_args()
+
+    os.environ['ISS_TLE_PATH'] = os.path.join(tempfile.mkdtemp(), 'iss_tle.txt')
+    from app.services import iss_passes, orbit
+
+    elements = iss_passes.parse_tle_text(SAMPLE_TLE, verify_checksum=False)
+    start = elements.epoch
+    rng = random.Random(3)
+
+    print(f"{'observers':>10} {'cold ms':>10} {'ms/observer':>12} {'passes':>8}")
+    for count in args.observers:
+        lats = [rng.uniform(-60, 60) for _ in range(count)]
+        lons = [rng.uniform(-180, 180) for _ in range(count)]
+        began = time.perf_counter()
+        passes = orbit.find_passes(elements, lats, lons, start=start, hours=args.hours)
+        elapsed = (time.perf_counter() - began) * 1000
+        print(f"{count:>10} {elapsed:>10.1f} {elapsed / count:>12.3f} {sum(map(len, passes)):>8}")
+
+    iss_passes.tle_store._elements = elements
+    iss_passes.tle_store._checked_at = float('inf')
+    iss_passes.pass_predictions(40.71, -74.01, now=start)
+    samples = []
+    for _ in range(args.lookups):
+        began = time.perf_counter()
+        iss_passes.pass_predictions(40.71, -74.01, now=start)
+        samples.append(time.perf_counter() - began)
+    print(f"warm pass_predictions: median {statistics.median(samples) * 1e6:.1f} us")
+
+if __name__ == '__main__':
+    main()
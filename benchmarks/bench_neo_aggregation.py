@@ -0,0 +1,127 @@
+"""NEO feed aggregation: per-asteroid Python loop vs. NumPy columns.
+
+Generates synthetic feeds of 1k, 10k and 100k objects, checks that both
+implementations produce identical output and reports the timings.
+
+    python -m benchmarks.bench_neo_aggregation
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from app.services.neo_aggregation import NEOColumns, aggregate
+
+def synthetic_feed(objects, days=90, seed=42):
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    feed = {}
+    for i in range(objects):
+        day = (start + timedelta(days=i % days)).strftime('%Y-%m-%d')
+        diameter_min = rng.uniform(0.001, 3.0)
+        approaches = [{
+            'close_approach_date': day,
+            'miss_distance': {'kilometers': repr(rng.uniform(1e5, 7.5e7))},
+            'relative_velocity': {'kilometers_per_hour': repr(rng.uniform(1e3, 1.5e5))},
+        } for _ in range(rng.randint(1, 3))]
+        feed.setdefault(day, []).append({
+            'neo_reference_id': str(2000000 + i),
+            'name': f"({2000 + i % 25} AB{i})",
+            'estimated_diameter': {'kilometers': {
+                'estimated_diameter_min': diameter_min,
+                'estimated_diameter_max': diameter_min * 2.236
+            }},
+            'is_potentially_hazardous_asteroid': rng.random() < 0.08,
+            'close_approach_data': approaches,
+        })
+    return {'element_count': objects, 'near_earth_objects': feed}
+
+def vectorized(neo_data):
+    return aggregate(NEOColumns.from_feed(neo_data))
+
+# Reference: the per-asteroid loop process_neo_data used before NEOColumns
+def legacy_process_neo_data(neo_data):
+    processed_data = {
+        'daily_counts': {},
+        'hazardous_counts': {'hazardous': 0, 'non_hazardous': 0},
+        'size_distribution': {'small': 0, 'medium': 0, 'large': 0},
+        'closest_approaches': [],
+        'all_objects': []
+    }
+    
+    for date, asteroids in neo_data['near_earth_objects'].items():
+        processed_data['daily_counts'][date] = len(asteroids)
+        
+        for asteroid in asteroids:
+            # Process hazard assessment
+            if asteroid['is_potentially_hazardous_asteroid']:
+                processed_data['hazardous_counts']['hazardous'] += 1
+            else:
+                processed_data['hazardous_counts']['non_hazardous'] += 1
+            
+            # Process size distribution
+            diameter_km = (asteroid['estimated_diameter']['kilometers']['estimated_diameter_min'] +
+                         asteroid['estimated_diameter']['kilometers']['estimated_diameter_max']) / 2
+            
+            if diameter_km < 0.5:
+                processed_data['size_distribution']['small'] += 1
+            elif diameter_km < 2:
+                processed_data['size_distribution']['medium'] += 1
+            else:
+                processed_data['size_distribution']['large'] += 1
+            
+            # Process closest approaches
+            close_approach = min(asteroid['close_approach_data'],
+                               key=lambda x: float(x['miss_distance']['kilometers']))
+            
+            processed_data['closest_approaches'].append({
+                'name': asteroid['name'],
+                'distance_km': float(close_approach['miss_distance']['kilometers']),
+                'velocity_kph': float(close_approach['relative_velocity']['kilometers_per_hour']),
+                'approach_date': close_approach['close_approach_date']
+            })
+            
+            # Store complete object data
+            processed_data['all_objects'].append({
+                'id': asteroid['neo_reference_id'],
+                'name': asteroid['name'],
+                'diameter_km': diameter_km,
+                'hazardous': asteroid['is_potentially_hazardous_asteroid'],
+                'velocity_kph': float(close_approach['relative_velocity']['kilometers_per_hour']),
+                'miss_distance_km': float(close_approach['miss_distance']['kilometers']),
+                'approach_date': close_approach['close_approach_date']
+            })
+    
+    # Sort closest approaches
+    processed_data['closest_approaches'] = sorted(
+        processed_data['closest_approaches'],
+        key=lambda x: x['distance_km']
+    )[:5]  # Keep only top 5 closest
+    
+    return processed_data
+
+def best_of(func, arg, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(arg)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        feed = synthetic_feed(size)
+        legacy_ms, expected = best_of(legacy_process_neo_data, feed, args.repeat)
+        load_ms, columns = best_of(NEOColumns.from_feed, feed, args.repeat)
+        aggregate_ms, _ = best_of(aggregate, columns, args.repeat)
+        total_ms, actual = best_of(vectorized, feed, args.repeat)
+        assert actual == expected, f"output differs for {size} objects"
+        print(f"{size:>7} objects  loop={legacy_ms:8.1f} ms  columns={total_ms:8.1f} ms "
+              f"(load {load_ms:.1f} + aggregate {aggregate_ms:.1f})  speed-up={legacy_ms / total_ms:.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Per-call latency of the pooled transport vs. a fresh connection per call.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_transport --calls 200 --handshake-ms 20
+"""
+import argparse
+import statistics
+import time
+import requests
+from app.services.transport import HTTPTransport
+from benchmarks.stub_server import StubServer
+
+def measure(call, calls):
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+def report(label, samples):
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<22} p50={p50:7.2f} ms  p95={p95:7.2f} ms  mean={statistics.mean(samples):7.2f} ms")
+    return p50
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--handshake-ms', type=float, default=20.0,
+                        help='simulated connection setup cost per new connection')
+    args = parser.parse_args()
+
+    with StubServer(handshake_delay=args.handshake_ms / 1000) as server:
+        url = f"{server.url}/planetary/apod"
+        transport = HTTPTransport(pool_size=4)
+
+        fresh = measure(lambda: requests.get(url, params={'api_key': 'DEMO'}, timeout=10).json(), args.calls)
+        pooled = measure(lambda: transport.get(url, params={'api_key': 'DEMO'}).json(), args.calls)
+        transport.close()
+
+    print(f"{args.calls} calls, {args.handshake_ms:.0f} ms simulated handshake")
+    fresh_p50 = report('requests.get (fresh)', fresh)
+    pooled_p50 = report('HTTPTransport (pooled)', pooled)
+    print(f"p50 speed-up: {fresh_p50 / pooled_p50:.1f}x")
+
+if __name__ == '__main__':
+    main()
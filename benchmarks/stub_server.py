@@ -0,0 +1,93 @@
+"""Local stub HTTP server used by the benchmarks.
+
+The server speaks HTTP/1.1 with keep-alive so connection reuse can be
+measured. ``handshake_delay`` is slept once per new connection to stand in
+for the TCP+TLS setup cost of a real upstream, and ``latency`` is slept on
+every request to stand in for upstream processing time.
+"""
+import io
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        if self.server.handshake_delay:
+            time.sleep(self.server.handshake_delay)
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        status, body, content_type = self.server.route(self.path)
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in self.server.extra_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+GIBS_TILE_PATH = re.compile(r'/(?P<layer>[^/]+)/default/(?P<date>[\d-]+)/[^/]+/(?P<z>\d+)/(?P<y>\d+)/(?P<x>\d+)\.jpg$')
+
+def gibs_tile_route(path, size=256):
+    """Synthetic GIBS-style WMTS tiles: terrain plus date-dependent cloud cover.
+
+    Serve with GIBS_WMTS_URL=<stub url>/{layer}/default/{date}/
+    GoogleMapsCompatible_Level{max_zoom}/{z}/{y}/{x}.{ext}. The same
+    path always yields the same image.
+    """
+    import numpy as np
+    from PIL import Image
+
+    match = GIBS_TILE_PATH.search(path)
+    if not match:
+        return 404, b'<ExceptionReport/>', 'text/xml'
+    rng = np.random.default_rng(zlib.crc32(path.encode()))
+    yy, xx = np.mgrid[0:size, 0:size] / size
+    land = np.stack([70 + 60 * xx, 90 + 50 * yy, 50 + 30 * xx * yy], axis=-1)
+    land += rng.normal(0, 8, land.shape)
+    # Cloud cover cycles with the day of month so some dates are clear
+    cover = (int(match.group('date')[-2:]) * 37 % 100) / 100
+    field = rng.random((size // 16, size // 16))
+    clouds = np.kron(field < cover, np.ones((16, 16), dtype=bool))
+    land[clouds] = 235
+    image = Image.fromarray(np.clip(land, 0, 255).astype(np.uint8))
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=85)
+    return 200, output.getvalue(), 'image/jpeg'
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, route=None, latency=0.0, handshake_delay=0.0, extra_headers=None):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.route = route or (lambda path: (200, {'path': path}, 'application/json'))
+        self.latency = latency
+        self.handshake_delay = handshake_delay
+        self.extra_headers = extra_headers or {}
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,53 @@
+"""Key climate rows by grid cell: climate_data.cell_key and one row per cell and date
+
+Revision ID: 2f6a8d0b5e17
+Revises: 7e1f3b9c2d40
+Create Date: 2026-10-18 09:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.services.climate import cell_key
+
+
+# revision identifiers, used by Alembic.
+revision = '2f6a8d0b5e17'
+down_revision = '7e1f3b9c2d40'
+branch_labels = None
+depends_on = None
+
+climate_data = sa.table('climate_data', sa.column('id', sa.Integer), sa.column('latitude', sa.Float),
+                        sa.column('longitude', sa.Float), sa.column('cell_key', sa.Integer))
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'cell_key' not in {column['name'] for column in inspector.get_columns('climate_data')}:
+        op.add_column('climate_data', sa.Column('cell_key', sa.Integer(), nullable=True))
+
+    rows = [{'row_id': row_id, 'key': cell_key(lat, lon)} for row_id, lat, lon in bind.execute(
+        sa.select(climate_data.c.id, climate_data.c.latitude, climate_data.c.longitude)
+        .where(climate_data.c.cell_key.is_(None)))]
+    if rows:
+        bind.execute(climate_data.update().where(climate_data.c.id == sa.bindparam('row_id'))
+                     .values(cell_key=sa.bindparam('key')), rows)
+
+    if 'uq_climate_cell_date' not in {c['name'] for c in inspector.get_unique_constraints('climate_data')}:
+        # Several legacy points can fall in one cell; keep the first row per cell and date
+        op.execute(
+            'DELETE FROM climate_data WHERE id NOT IN '
+            '(SELECT MIN(id) FROM climate_data GROUP BY cell_key, date)'
+        )
+        indexes = {index['name'] for index in inspector.get_indexes('climate_data')}
+        with op.batch_alter_table('climate_data') as batch_op:
+            if 'idx_climate_location_date' in indexes:
+                batch_op.drop_index('idx_climate_location_date')
+            batch_op.create_unique_constraint('uq_climate_cell_date', ['cell_key', 'date'])
+
+
+def downgrade():
+    with op.batch_alter_table('climate_data') as batch_op:
+        batch_op.drop_constraint('uq_climate_cell_date', type_='unique')
+        batch_op.create_index('idx_climate_location_date', ['latitude', 'longitude', 'date'])
+        batch_op.drop_column('cell_key')
@@ -0,0 +1,94 @@
+"""Store Mars photos by sol: photo metadata columns, query indexes and fetch records
+
+Revision ID: 4b8e2f1a6c03
+Revises: c3d5e7f90a12
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+import os
+from urllib.parse import urlparse
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b8e2f1a6c03'
+down_revision = 'c3d5e7f90a12'
+branch_labels = None
+depends_on = None
+
+NEW_COLUMNS = [
+    sa.Column('camera_full_name', sa.String(length=100), nullable=True),
+    sa.Column('image_host', sa.String(length=100), nullable=True),
+    sa.Column('image_filename', sa.String(length=200), nullable=True),
+    sa.Column('image_format', sa.String(length=10), nullable=True),
+    sa.Column('sol', sa.Integer(), nullable=True),
+]
+INDEXES = {
+    'idx_mars_rover_sol_camera': ['rover_name', 'sol', 'camera_name'],
+    'idx_mars_rover_date_camera': ['rover_name', 'earth_date', 'camera_name'],
+}
+
+
+def _backfill_image_metadata(bind):
+    """Derive host, file name and format from image_url, as app.services.mars_store does"""
+    photos = sa.table('mars_photo', sa.column('id', sa.Integer), sa.column('image_url', sa.String),
+                      sa.column('image_host', sa.String), sa.column('image_filename', sa.String),
+                      sa.column('image_format', sa.String))
+    rows = []
+    for photo_id, image_url in bind.execute(sa.select(photos.c.id, photos.c.image_url)
+                                            .where(photos.c.image_host.is_(None))):
+        parsed = urlparse(image_url)
+        filename = os.path.basename(parsed.path)
+        rows.append({
+            'photo_id': photo_id,
+            'host': parsed.hostname,
+            'filename': filename[:200],
+            'format': os.path.splitext(filename)[1].lstrip('.').lower()[:10] or None
+        })
+    if rows:
+        bind.execute(photos.update().where(photos.c.id == sa.bindparam('photo_id')).values(
+            image_host=sa.bindparam('host'), image_filename=sa.bindparam('filename'),
+            image_format=sa.bindparam('format')), rows)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing = {column['name'] for column in inspector.get_columns('mars_photo')}
+    for column in NEW_COLUMNS:
+        if column.name not in existing:
+            op.add_column('mars_photo', column)
+    # sol is not derivable from stored rows; queries by sol refetch and fill it in
+    _backfill_image_metadata(bind)
+
+    indexes = {index['name'] for index in inspector.get_indexes('mars_photo')}
+    for name, columns in INDEXES.items():
+        if name not in indexes:
+            op.create_index(name, 'mars_photo', columns)
+
+    if not inspector.has_table('mars_photo_fetch'):
+        op.create_table(
+            'mars_photo_fetch',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('query_key', sa.String(length=200), nullable=False),
+            sa.Column('rover_name', sa.String(length=50), nullable=False),
+            sa.Column('sol', sa.Integer(), nullable=True),
+            sa.Column('earth_date', sa.Date(), nullable=True),
+            sa.Column('camera_name', sa.String(length=50), nullable=True),
+            sa.Column('photo_count', sa.Integer(), nullable=False),
+            sa.Column('complete', sa.Boolean(), nullable=False),
+            sa.Column('latest_earth_date', sa.Date(), nullable=True),
+            sa.Column('fetched_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('query_key')
+        )
+
+
+def downgrade():
+    op.drop_table('mars_photo_fetch')
+    for name in INDEXES:
+        op.drop_index(name, table_name='mars_photo')
+    with op.batch_alter_table('mars_photo') as batch_op:
+        for column in NEW_COLUMNS:
+            batch_op.drop_column(column.name)
@@ -0,0 +1,53 @@
+"""Keep EONET events in their API shape: earth_event JSON columns, closed and query indexes
+
+Revision ID: 5c9e1a7f3b62
+Revises: 2f6a8d0b5e17
+Create Date: 2026-10-18 09:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c9e1a7f3b62'
+down_revision = '2f6a8d0b5e17'
+branch_labels = None
+depends_on = None
+
+NEW_COLUMNS = [
+    sa.Column('link', sa.String(length=500), nullable=True),
+    sa.Column('closed', sa.DateTime(), nullable=True),
+    sa.Column('categories', sa.JSON(), nullable=True),
+    sa.Column('sources', sa.JSON(), nullable=True),
+    sa.Column('geometry', sa.JSON(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+]
+INDEXES = {
+    'idx_earth_event_category_date': ['category', 'date'],
+    'idx_earth_event_date': ['date'],
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {column['name'] for column in inspector.get_columns('earth_event')}
+    for column in NEW_COLUMNS:
+        if column.name not in existing:
+            op.add_column('earth_event', column)
+    # Rows stored before this have closed = NULL, so they count as open
+    # and the next sync re-polls them from EONET to fill in the rest
+    op.execute('UPDATE earth_event SET updated_at = created_at WHERE updated_at IS NULL')
+
+    indexes = {index['name'] for index in inspector.get_indexes('earth_event')}
+    for name, columns in INDEXES.items():
+        if name not in indexes:
+            op.create_index(name, 'earth_event', columns)
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name='earth_event')
+    with op.batch_alter_table('earth_event') as batch_op:
+        for column in NEW_COLUMNS:
+            batch_op.drop_column(column.name)
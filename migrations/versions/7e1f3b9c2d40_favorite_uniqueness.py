@@ -0,0 +1,36 @@
+"""One favorite per user and image, plus the keyset pagination index
+
+Revision ID: 7e1f3b9c2d40
+Revises: 9d2a7c4e1f58
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e1f3b9c2d40'
+down_revision = '9d2a7c4e1f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'uq_favorite_user_nasa' not in {c['name'] for c in inspector.get_unique_constraints('favorite')}:
+        # Keep the first of any duplicate favorites so the constraint can be added
+        op.execute(
+            'DELETE FROM favorite WHERE id NOT IN '
+            '(SELECT MIN(id) FROM favorite GROUP BY user_id, nasa_id)'
+        )
+        with op.batch_alter_table('favorite') as batch_op:
+            batch_op.create_unique_constraint('uq_favorite_user_nasa', ['user_id', 'nasa_id'])
+    if 'idx_favorite_user_created' not in {index['name'] for index in inspector.get_indexes('favorite')}:
+        op.create_index('idx_favorite_user_created', 'favorite', ['user_id', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('idx_favorite_user_created', table_name='favorite')
+    with op.batch_alter_table('favorite') as batch_op:
+        batch_op.drop_constraint('uq_favorite_user_nasa', type_='unique')
@@ -0,0 +1,31 @@
+"""Add sync_state for resumable sync and backfill cursors
+
+Revision ID: 9d2a7c4e1f58
+Revises: 4b8e2f1a6c03
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2a7c4e1f58'
+down_revision = '4b8e2f1a6c03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('sync_state'):
+        op.create_table(
+            'sync_state',
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('cursor', sa.String(length=100), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('name')
+        )
+
+
+def downgrade():
+    op.drop_table('sync_state')
@@ -0,0 +1,44 @@
+"""Index EONET events by geohash for radius and bounding-box queries
+
+Revision ID: b04d6e2a9c81
+Revises: 5c9e1a7f3b62
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.services.geodesy import geohash_encode
+
+
+# revision identifiers, used by Alembic.
+revision = 'b04d6e2a9c81'
+down_revision = '5c9e1a7f3b62'
+branch_labels = None
+depends_on = None
+
+earth_event = sa.table('earth_event', sa.column('id', sa.Integer), sa.column('latitude', sa.Float),
+                       sa.column('longitude', sa.Float), sa.column('geohash', sa.String))
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'geohash' not in {column['name'] for column in inspector.get_columns('earth_event')}:
+        op.add_column('earth_event', sa.Column('geohash', sa.String(length=12), nullable=True))
+
+    rows = [{'row_id': row_id, 'hash': geohash_encode(lat, lon)} for row_id, lat, lon in bind.execute(
+        sa.select(earth_event.c.id, earth_event.c.latitude, earth_event.c.longitude)
+        .where(earth_event.c.geohash.is_(None), earth_event.c.latitude.isnot(None),
+               earth_event.c.longitude.isnot(None)))]
+    if rows:
+        bind.execute(earth_event.update().where(earth_event.c.id == sa.bindparam('row_id'))
+                     .values(geohash=sa.bindparam('hash')), rows)
+
+    if 'idx_earth_event_geohash' not in {index['name'] for index in inspector.get_indexes('earth_event')}:
+        op.create_index('idx_earth_event_geohash', 'earth_event', ['geohash'])
+
+
+def downgrade():
+    op.drop_index('idx_earth_event_geohash', table_name='earth_event')
+    with op.batch_alter_table('earth_event') as batch_op:
+        batch_op.drop_column('geohash')
@@ -0,0 +1,63 @@
+"""Store NEO feeds: neo.updated_at, close approaches and fetched feed days
+
+Revision ID: c3d5e7f90a12
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d5e7f90a12'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# The app runs db.create_all() on start-up, so new tables (and, on a fresh
+# database, every column) may already exist; each step checks first.
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def upgrade():
+    inspector = _inspector()
+    if 'updated_at' not in {column['name'] for column in inspector.get_columns('neo')}:
+        op.add_column('neo', sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute('UPDATE neo SET updated_at = created_at')
+
+    if not inspector.has_table('neo_close_approach'):
+        op.create_table(
+            'neo_close_approach',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('neo_id', sa.Integer(), nullable=False),
+            sa.Column('approach_date', sa.Date(), nullable=False),
+            sa.Column('miss_distance_km', sa.Float(), nullable=False),
+            sa.Column('velocity_kph', sa.Float(), nullable=True),
+            sa.Column('orbiting_body', sa.String(length=50), nullable=True),
+            sa.ForeignKeyConstraint(['neo_id'], ['neo.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('neo_id', 'approach_date', name='uq_neo_approach_neo_date')
+        )
+        op.create_index('idx_neo_approach_date_distance', 'neo_close_approach',
+                        ['approach_date', 'miss_distance_km'])
+
+    if not inspector.has_table('neo_feed_day'):
+        op.create_table(
+            'neo_feed_day',
+            sa.Column('date', sa.Date(), nullable=False),
+            sa.Column('object_count', sa.Integer(), nullable=False),
+            sa.Column('fetched_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('date')
+        )
+
+
+def downgrade():
+    op.drop_table('neo_feed_day')
+    op.drop_index('idx_neo_approach_date_distance', table_name='neo_close_approach')
+    op.drop_table('neo_close_approach')
+    with op.batch_alter_table('neo') as batch_op:
+        batch_op.drop_column('updated_at')
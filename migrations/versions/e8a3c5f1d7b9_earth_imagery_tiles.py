@@ -0,0 +1,44 @@
+"""Index cached WMTS tiles in earth_imagery: layer, zoom, tile_x, tile_y
+
+Revision ID: e8a3c5f1d7b9
+Revises: b04d6e2a9c81
+Create Date: 2026-10-18 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a3c5f1d7b9'
+down_revision = 'b04d6e2a9c81'
+branch_labels = None
+depends_on = None
+
+NEW_COLUMNS = [
+    sa.Column('layer', sa.String(length=100), nullable=True),
+    sa.Column('zoom', sa.Integer(), nullable=True),
+    sa.Column('tile_x', sa.Integer(), nullable=True),
+    sa.Column('tile_y', sa.Integer(), nullable=True),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {column['name'] for column in inspector.get_columns('earth_imagery')}
+    # Rows from the retired imagery API keep NULL tile columns, which the
+    # unique constraint does not compare
+    for column in NEW_COLUMNS:
+        if column.name not in existing:
+            op.add_column('earth_imagery', column)
+    if 'uq_earth_imagery_tile' not in {c['name'] for c in inspector.get_unique_constraints('earth_imagery')}:
+        with op.batch_alter_table('earth_imagery') as batch_op:
+            batch_op.create_unique_constraint('uq_earth_imagery_tile',
+                                              ['layer', 'date', 'zoom', 'tile_x', 'tile_y'])
+
+
+def downgrade():
+    with op.batch_alter_table('earth_imagery') as batch_op:
+        batch_op.drop_constraint('uq_earth_imagery_tile', type_='unique')
+        for column in NEW_COLUMNS:
+            batch_op.drop_column(column.name)
@@ -0,0 +1,10 @@
+import pytest
+from app import create_app
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Test client for an app on a throwaway SQLite database"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    app = create_app()
+    app.config['TESTING'] = True
+    return app.test_client()
@@ -0,0 +1,70 @@
+"""The /iss page fans its upstream calls out concurrently, against a stubbed transport."""
+import json
+import threading
+import time
+import pytest
+import requests
+from app.routes import iss
+from app.services import nasa_api
+
+LATENCY = 0.2
+BODIES = {
+    '/astros.json': {'people': [{'name': 'Test Astronaut', 'craft': 'ISS'}], 'number': 1},
+    '/iss-now.json': {'iss_position': {'latitude': '12.5', 'longitude': '-45.0'}, 'timestamp': 1700000000},
+}
+
+class StubTransport:
+    """Answers Open Notify URLs after LATENCY seconds and records how many calls overlap"""
+
+    def __init__(self):
+        self.urls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, **kwargs):
+        with self._lock:
+            self.urls.append(url)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(LATENCY)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        path = url[len(nasa_api.NASAAPI.ISS_BASE_URL):]
+        response = requests.Response()
+        response.url = url
+        if path in BODIES:
+            response.status_code = 200
+            response.headers['Content-Type'] = 'application/json'
+            response._content = json.dumps(BODIES[path]).encode()
+        else:
+            response.status_code = 404
+            response._content = b''
+        return response
+
+@pytest.fixture
+def stub_transport(monkeypatch):
+    stub = StubTransport()
+    monkeypatch.setattr(nasa_api, 'get_transport', lambda: stub)
+    # No tracked sample, so the page asks the position API itself
+    monkeypatch.setattr(iss.tracker, 'latest', lambda: None)
+    return stub
+
+def test_iss_page_fetches_crew_and_position_concurrently(client, stub_transport):
+    response = client.get('/iss')
+
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    assert 'Test Astronaut' in page
+    assert sorted(url.rsplit('/', 1)[-1] for url in stub_transport.urls) == ['astros.json', 'iss-now.json']
+    assert stub_transport.max_in_flight == 2
+
+def test_iss_page_uses_tracked_position_without_calling_upstream(client, stub_transport, monkeypatch):
+    monkeypatch.setattr(iss.tracker, 'latest', lambda: (time.time(), 1.0, 2.0))
+
+    response = client.get('/iss')
+
+    assert response.status_code == 200
+    assert [url.rsplit('/', 1)[-1] for url in stub_transport.urls] == ['astros.json']
@@ -0,0 +1,76 @@
+"""Per-endpoint cache policies and the response cache backends."""
+from datetime import date, timedelta
+import pytest
+import redis
+from app.services import cache
+from app.services.cache import (DAY, DEFAULT_POLICY, DO_NOT_CACHE, HOUR, MINUTE, NEVER_EXPIRE,
+                                create_backend, policy_for)
+from app.services.transport import HTTPTransport
+from benchmarks.stub_server import StubServer
+
+def days_ago(days):
+    return (date.today() - timedelta(days=days)).strftime('%Y-%m-%d')
+
+def policy(endpoint, params=None):
+    found = policy_for(endpoint, params)
+    return found.expire_after, found.stale_while_revalidate
+
+def test_do_not_cache_is_the_requests_cache_sentinel():
+    import requests_cache
+    assert DO_NOT_CACHE is requests_cache.DO_NOT_CACHE
+    assert DO_NOT_CACHE != requests_cache.EXPIRE_IMMEDIATELY
+
+@pytest.mark.parametrize('endpoint, params, expected', [
+    ('/planetary/apod', {'date': days_ago(30)}, (NEVER_EXPIRE, 0)),
+    ('/planetary/apod', {'date': days_ago(0)}, (HOUR, 10 * MINUTE)),
+    ('/planetary/apod', {}, (HOUR, 10 * MINUTE)),
+    ('/planetary/apod', {'start_date': days_ago(30), 'end_date': days_ago(20)}, (NEVER_EXPIRE, 0)),
+    ('/planetary/apod', {'count': 5}, (DO_NOT_CACHE, 0)),
+    ('/neo/rest/v1/feed', {'start_date': days_ago(10), 'end_date': days_ago(5)}, (NEVER_EXPIRE, 0)),
+    ('/neo/rest/v1/feed', {'start_date': days_ago(1), 'end_date': days_ago(1)}, (HOUR, HOUR)),
+    ('/mars-photos/api/v1/rovers/curiosity/photos', {'sol': 1000}, (DAY, DAY)),
+    ('/EONET/v3/events', {}, (10 * MINUTE, 30 * MINUTE)),
+    ('/iss-now.json', {}, (DO_NOT_CACHE, 0)),
+    ('/astros.json', {}, (HOUR, HOUR)),
+])
+def test_policy_for(endpoint, params, expected):
+    assert policy(endpoint, params) == expected
+
+def test_unknown_endpoints_get_the_default_policy():
+    assert policy_for('/something/else') is DEFAULT_POLICY
+
+def test_create_backend_by_name():
+    assert create_backend('memory') == 'memory'
+    assert create_backend('none') is None
+    with pytest.raises(ValueError):
+        create_backend('memcached')
+
+@pytest.fixture
+def redis_backend(monkeypatch):
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis, 'from_url', lambda url, **kwargs: fakeredis.FakeRedis(server=server))
+    return create_backend('redis')
+
+@pytest.fixture
+def sqlite_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_PATH', str(tmp_path / 'cache' / 'http_cache.sqlite'))
+    return create_backend('sqlite')
+
+@pytest.mark.parametrize('backend_fixture', ['sqlite_backend', 'redis_backend'])
+def test_backends_store_and_skip_responses(backend_fixture, request):
+    backend = request.getfixturevalue(backend_fixture)
+    with StubServer() as server:
+        transport = HTTPTransport(cache_backend=backend, limiter_for=None)
+        try:
+            cached = [transport.get(server.url + '/astros.json', cache_policy=policy_for('/astros.json')).from_cache
+                      for _ in range(2)]
+            skipped = [transport.get(server.url + '/iss-now.json', cache_policy=policy_for('/iss-now.json')).from_cache
+                       for _ in range(2)]
+            stored = list(transport.session.cache.responses.keys())
+        finally:
+            transport.close()
+
+    assert cached == [False, True]
+    assert skipped == [False, False]
+    assert len(stored) == 1
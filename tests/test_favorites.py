@@ -0,0 +1,62 @@
+"""Validation and state of the batched favorites toggle."""
+import pytest
+from werkzeug.security import generate_password_hash
+from app import db
+from app.models import User
+
+@pytest.fixture
+def logged_in(client):
+    with client.application.app_context():
+        db.session.add(User(username='tester', email='tester@example.com',
+                            password_hash=generate_password_hash('secret')))
+        db.session.commit()
+    client.post('/login', data={'email': 'tester@example.com', 'password': 'secret'})
+    return client
+
+def toggle(client, body):
+    return client.post('/profile/favorites/toggle', json=body)
+
+@pytest.mark.parametrize('body', [
+    {'items': [{'nasa_id': 'PIA1', 'title': 42}]},
+    {'items': [{'nasa_id': 'PIA1', 'image_url': {'href': 'x'}}]},
+    {'items': [{'nasa_id': {'id': 1}}]},
+    {'items': [{'nasa_id': True}]},
+    {'items': [{'title': 'no id'}]},
+    {'items': ['PIA1']},
+    {'items': {'nasa_id': 'PIA1'}},
+    ['PIA1'],
+])
+def test_malformed_items_are_rejected(logged_in, body):
+    response = toggle(logged_in, body)
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+def test_toggle_adds_then_removes(logged_in):
+    items = [{'nasa_id': 'PIA1', 'title': 'Nebula', 'image_url': 'https://example.com/a.jpg'},
+             {'nasa_id': 2}]
+
+    assert toggle(logged_in, {'items': items}).get_json() == {'favorites': {'PIA1': True, '2': True}}
+    assert toggle(logged_in, {'items': items[:1]}).get_json() == {'favorites': {'PIA1': False}}
+
+def test_status_follows_toggles(logged_in):
+    def status(ids):
+        return logged_in.get('/profile/favorites/status', query_string={'ids': ids}).get_json()['favorited']
+
+    assert status('PIA1,PIA2') == []
+    toggle(logged_in, {'items': [{'nasa_id': 'PIA2'}]})
+    assert status('PIA1,PIA2') == ['PIA2']
+
+def test_snapshot_loads_only_ids_it_has_not_seen():
+    from app.services.user_cache import UserSnapshot
+    snapshot = UserSnapshot(1, 'tester', 'tester@example.com', None)
+    calls = []
+
+    def load(ids):
+        calls.append(list(ids))
+        return {'a'} & set(ids)
+
+    assert snapshot.favorited(['a', 'b'], load) == {'a'}
+    assert snapshot.favorited(['a', 'b', 'c'], load) == {'a'}
+    assert snapshot.favorited(['b', 'a'], load) == {'a'}
+    assert calls == [['a', 'b'], ['c']]
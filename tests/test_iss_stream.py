@@ -0,0 +1,19 @@
+"""The /iss/stream Server-Sent Events stream ends on its own."""
+import time
+from app.routes import iss
+
+def test_stream_sends_retry_and_ends_after_timeout(client, monkeypatch):
+    sample = (time.time(), 12.5, -45.0)
+    monkeypatch.setattr(iss.tracker, 'latest', lambda: sample)
+    monkeypatch.setattr(iss.tracker, 'wait_for_update', lambda previous, timeout: time.sleep(timeout))
+    monkeypatch.setattr(iss, 'STREAM_TIMEOUT', 0.3)
+    monkeypatch.setattr(iss, 'STREAM_HEARTBEAT', 0.1)
+
+    started = time.monotonic()
+    body = client.get('/iss/stream').get_data(as_text=True)
+
+    assert time.monotonic() - started < 2
+    events = body.split('\n\n')
+    assert events[0] == f"retry: {iss.STREAM_RETRY}"
+    assert events[1].startswith('data: ') and '"latitude": "12.5000"' in events[1]
+    assert ': keep-alive' in events[2:]
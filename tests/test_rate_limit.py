@@ -0,0 +1,106 @@
+"""Token reservation, quota-header scaling and 429 blocking of the shared limiter."""
+import pytest
+from app.services import nasa_api
+from app.services.nasa_api import NASAAPI
+from app.services.rate_limit import (MIN_RATE_SCALE, BucketState, LocalBucketStore, RateLimitExceeded,
+                                     SQLiteBucketStore, TokenBucketLimiter, reserve_token, scale_from_headers)
+from app.services.transport import HTTPTransport
+from benchmarks.stub_server import StubServer
+
+def test_reserve_token_spends_the_burst_then_queues():
+    state = BucketState(tokens=2, updated_at=100.0)
+
+    assert reserve_token(state, 100.0, rate=2, capacity=2, max_wait=5) == 0
+    assert reserve_token(state, 100.0, rate=2, capacity=2, max_wait=5) == 0
+    # Each queued caller reserves its own slot behind the previous one
+    assert reserve_token(state, 100.0, rate=2, capacity=2, max_wait=5) == pytest.approx(0.5)
+    assert reserve_token(state, 100.0, rate=2, capacity=2, max_wait=5) == pytest.approx(1.0)
+    assert state.tokens == pytest.approx(-2)
+
+def test_reserve_token_refills_up_to_capacity():
+    state = BucketState(tokens=0, updated_at=100.0)
+
+    assert reserve_token(state, 200.0, rate=2, capacity=4, max_wait=0) == 0
+    assert state.tokens == pytest.approx(3)
+
+def test_reserve_token_past_max_wait_raises_without_reserving():
+    state = BucketState(tokens=0, updated_at=100.0)
+
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        reserve_token(state, 100.0, rate=1, capacity=4, max_wait=0.5)
+    assert excinfo.value.retry_after == pytest.approx(1.0)
+    assert state.tokens == 0
+    assert state.updated_at == 100.0
+
+def test_reserve_token_uses_the_scaled_rate():
+    state = BucketState(tokens=0, updated_at=100.0, scale=0.5)
+
+    assert reserve_token(state, 100.0, rate=2, capacity=4, max_wait=5) == pytest.approx(1.0)
+
+@pytest.mark.parametrize('headers, expected', [
+    ({}, None),
+    ({'X-RateLimit-Remaining': 'many'}, None),
+    ({'X-RateLimit-Remaining': '500', 'X-RateLimit-Limit': '1000'}, 1.0),
+    ({'X-RateLimit-Remaining': '100', 'X-RateLimit-Limit': '1000'}, 1.0),
+    ({'X-RateLimit-Remaining': '50', 'X-RateLimit-Limit': '1000'}, 0.5),
+    ({'X-RateLimit-Remaining': '0', 'X-RateLimit-Limit': '1000'}, MIN_RATE_SCALE),
+])
+def test_scale_from_headers(headers, expected):
+    assert scale_from_headers(headers) == expected
+
+def test_low_quota_headers_slow_the_bucket():
+    store = LocalBucketStore()
+    limiter = TokenBucketLimiter(store, 'api', rate=2, capacity=1, max_wait=10)
+    limiter.observe(200, {'X-RateLimit-Remaining': '25', 'X-RateLimit-Limit': '1000'})
+
+    limiter.acquire()
+    # Refill runs at a quarter of the rate: the next token is 2 s away
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        limiter.acquire(max_wait=1)
+    assert excinfo.value.retry_after == pytest.approx(2.0, abs=0.1)
+
+def test_429_blocks_the_bucket_for_retry_after():
+    store = LocalBucketStore()
+    limiter = TokenBucketLimiter(store, 'api', rate=2, capacity=4, max_wait=10)
+
+    limiter.observe(429, {'Retry-After': '30'})
+
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        limiter.acquire()
+    assert excinfo.value.retry_after == pytest.approx(30, abs=1)
+
+def test_sqlite_store_shares_the_bucket_between_instances(tmp_path):
+    path = str(tmp_path / 'rate_limit.sqlite')
+    first = TokenBucketLimiter(SQLiteBucketStore(path), 'api', rate=0.1, capacity=2, max_wait=0)
+    second = TokenBucketLimiter(SQLiteBucketStore(path), 'api', rate=0.1, capacity=2, max_wait=0)
+
+    first.acquire()
+    second.acquire()
+    with pytest.raises(RateLimitExceeded):
+        first.acquire()
+
+def test_transport_feeds_response_headers_to_the_limiter():
+    limiter = TokenBucketLimiter(LocalBucketStore(), '127.0.0.1', rate=1, capacity=1, max_wait=1)
+    headers = {'X-RateLimit-Remaining': '10', 'X-RateLimit-Limit': '1000'}
+    with StubServer(extra_headers=headers) as server:
+        transport = HTTPTransport(cache_backend=None, limiter_for=lambda host: limiter)
+        try:
+            transport.get(server.url + '/anything')
+        finally:
+            transport.close()
+
+    # The request spent the only token, and 10 of 1000 left scales the
+    # refill to a tenth: the next token is about 10 s away
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        limiter.acquire(max_wait=0)
+    assert 8 < excinfo.value.retry_after <= 10
+
+def test_make_request_translates_rate_limit_errors(monkeypatch):
+    class LimitedTransport:
+        def get(self, url, **kwargs):
+            raise RateLimitExceeded(12)
+
+    monkeypatch.setattr(nasa_api, 'get_transport', LimitedTransport)
+
+    with pytest.raises(ConnectionError, match='try again in 12 seconds'):
+        NASAAPI._make_request('/planetary/apod')